@@ -0,0 +1,119 @@
+"""
+Local address resolution and QR code cache.
+
+Resolving the local IP (UDP socket / netifaces walk) and rendering the QR code
+(PIL PNG encoding) used to run on the GUI thread during startup. The service
+resolves once, renders each QR code once per URL and watches the network
+interfaces from a background thread, so callers only read cached values.
+"""
+
+import threading
+
+from utils import get_local_ip_address, generate_qr_code_image
+
+CONFIG_SERVER_PORT = 5000
+POLL_INTERVAL_S = 10
+
+
+def _interface_fingerprint():
+    """Returns a hashable snapshot of all IPv4 addresses of all interfaces."""
+    try:
+        import netifaces
+        snapshot = []
+        for interface in netifaces.interfaces():
+            addrs = netifaces.ifaddresses(interface).get(netifaces.AF_INET, [])
+            snapshot.append((interface, tuple(sorted(a.get('addr', '') for a in addrs))))
+        return tuple(sorted(snapshot))
+    except Exception:
+        return None
+
+
+class AddressService:
+    """Caches the local IP address and the generated QR code images."""
+
+    def __init__(self, port=CONFIG_SERVER_PORT, poll_interval=POLL_INTERVAL_S):
+        self.port = port
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._ip = None
+        self._qr_cache = {}
+        self._listeners = []
+        self._fingerprint = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    # --- Address ---
+    def get_ip(self):
+        """Returns the cached local IP. Resolves it on first use."""
+        with self._lock:
+            if self._ip is None:
+                self._ip = get_local_ip_address()
+            return self._ip
+
+    @property
+    def config_url(self):
+        return f"http://{self.get_ip()}:{self.port}"
+
+    # --- QR Code ---
+    def get_qr_png(self, url=None):
+        """Returns the QR code PNG for url (default: config server URL). Rendered once per URL."""
+        url = url or self.config_url
+        with self._lock:
+            png = self._qr_cache.get(url)
+        if png is None:
+            png = generate_qr_code_image(url)
+            with self._lock:
+                self._qr_cache[url] = png
+        return png
+
+    # --- Change Detection ---
+    def add_listener(self, callback):
+        """Registers callback(new_ip). Called from the watcher thread when the IP changes."""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Resolves the address, pre-renders the QR code and starts watching for changes."""
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="address-service", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self._fingerprint = _interface_fingerprint()
+        try:
+            self.get_qr_png()
+        except Exception as e:
+            print(f"[WARN] Failed to pre-render QR code: {e}")
+
+        while not self._stop.wait(self.poll_interval):
+            fingerprint = _interface_fingerprint()
+            if fingerprint == self._fingerprint:
+                continue
+            self._fingerprint = fingerprint
+
+            new_ip = get_local_ip_address()
+            with self._lock:
+                changed = new_ip != self._ip
+                self._ip = new_ip
+                if changed:
+                    # Old URLs are useless now; keep the cache small
+                    self._qr_cache.clear()
+            if not changed:
+                continue
+
+            print(f"[INFO] Network change detected. New local IP: {new_ip}")
+            try:
+                self.get_qr_png()
+            except Exception as e:
+                print(f"[WARN] Failed to render QR code: {e}")
+            for callback in list(self._listeners):
+                try:
+                    callback(new_ip)
+                except Exception as e:
+                    print(f"[WARN] Address change listener failed: {e}")
+
+
+address_service = AddressService()
@@ -0,0 +1,451 @@
+"""
+Local stand-in for play.autodarts.io for load and soak tests.
+
+Serves what the kiosk browser relies on:
+
+- /boards/<id>/follow: a synthetic board page with a #root element that is
+  mutated continuously (throws, scores) and the view mode buttons
+  ('Segments mode', 'Coords mode', 'Live mode' via aria-label) rendered after
+  a short delay, like the React app does.
+- A Keycloak-like login flow: without session cookie the board page redirects
+  to a login form with the ids username / password / rememberMe / kc-login.
+  With --auth-port the login server runs on a second origin, like
+  login.autodarts.io; a stored login session skips the form (single sign-on).
+- /version: the endpoint polled by scripts/offline_check.js.
+
+Faults are injected into every request outside /_mock: latency (+ jitter),
+dropped connections, HTTP 503 and scheduled outages (all requests dropped),
+reproducible with --seed. They can be changed at runtime:
+
+    curl -X POST localhost:8090/_mock/faults -d '{"drop_rate": 1.0}'
+    curl localhost:8090/_mock/status
+
+Point the application at the server with
+    [main]
+    autodarts_url = http://127.0.0.1:8090
+
+--connect-latency-ms delays the first response on every new connection, like
+the DNS/TCP/TLS setup to a remote server does; pre-warmed connections hide it.
+
+Usage:
+    python benchmarks/mock_autodarts.py --port 8090 --latency-ms 50 --outage-every 600 --outage-for 30
+    python benchmarks/mock_autodarts.py --auth-port 8091 --connect-latency-ms 300
+"""
+
+import argparse
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlparse
+
+# Login session of the login server (same name as Keycloak, see prewarm.py) and of the board app
+SSO_COOKIE = "KEYCLOAK_IDENTITY"
+APP_COOKIE = "MOCK_APP_SESSION"
+SSO_MAX_AGE_S = 30 * 24 * 3600
+LOGIN_PATH = "/realms/autodarts/protocol/openid-connect/auth"
+AUTHENTICATE_PATH = "/realms/autodarts/login-actions/authenticate"
+ADMIN_PREFIX = "/_mock"
+
+FAULT_KEYS = ('latency_ms', 'jitter_ms', 'drop_rate', 'error_rate', 'outage_every_s', 'outage_for_s')
+
+BOARD_PAGE = """<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Autodarts (mock)</title>
+<style>
+body { margin: 0; background: #1a202c; color: #fff; font-family: sans-serif; }
+#root { padding: 1em; }
+.throw { display: inline-block; margin: 0.2em; padding: 0.3em 0.6em; background: #2d3748; }
+button[data-active] { background: #3182ce; }
+</style>
+</head>
+<body>
+<div id="root"></div>
+<script>
+(function() {
+    var config = %(config)s;
+    var root = document.getElementById('root');
+    var leak = [];
+    var turn = 0;
+
+    function render() {
+        var bar = document.createElement('div');
+        ['Segments mode', 'Coords mode', 'Live mode'].forEach(function(mode, i) {
+            var btn = document.createElement('button');
+            btn.setAttribute('aria-label', mode);
+            btn.textContent = mode;
+            if (i === 0) { btn.setAttribute('data-active', ''); }
+            btn.addEventListener('click', function() {
+                bar.querySelectorAll('button').forEach(function(b) { b.removeAttribute('data-active'); });
+                btn.setAttribute('data-active', '');
+            });
+            bar.appendChild(btn);
+        });
+        root.appendChild(bar);
+        var board = document.createElement('div');
+        board.id = 'board';
+        root.appendChild(board);
+        var score = document.createElement('h1');
+        score.id = 'score';
+        root.appendChild(score);
+        setInterval(churn, config.churn_ms);
+    }
+
+    function churn() {
+        // Replace the throws of the current turn, like a running game does
+        turn++;
+        var board = document.getElementById('board');
+        board.textContent = '';
+        for (var i = 0; i < config.churn_nodes; i++) {
+            var t = document.createElement('span');
+            t.className = 'throw';
+            t.textContent = ['S', 'D', 'T'][(turn + i) %% 3] + (((turn * 7 + i) %% 20) + 1);
+            board.appendChild(t);
+        }
+        document.getElementById('score').textContent = String(501 - (turn * 45) %% 501);
+        if (config.leak_kb_per_min > 0) {
+            // Retained garbage to reproduce a leaking page
+            leak.push(new Array(Math.round(config.leak_kb_per_min * 1024 / 8 * config.churn_ms / 60000)).fill(turn));
+        }
+    }
+
+    // The React app renders its controls some time after load
+    setTimeout(render, config.render_delay_ms);
+})();
+</script>
+</body>
+</html>
+"""
+
+LOGIN_PAGE = """<!doctype html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Sign in to Autodarts (mock)</title></head>
+<body>
+<form id="kc-form-login" method="post" action="%(action)s">
+<p>%(message)s</p>
+<input id="username" name="username" type="text" autocomplete="username">
+<input id="password" name="password" type="password" autocomplete="current-password">
+<label><input id="rememberMe" name="rememberMe" type="checkbox"> Remember me</label>
+<input id="kc-login" name="login" type="submit" value="Sign In">
+</form>
+</body>
+</html>
+"""
+
+
+class FaultInjector:
+    """Decides per request whether and how it fails. Thread safe."""
+
+    def __init__(self, seed=None, **faults):
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._started = time.monotonic()
+        self.faults = {key: 0 for key in FAULT_KEYS}
+        self.update(faults)
+
+    def update(self, faults):
+        """Sets the given fault parameters. Raises ValueError for unknown keys or invalid values."""
+        unknown = set(faults) - set(FAULT_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown fault parameters: {', '.join(sorted(unknown))}")
+        values = {key: float(value) for key, value in faults.items() if value is not None}
+        for key, value in values.items():
+            if value < 0 or (key.endswith("_rate") and value > 1):
+                raise ValueError(f"Invalid value for {key}: {value}")
+        with self._lock:
+            self.faults.update(values)
+            if 'outage_every_s' in values or 'outage_for_s' in values:
+                self._started = time.monotonic()
+
+    def in_outage(self, now=None):
+        with self._lock:
+            every, duration = self.faults['outage_every_s'], self.faults['outage_for_s']
+            elapsed = (time.monotonic() if now is None else now) - self._started
+        # The outage is at the end of each period, so a run starts with a healthy server
+        return every > 0 and duration > 0 and elapsed % every >= every - duration
+
+    def decide(self):
+        """Returns (delay_s, action) with action None, 'drop' or 'error'."""
+        outage = self.in_outage()
+        with self._lock:
+            f = self.faults
+            delay = f['latency_ms'] + (self._random.uniform(-f['jitter_ms'], f['jitter_ms']) if f['jitter_ms'] else 0)
+            if outage or self._random.random() < f['drop_rate']:
+                action = "drop"
+            elif self._random.random() < f['error_rate']:
+                action = "error"
+            else:
+                action = None
+        return max(0.0, delay) / 1000, action
+
+
+class MockState:
+    def __init__(self, faults, username=None, password=None, page_config=None):
+        self.faults = faults
+        self.username = username
+        self.password = password
+        self.page_config = page_config or {}
+        self.require_login = True
+        self.board_base = ""  # Absolute base URLs when board and login server are separate origins
+        self.auth_base = ""
+        self.connect_latency_s = 0
+        self._lock = threading.Lock()
+        self._sessions = set()
+        self.counters = {}
+        self.started = time.time()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def new_session(self):
+        token = secrets.token_hex(16)
+        with self._lock:
+            self._sessions.add(token)
+        return token
+
+    def has_session(self, token):
+        with self._lock:
+            return token in self._sessions
+
+    def clear_sessions(self):
+        with self._lock:
+            self._sessions.clear()
+
+    def check_credentials(self, username, password):
+        if self.username is None:
+            return bool(username and password)
+        return username == self.username and password == self.password
+
+    def status(self):
+        with self._lock:
+            counters = dict(self.counters)
+            sessions = len(self._sessions)
+        return {
+            'uptime_s': round(time.time() - self.started),
+            'faults': dict(self.faults.faults),
+            'in_outage': self.faults.in_outage(),
+            'sessions': sessions,
+            'counters': counters,
+        }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "AutodartsMock/1.0"
+    protocol_version = "HTTP/1.1"
+    state = None  # MockState, set by create_server()
+
+    def log_message(self, *args):
+        pass
+
+    # --- Helpers ---
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _json(self, data, status=200):
+        self._send(status, json.dumps(data, indent=2), "application/json")
+
+    def _redirect(self, location, headers=None):
+        self._send(302, headers=dict(headers or {}, Location=location))
+
+    def _cookie(self, cookie_name):
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == cookie_name:
+                return value
+        return None
+
+    def _redirect_uri(self, url):
+        redirect_uri = parse_qs(url.query).get('redirect_uri', ["/"])[0]
+        if redirect_uri.startswith("/") or (self.state.board_base and redirect_uri.startswith(self.state.board_base)):
+            return redirect_uri
+        return "/"
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    def _inject_fault(self):
+        """Applies the configured faults. Returns True if the request was answered already."""
+        delay, action = self.state.faults.decide()
+        if delay:
+            time.sleep(delay)
+        if action == "drop":
+            self.state.count("fault_drop")
+            # Close without any response, the browser sees a network error
+            self.close_connection = True
+            return True
+        if action == "error":
+            self.state.count("fault_error")
+            self._send(503, "Service Unavailable (mock)", "text/plain")
+            return True
+        return False
+
+    # --- Routing ---
+    def handle(self):
+        # Cost of setting up a new connection; requests on a kept-alive connection don't pay it
+        if self.state.connect_latency_s:
+            time.sleep(self.state.connect_latency_s)
+        super().handle()
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_HEAD(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch()
+
+    def _dispatch(self):
+        url = urlparse(self.path)
+        if url.path.startswith(ADMIN_PREFIX):
+            return self._admin(url)
+        self.state.count("requests")
+        if self._inject_fault():
+            return
+        parts = url.path.strip("/").split("/")
+        if url.path == "/version":
+            self.state.count("version")
+            return self._json({'version': "mock"})
+        if len(parts) == 3 and parts[0] == "boards" and parts[2] == "follow":
+            return self._board(url)
+        if url.path == LOGIN_PATH:
+            return self._login_form(url)
+        if url.path == AUTHENTICATE_PATH and self.command == "POST":
+            return self._authenticate(url)
+        self._send(404, "Not found", "text/plain")
+
+    def _board(self, url):
+        if self.state.require_login and not self.state.has_session(self._cookie(APP_COOKIE)):
+            code = parse_qs(url.query).get('code', [None])[0]
+            if self.state.has_session(code):
+                # Back from the login server
+                cookie = f"{APP_COOKIE}={self.state.new_session()}; Path=/; HttpOnly"
+                return self._redirect(url.path, {'Set-Cookie': cookie})
+            self.state.count("login_redirect")
+            redirect_uri = quote(self.state.board_base + url.path, safe='')
+            return self._redirect(f"{self.state.auth_base}{LOGIN_PATH}?redirect_uri={redirect_uri}")
+        self.state.count("board")
+        self._send(200, BOARD_PAGE % {'config': json.dumps(self.state.page_config)})
+
+    def _back_to_app(self, url, headers=None):
+        redirect_uri = self._redirect_uri(url)
+        separator = "&" if "?" in redirect_uri else "?"
+        self._redirect(f"{redirect_uri}{separator}code={self.state.new_session()}", headers)
+
+    def _login_form(self, url, message=""):
+        if not message and self.state.has_session(self._cookie(SSO_COOKIE)):
+            # Stored login session: no form (single sign-on)
+            self.state.count("login_sso")
+            return self._back_to_app(url)
+        action = f"{AUTHENTICATE_PATH}?redirect_uri={quote(self._redirect_uri(url), safe='')}"
+        self.state.count("login_form")
+        self._send(200, LOGIN_PAGE % {'action': action, 'message': message})
+
+    def _authenticate(self, url):
+        form = parse_qs(self._read_body())
+        username = form.get('username', [""])[0]
+        password = form.get('password', [""])[0]
+        if not self.state.check_credentials(username, password):
+            self.state.count("login_failed")
+            return self._login_form(url, "Invalid username or password.")
+        self.state.count("login_success")
+        cookie = f"{SSO_COOKIE}={self.state.new_session()}; Path=/; Max-Age={SSO_MAX_AGE_S}; HttpOnly"
+        self._back_to_app(url, {'Set-Cookie': cookie})
+
+    def _admin(self, url):
+        if url.path == f"{ADMIN_PREFIX}/status":
+            return self._json(self.state.status())
+        if url.path == f"{ADMIN_PREFIX}/faults" and self.command == "POST":
+            try:
+                self.state.faults.update(json.loads(self._read_body() or "{}"))
+            except (ValueError, TypeError) as e:
+                return self._json({'error': str(e)}, status=400)
+            return self._json(self.state.status())
+        if url.path == f"{ADMIN_PREFIX}/sessions" and self.command == "POST":
+            # Expire all sessions: the next board load goes through the login flow again
+            self.state.clear_sessions()
+            return self._json(self.state.status())
+        self._send(404, "Not found", "text/plain")
+
+
+def create_server(host="127.0.0.1", port=8090, state=None):
+    """Creates the server (not started). Port 0 picks a free port."""
+    handler = type("BoundMockHandler", (MockHandler,), {'state': state or MockState(FaultInjector())})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Autodarts stand-in server")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--seed', type=int, help="Seed for reproducible fault sequences")
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--drop-rate', type=float, default=0, help="Share of dropped connections (0-1)")
+    parser.add_argument('--error-rate', type=float, default=0, help="Share of HTTP 503 responses (0-1)")
+    parser.add_argument('--outage-every', type=float, default=0, help="Outage period in seconds (0 = none)")
+    parser.add_argument('--outage-for', type=float, default=0, help="Outage duration within each period")
+    parser.add_argument('--username', help="Accepted username (default: any non-empty credentials)")
+    parser.add_argument('--password')
+    parser.add_argument('--no-login', action='store_true', help="Serve the board page without login")
+    parser.add_argument('--auth-port', type=int, help="Run the login server on this port (separate origin)")
+    parser.add_argument('--connect-latency-ms', type=float, default=0, help="Delay on each new connection")
+    parser.add_argument('--churn-ms', type=int, default=1000, help="Interval of the DOM mutations")
+    parser.add_argument('--churn-nodes', type=int, default=60, help="Nodes replaced per mutation")
+    parser.add_argument('--render-delay-ms', type=int, default=1500)
+    parser.add_argument('--leak-kb-per-min', type=float, default=0, help="Memory retained by the page per minute")
+    args = parser.parse_args()
+
+    faults = FaultInjector(
+        seed=args.seed, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, drop_rate=args.drop_rate,
+        error_rate=args.error_rate, outage_every_s=args.outage_every, outage_for_s=args.outage_for)
+    state = MockState(faults, args.username, args.password, page_config={
+        'churn_ms': args.churn_ms,
+        'churn_nodes': args.churn_nodes,
+        'render_delay_ms': args.render_delay_ms,
+        'leak_kb_per_min': args.leak_kb_per_min,
+    })
+    state.require_login = not args.no_login
+    state.connect_latency_s = args.connect_latency_ms / 1000
+
+    server = create_server(args.host, args.port, state)
+    host, port = server.server_address[:2]
+    print(f"[INFO] Autodarts mock listening on http://{host}:{port} (autodarts_url = http://{host}:{port})")
+    auth_server = None
+    if args.auth_port:
+        auth_server = create_server(args.host, args.auth_port, state)
+        state.board_base = f"http://{host}:{port}"
+        state.auth_base = f"http://{host}:{auth_server.server_address[1]}"
+        threading.Thread(target=auth_server.serve_forever, name="auth-server", daemon=True).start()
+        print(f"[INFO] Login server listening on {state.auth_base} (auth_url = {state.auth_base})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if auth_server:
+            auth_server.shutdown()
+            auth_server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Local stand-in for a central config source (see config_sync.py).
+
+Serves the desired state of every device under /devices/<device_id>:
+conditional requests (ETag / If-None-Match -> 304), deltas for ?since=<version>
+(the changes of all versions after it) and gzip if the client accepts it.
+Every device starts without settings; changes are published at runtime and
+apply to all devices unless a device_id is given:
+
+    curl -X POST localhost:8095/_sync/publish \
+         -d '{"config": {"main": {"zoom_factor": 1.2}}, "css": "body { color: red; }"}'
+    curl -X POST localhost:8095/_sync/publish -d '{"device_id": "abc", "themes": {"Dark": "..."}}'
+    curl localhost:8095/_sync/status
+
+--error-rate answers a share of the polls with 503 and Retry-After, --latency-ms
+delays every poll. Kiosks only accept plain http sources with signed answers:
+create a key pair, start the server with the private key and copy the public
+key next to darts-browser.py as sync_signing.pub:
+
+    python bundle_update.py keygen --private sync.pem --public sync_signing.pub
+
+Then point a kiosk at the server with
+    [sync]
+    url = http://127.0.0.1:8095/devices
+    interval_s = 10
+
+Usage:
+    python benchmarks/mock_sync_source.py --port 8095 --signing-key sync.pem --error-rate 0.2
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+DEVICE_PREFIX = "/devices/"
+ADMIN_PREFIX = "/_sync"
+
+
+def merge(target, change):
+    """Merges one published change into a payload (themes: null deletes)."""
+    for section, options in (change.get('config') or {}).items():
+        target.setdefault('config', {}).setdefault(section, {}).update(options)
+    if change.get('css') is not None:
+        target['css'] = change['css']
+    for name, css in (change.get('themes') or {}).items():
+        target.setdefault('themes', {})[name] = css
+    return target
+
+
+class SyncSourceState:
+    """Published versions and poll counters. Thread safe."""
+
+    def __init__(self, latency_ms=0, error_rate=0, retry_after_s=5, seed=None, signing_key=None):
+        self.signing_key = signing_key  # Ed25519 private key, None: unsigned answers
+        self.latency_s = latency_ms / 1000
+        self.error_rate = error_rate
+        self.retry_after_s = retry_after_s
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.versions = []  # [(version, device_id or None, change)]
+        self.counters = {}
+
+    def count(self, key):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def publish(self, change, device_id=None):
+        """Adds a version. Returns its number."""
+        with self._lock:
+            version = len(self.versions) + 1
+            self.versions.append((version, device_id, change))
+            return version
+
+    def payload(self, device_id, since=None):
+        """(version, payload) of a device; a delta after since if that version is known."""
+        with self._lock:
+            versions = [(v, change) for v, target, change in self.versions if target in (None, device_id)]
+            all_versions = len(self.versions)
+            should_fail = self._random.random() < self.error_rate
+        current = str(all_versions)
+        base = None
+        if since is not None and since.isdigit() and int(since) <= all_versions:
+            base = since
+            versions = [(v, change) for v, change in versions if v > int(since)]
+        payload = {'device_id': device_id, 'version': current, 'base': base}
+        for _, change in versions:
+            merge(payload, change)
+        if base is None:
+            # Full state: deleted themes are simply missing
+            payload['themes'] = {name: css for name, css in payload.get('themes', {}).items() if css is not None}
+        return current, payload, should_fail
+
+
+class SyncSourceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def _send(self, status, body=b"", content_type="application/json", headers=None):
+        self.send_response(status)
+        if body:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == f"{ADMIN_PREFIX}/status":
+            with self.state._lock:
+                status = {'versions': len(self.state.versions), 'counters': dict(self.state.counters)}
+            return self._send(200, json.dumps(status).encode())
+        if not parsed.path.startswith(DEVICE_PREFIX):
+            return self._send(404)
+        device_id = unquote(parsed.path[len(DEVICE_PREFIX):])
+        since = parse_qs(parsed.query).get('since', [None])[0]
+        time.sleep(self.state.latency_s)
+        version, payload, should_fail = self.state.payload(device_id, since)
+        if should_fail:
+            self.state.count("error")
+            return self._send(503, headers={'Retry-After': str(self.state.retry_after_s)})
+        etag = f'"{version}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.state.count("not_modified")
+            return self._send(304, headers={'ETag': etag})
+        self.state.count("delta" if payload['base'] else "full")
+        body = json.dumps(payload).encode()
+        headers = {'ETag': etag}
+        if self.state.signing_key is not None:
+            headers['X-Signature'] = base64.b64encode(self.state.signing_key.sign(body)).decode()
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = "gzip"
+        self._send(200, body, headers=headers)
+
+    def do_POST(self):
+        if urlparse(self.path).path != f"{ADMIN_PREFIX}/publish":
+            return self._send(404)
+        try:
+            change = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError as e:
+            return self._send(400, json.dumps({'error': str(e)}).encode())
+        version = self.state.publish(change, change.pop('device_id', None))
+        self._send(200, json.dumps({'version': str(version)}).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def create_server(host, port, state):
+    handler = type("Handler", (SyncSourceHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for a central config source")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8095)
+    parser.add_argument('--seed', type=int, help="Seed for reproducible errors")
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0, help="Share of HTTP 503 responses (0-1)")
+    parser.add_argument('--retry-after', type=int, default=5, help="Retry-After of the 503 responses in seconds")
+    parser.add_argument('--signing-key', help="Ed25519 private key (PEM) to sign the answers with")
+    args = parser.parse_args()
+
+    signing_key = None
+    if args.signing_key:
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+        signing_key = load_pem_private_key(Path(args.signing_key).read_bytes(), password=None)
+    state = SyncSourceState(args.latency_ms, args.error_rate, args.retry_after, args.seed, signing_key)
+    server = create_server(args.host, args.port, state)
+    host, port = server.server_address[:2]
+    print(f"[INFO] Sync source listening on http://{host}:{port} (url = http://{host}:{port}/devices)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,509 @@
+"""
+Benchmark suite for the config server and the injection paths.
+
+Runs headless on Linux: the application sources are copied into a temporary
+workspace (APP_DIR is the directory of the modules), synthetic fixtures are
+generated there (large log file, thousands of themes) and the benchmarks run
+against the workspace with the Flask test client and the 'offscreen' Qt
+platform. The real config.ini, logs and themes are never touched.
+
+Results are written as JSON (including the git commit) so runs of different
+commits can be compared:
+
+    python benchmarks/run.py                       # full run
+    python benchmarks/run.py --quick               # small fixtures
+    python benchmarks/run.py --only routes_css,theme_metadata
+    python benchmarks/run.py --compare benchmarks/results/<older>.json
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# Copied into the workspace; everything else (cache, logs, .git) is left out
+WORKSPACE_DIRS = ("templates", "scripts")
+
+LOG_LINE = "2025-01-01 12:00:00,000 - INFO - [Browser 1] Injected/Updated custom CSS. " + "x" * 60 + "\n"
+
+BENCHMARKS = (
+    "get_config",
+    "route_index",
+    "route_css",
+    "route_logs",
+    "route_backup",
+    "route_restore",
+    "theme_metadata",
+    "injection",
+    "fleet_push",
+    "config_sync",
+)
+
+FLEET_PEERS = 30
+FLEET_LATENCY_S = 0.1
+
+
+# --- Measurement ---
+def measure(func, repeat, warmup=1):
+    """Runs func warmup + repeat times. Returns a summary of the durations in ms."""
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return summarize(durations)
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    total_s = sum(durations) / 1000
+    return {
+        'n': len(durations),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'p50_ms': round(durations[len(durations) // 2], 3),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+        'min_ms': round(durations[0], 3),
+        'max_ms': round(durations[-1], 3),
+        'ops_per_s': round(len(durations) / total_s, 2) if total_s else None,
+    }
+
+
+# --- Workspace ---
+def create_workspace(args):
+    """Copies the application into a temp dir and generates the fixtures."""
+    workspace = Path(tempfile.mkdtemp(prefix="adarts-bench-"))
+    for path in REPO_DIR.glob("*.py"):
+        shutil.copy2(path, workspace / path.name)
+    for name in WORKSPACE_DIRS:
+        shutil.copytree(REPO_DIR / name, workspace / name)
+
+    (workspace / "config.ini").write_text(
+        "[main]\ndevice_id = benchmark\nbrowsers = 2\n\n"
+        "[boards]\nboard1_id = bench-board-1\nboard2_id = bench-board-2\n\n"
+        "[style]\nactivate = true\nview_mode = Segments mode\n\n"
+        "[security]\nenable_auth = false\n")
+    (workspace / "style.css").write_text(_css(0, 4000))
+
+    # Large log file (written in chunks)
+    (workspace / "logs").mkdir(exist_ok=True)
+    chunk = LOG_LINE * 10000
+    with open(workspace / "logs" / "adarts-browser.log", "w") as f:
+        for _ in range(max(1, args.log_mb * 1024 * 1024 // len(chunk))):
+            f.write(chunk)
+
+    themes = workspace / "themes"
+    themes.mkdir()
+    for i in range(args.themes):
+        (themes / f"theme-{i:05d}.css").write_text(_css(i, args.theme_kb * 1024))
+    return workspace
+
+
+def _css(index, size):
+    header = (f"/* NAME: Theme {index} */\n/* VERSION: 1.{index % 10}.0 */\n"
+              f"/* AUTHOR: Benchmark */\n/* DESCRIPTION: Synthetic theme {index} */\n")
+    rule = f".board-{index} {{ color: #{random.randrange(0xffffff):06x}; margin: 0 auto; }}\n"
+    return header + rule * max(1, (size - len(header)) // len(rule))
+
+
+def import_from_workspace(workspace):
+    """Makes the workspace copy the importable application."""
+    os.chdir(workspace)
+    sys.path.insert(0, str(workspace))
+
+
+# --- Benchmarks ---
+def bench_get_config(ctx):
+    from config import get_config
+    return measure(get_config, ctx.repeat * 20)
+
+
+def _client(ctx):
+    if 'client' not in ctx.cache:
+        import config_server
+        config_server.app.config['TESTING'] = True
+        ctx.cache['client'] = config_server.app.test_client()
+    return ctx.cache['client']
+
+
+def _get(ctx, path, expected=200):
+    client = _client(ctx)
+
+    def _request():
+        response = client.get(path)
+        if response.status_code != expected:
+            raise RuntimeError(f"GET {path}: {response.status_code}")
+        response.get_data()
+    return _request
+
+
+def bench_route_index(ctx):
+    return measure(_get(ctx, "/"), ctx.repeat)
+
+
+def bench_route_css(ctx):
+    result = measure(_get(ctx, "/css"), ctx.repeat)
+    result['themes'] = ctx.args.themes
+    return result
+
+
+def bench_route_logs(ctx):
+    result = measure(_get(ctx, "/logs"), ctx.repeat)
+    result['log_mb'] = ctx.args.log_mb
+    return result
+
+
+def bench_route_backup(ctx):
+    result = measure(_get(ctx, "/backup"), max(1, ctx.repeat // 5))
+    result['backup_kb'] = round(len(_client(ctx).get("/backup").get_data()) / 1024)
+    return result
+
+
+def bench_route_restore(ctx):
+    client = _client(ctx)
+    archive = client.get("/backup").get_data()
+
+    def _restore():
+        response = client.post("/restore", data={'backup_file': (io.BytesIO(archive), "backup.zip")},
+                               content_type="multipart/form-data")
+        if response.status_code != 302:
+            raise RuntimeError(f"POST /restore: {response.status_code}")
+    result = measure(_restore, max(1, ctx.repeat // 5))
+    result['backup_kb'] = round(len(archive) / 1024)
+    return result
+
+
+def bench_theme_metadata(ctx):
+    from utils import get_local_theme_metadata, THEMES_DIR
+    files = sorted(THEMES_DIR.glob("*.css"))
+
+    def _all():
+        for path in files:
+            get_local_theme_metadata(path)
+    result = measure(_all, ctx.repeat)
+    result['themes'] = len(files)
+    return result
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Serves a small board-like page for every path."""
+    page = None
+
+    def do_GET(self):
+        body = self.page.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _stand_in_page():
+    rows = "".join(f"<div class='throw' data-i='{i}'>T{i % 3 + 1} {i % 20 + 1}</div>" for i in range(300))
+    return ("<!doctype html><html><head><title>Board</title></head><body><div id='root'>"
+            "<button aria-label='Segments mode'>S</button><button aria-label='Coords mode'>C</button>"
+            f"<button aria-label='Live mode'>L</button>{rows}</div></body></html>")
+
+
+def bench_injection(ctx):
+    """Load time of a local stand-in page and cost of the CSS/view mode injection (offscreen Qt)."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.setdefault("QTWEBENGINE_CHROMIUM_FLAGS", "--no-sandbox")
+    spec = importlib.util.spec_from_file_location("darts_browser", Path.cwd() / "darts-browser.py")
+    browser_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(browser_module)
+
+    from PySide6.QtCore import QEventLoop, QTimer
+    from PySide6.QtWidgets import QApplication
+    import metrics
+
+    _StandInHandler.page = _stand_in_page()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/boards/bench-board-1/follow"
+
+    app = QApplication.instance() or QApplication([])
+    browser_module.load_templates()
+
+    def wait(signal=None, timeout_ms=30000, condition=None):
+        loop = QEventLoop()
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(loop.quit)
+        timer.start(timeout_ms)
+        if signal is not None:
+            signal.connect(loop.quit)
+            loop.exec()
+            signal.disconnect(loop.quit)
+        while condition is not None and not condition() and timer.isActive():
+            app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+        return timer.isActive()
+
+    view = browser_module.BrowserView(1, url)
+    view.resize(1280, 720)
+    view.show()
+
+    load_durations = []
+    for _ in range(ctx.repeat):
+        start = time.perf_counter()
+        view.setUrl(url)
+        if not wait(view.loadFinished):
+            raise RuntimeError("Stand-in page did not load")
+        load_durations.append((time.perf_counter() - start) * 1000)
+
+    def injected(script):
+        histogram = metrics.SCRIPT_INJECTION_SECONDS.to_dict()['values']
+        return next((v['count'] for v in histogram if v['labels'] == {'browser': '1', 'script': script}), 0)
+
+    results = {'page_load': summarize(load_durations)}
+    for name, script, inject in (("css", "css", view._inject_css), ("view_mode", "viewMode", view._inject_view_mode)):
+        call_durations = []
+        roundtrip_durations = []
+        for _ in range(ctx.repeat * 5):
+            before = injected(script)
+            start = time.perf_counter()
+            inject()
+            call_durations.append((time.perf_counter() - start) * 1000)
+            wait(condition=lambda: injected(script) > before, timeout_ms=10000)
+            roundtrip_durations.append((time.perf_counter() - start) * 1000)
+        # Python side (file read, base64, ...) blocks the GUI thread; the round trip includes the renderer
+        results[f"{name}_call"] = summarize(call_durations)
+        results[f"{name}_roundtrip"] = summarize(roundtrip_durations)
+
+    view.close()
+    server.shutdown()
+    return results
+
+
+class _StandInPeerHandler(BaseHTTPRequestHandler):
+    """Answers the fleet API of a kiosk after a fixed latency (keep-alive)."""
+    protocol_version = "HTTP/1.1"
+
+    def _answer(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(FLEET_LATENCY_S)
+        body = json.dumps({'device_id': f"peer-{self.server.server_address[1]}", 'config': {}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_PUT = do_PATCH = do_POST = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_fleet_push(ctx):
+    """Pushing CSS and a reload command to stand-in peers, concurrently and one after another."""
+    from fleet import Fleet, FleetClient, Peer, PeerRegistry
+
+    servers = []
+    registry = PeerRegistry(Path.cwd() / "fleet-bench.json")
+    for i in range(FLEET_PEERS):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInPeerHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        registry.put(Peer(f"http://127.0.0.1:{server.server_address[1]}", f"peer-{i}", f"Peer {i}"))
+    css = _css(0, 4000)
+
+    results = {}
+    try:
+        concurrent = Fleet(registry, FleetClient())
+        sequential = Fleet(registry, FleetClient(max_workers=1))
+        results['css_concurrent'] = measure(lambda: concurrent.push_css(css), ctx.repeat)
+        results['reload_concurrent'] = measure(lambda: concurrent.command("reload"), ctx.repeat)
+        # One peer after another, as a baseline (slow: peers * latency)
+        results['css_sequential'] = measure(lambda: sequential.push_css(css), 1, warmup=0)
+        failed = concurrent.last_report.failed + sequential.last_report.failed
+        if failed:
+            raise RuntimeError(f"{failed} fleet requests failed")
+        results['peers'] = FLEET_PEERS
+        results['latency_ms'] = FLEET_LATENCY_S * 1000
+    finally:
+        for server in servers:
+            server.shutdown()
+    return results
+
+
+def bench_config_sync(ctx):
+    """Polls of a stand-in central config source: unchanged (304), CSS delta, full state after a restart (signed)."""
+    from mock_sync_source import SyncSourceState, create_server
+    import config_server
+    from config import config_transaction
+    from config_sync import ConfigSync, RESULT_NOT_MODIFIED, RESULT_CHANGED
+
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    # The stand-in is plain http, so its answers are signed
+    signing_key = Ed25519PrivateKey.generate()
+    (Path.cwd() / "sync_signing.pub").write_bytes(signing_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo))
+    state = SyncSourceState(signing_key=signing_key)
+    server = create_server("127.0.0.1", 0, state)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with config_transaction("benchmark") as config:
+        if not config.has_section("sync"):
+            config.add_section("sync")
+        config.set("sync", "url", f"http://127.0.0.1:{server.server_address[1]}/devices")
+    handlers = dict(apply_config=config_server._apply_synced_config, read_css=config_server.read_css,
+                    write_css=config_server.write_css, load_theme=config_server.load_theme,
+                    save_theme=config_server.save_theme, delete_theme=config_server.delete_theme)
+    state.publish({'config': {'main': {'qr_duration': 20}}, 'css': _css(1, 4000),
+                   'themes': {f"sync-{i}": _css(i, 4000) for i in range(20)}})
+
+    def poll(sync, expected):
+        result = sync.poll_once()
+        if result != expected:
+            raise RuntimeError(f"Sync poll returned {result}, expected {expected}")
+
+    sync = ConfigSync(Path.cwd() / "sync_cache.json")
+    sync.configure(**handlers)
+    poll(sync, RESULT_CHANGED)
+    results = {'not_modified': measure(lambda: poll(sync, RESULT_NOT_MODIFIED), ctx.repeat * 5)}
+
+    def css_delta():
+        state.publish({'css': _css(random.randrange(1000), 4000)})
+        poll(sync, RESULT_CHANGED)
+    results['css_delta'] = measure(css_delta, ctx.repeat)
+
+    def full_unchanged():
+        # A restarted kiosk without cache: the whole state is fetched but nothing is written
+        fresh = ConfigSync(Path.cwd() / "sync_cache-fresh.json")
+        fresh.configure(**handlers)
+        fresh.poll_once()
+    results['full_unchanged'] = measure(full_unchanged, ctx.repeat)
+    results['polls'] = dict(state.counters)
+    server.shutdown()
+    return results
+
+
+# --- Runner ---
+class Context:
+    def __init__(self, args):
+        self.args = args
+        self.repeat = args.repeat
+        self.cache = {}
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "-C", str(REPO_DIR), "describe", "--always", "--dirty"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(results):
+    """Yields (name, summary) for all measured entries, including nested ones."""
+    for name, entry in results.items():
+        if not isinstance(entry, dict) or 'error' in entry:
+            continue
+        if 'mean_ms' in entry:
+            yield name, entry
+        else:
+            for sub, summary in entry.items():
+                if isinstance(summary, dict) and 'mean_ms' in summary:
+                    yield f"{name}.{sub}", summary
+
+
+def print_results(results, baseline=None):
+    previous = dict(_flatten(baseline['results'])) if baseline else {}
+    print(f"{'Benchmark':32} {'p50':>10} {'p95':>10} {'mean':>10} {'ops/s':>10}" + ("   vs. baseline" if baseline else ""))
+    for name, summary in _flatten(results):
+        line = (f"{name:32} {summary['p50_ms']:>8.2f}ms {summary['p95_ms']:>8.2f}ms "
+                f"{summary['mean_ms']:>8.2f}ms {summary['ops_per_s'] or 0:>10.1f}")
+        old = previous.get(name)
+        if old and old['p50_ms']:
+            change = (summary['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+            line += f"   {change:+6.1f}% (p50 {old['p50_ms']:.2f}ms)"
+        print(line)
+    for name, entry in results.items():
+        if isinstance(entry, dict) and 'error' in entry:
+            print(f"{name:32} FEHLER: {entry['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for adarts-browser")
+    parser.add_argument('--only', help="Comma separated list of benchmarks: " + ", ".join(BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--log-mb', type=int, default=300, help="Size of the synthetic log file")
+    parser.add_argument('--themes', type=int, default=3000, help="Number of synthetic themes")
+    parser.add_argument('--theme-kb', type=int, default=8, help="Size of one synthetic theme")
+    parser.add_argument('--quick', action='store_true', help="Small fixtures, few repetitions")
+    parser.add_argument('--output', help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument('--compare', help="Earlier result file to compare with")
+    parser.add_argument('--keep-workspace', action='store_true')
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.log_mb, args.themes = 5, 20, 300
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    random.seed(1)
+    commit = git_commit()
+    print(f"Creating workspace ({args.log_mb} MB log, {args.themes} themes)...")
+    workspace = create_workspace(args)
+    import_from_workspace(workspace)
+
+    results = {}
+    ctx = Context(args)
+    try:
+        for name in selected:
+            print(f"Running {name}...")
+            try:
+                results[name] = globals()[f"bench_{name}"](ctx)
+            except Exception as e:
+                results[name] = {'error': f"{type(e).__name__}: {e}"}
+    finally:
+        os.chdir(REPO_DIR)
+        if not args.keep_workspace:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'parameters': {'repeat': args.repeat, 'log_mb': args.log_mb, 'themes': args.themes, 'theme_kb': args.theme_kb},
+        'results': results,
+    }
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}-{commit or 'unknown'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print()
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,563 @@
+"""
+Offline update bundles.
+
+An update bundle is a zip archive that contains everything needed to update a
+device without network access:
+
+    manifest.json   -- format version, app version, SHA-256 and size of every file
+    manifest.sig    -- Ed25519 signature over manifest.json
+    repo.bundle     -- git bundle of the application repository (HEAD)
+    wheels/*.whl    -- optional pre-built wheels for requirements.txt
+
+The signed manifest is verified before anything is written; only the files it
+lists are extracted, and their size and checksum are checked while writing.
+The update is prepared in a staging directory next to the app directory (in a
+background thread, pip can take minutes) and then swapped in with two renames.
+The previous version is kept until the new version reports itself healthy
+within HEALTH_TIMEOUT_S of its start; a supervisor process started from the
+old code rolls the swap back if that does not happen in time.
+
+Usage (build machine):
+    python bundle_update.py keygen --private signing.pem
+    python bundle_update.py build --key signing.pem --wheels wheels/ --out update.adbundle
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path, PurePosixPath
+
+from utils import APP_DIR, UPDATE_PUBKEY_PATH, UPDATE_PENDING_PATH
+
+BUNDLE_FORMAT = 1
+HEALTH_TIMEOUT_S = 180
+HEALTH_CHECK_URL = "http://127.0.0.1:5000/login"
+MAX_MANIFEST_BYTES = 1024 * 1024
+MAX_SIGNATURE_BYTES = 1024
+MAX_FILE_BYTES = 2 * 1024 ** 3
+META_FILES = ("manifest.json", "manifest.sig")
+
+# Resolved once at import time: after a swap the working directory (and thus the
+# relative APP_DIR) points to the new version, but the supervisor must run the
+# code of the version that performed the update.
+_MODULE_PATH = Path(__file__).resolve()
+
+
+class BundleError(Exception):
+    """Raised when a bundle is invalid or cannot be applied."""
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _app_dir():
+    return APP_DIR.resolve()
+
+
+def _staging_dir(app_dir):
+    return app_dir.parent / f".{app_dir.name}.staging"
+
+
+def _previous_dir(app_dir):
+    return app_dir.parent / f".{app_dir.name}.previous"
+
+
+def _failed_dir(app_dir):
+    return app_dir.parent / f".{app_dir.name}.failed"
+
+
+def _link_or_copy(src, dst):
+    """Hard-links a file if possible (instant, no extra space), copies otherwise."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _remove_path(path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    elif path.exists() or path.is_symlink():
+        path.unlink()
+
+
+# --- Verification ---
+def _safe_name(name):
+    """A relative path inside the bundle without .., drive letters or backslashes."""
+    parts = PurePosixPath(name).parts
+    return bool(parts) and not name.startswith('/') and '\\' not in name and ':' not in name \
+        and not any(part in ('.', '..') for part in parts)
+
+
+def verify_manifest(manifest_bytes, signature):
+    """
+    Verifies the signature of manifest.json and the files it lists.
+    Returns the parsed manifest or raises BundleError.
+    """
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+    if not UPDATE_PUBKEY_PATH.exists():
+        raise BundleError(f"Kein öffentlicher Update-Schlüssel gefunden ({UPDATE_PUBKEY_PATH.name}).")
+
+    try:
+        public_key = load_pem_public_key(UPDATE_PUBKEY_PATH.read_bytes())
+        public_key.verify(signature, manifest_bytes)
+    except InvalidSignature:
+        raise BundleError("Ungültige Signatur. Das Bundle wurde nicht mit dem passenden Schlüssel signiert.")
+    except Exception as e:
+        raise BundleError(f"Signaturprüfung fehlgeschlagen: {e}")
+
+    manifest = json.loads(manifest_bytes.decode('utf-8'))
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise BundleError(f"Nicht unterstütztes Bundle-Format: {manifest.get('format')}")
+
+    files = manifest.get('files', {})
+    if "repo.bundle" not in files:
+        raise BundleError("Bundle enthält kein Repository (repo.bundle).")
+    for name in files:
+        if not _safe_name(name) or name in META_FILES:
+            raise BundleError(f"Ungültiger Dateiname im Bundle: {name}")
+    return manifest
+
+
+def _read_member(zf, name, limit):
+    try:
+        info = zf.getinfo(name)
+    except KeyError:
+        raise BundleError("Bundle unvollständig (manifest.json oder manifest.sig fehlt).")
+    if info.file_size > limit:
+        raise BundleError(f"Datei zu groß: {name}")
+    with zf.open(info) as f:
+        data = f.read(limit + 1)
+    if len(data) > limit:
+        raise BundleError(f"Datei zu groß: {name}")
+    return data
+
+
+def _extract_member(zf, info, target, expected_size, expected_sha256):
+    """Writes one file, stopping as soon as it is larger than announced."""
+    digest = hashlib.sha256()
+    written = 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with zf.open(info) as src, open(target, 'wb') as dst:
+        for chunk in iter(lambda: src.read(1024 * 1024), b''):
+            written += len(chunk)
+            if written > expected_size:
+                raise BundleError(f"Datei größer als angegeben: {info.filename}")
+            digest.update(chunk)
+            dst.write(chunk)
+    if written != expected_size:
+        raise BundleError(f"Dateigröße stimmt nicht: {info.filename}")
+    if digest.hexdigest() != expected_sha256:
+        raise BundleError(f"Prüfsumme stimmt nicht: {info.filename}")
+
+
+def _extract_bundle(bundle_path, target_dir):
+    """
+    Verifies the signed manifest of a bundle, then extracts exactly the files it
+    lists. Sizes and names are checked before anything is written.
+    Returns the manifest or raises BundleError.
+    """
+    with zipfile.ZipFile(bundle_path) as zf:
+        manifest = verify_manifest(_read_member(zf, "manifest.json", MAX_MANIFEST_BYTES),
+                                   _read_member(zf, "manifest.sig", MAX_SIGNATURE_BYTES))
+        files = manifest['files']
+        # Bundles built before sizes were recorded are limited to MAX_FILE_BYTES per file
+        sizes = manifest.get('sizes', {})
+        members = {info.filename: info for info in zf.infolist() if not info.is_dir()}
+        for name in members:
+            if name not in files and name not in META_FILES:
+                raise BundleError(f"Unerwartete Datei im Bundle: {name}")
+        total = 0
+        for name in files:
+            info = members.get(name)
+            if info is None:
+                raise BundleError(f"Datei fehlt im Bundle: {name}")
+            if info.file_size != sizes.get(name, info.file_size) or info.file_size > MAX_FILE_BYTES:
+                raise BundleError(f"Ungültige Dateigröße: {name}")
+            total += info.file_size
+        if shutil.disk_usage(target_dir).free < total:
+            raise BundleError(f"Nicht genug Speicherplatz zum Entpacken ({total // (1024 * 1024)} MB).")
+
+        for name, expected in files.items():
+            info = members[name]
+            _extract_member(zf, info, target_dir / name, info.file_size, expected)
+    return manifest
+
+
+# --- Staging ---
+def _carry_over_user_state(app_dir, staging_dir):
+    """
+    Copies everything that is not part of the repository (config.ini, .secret.key,
+    style.css, themes/, logs/, cache, .venv, local logos, ...) into the staging dir.
+    Directories are hard-linked so this is fast even for the venv and the cache.
+    """
+    output = subprocess.check_output(
+        ['git', 'ls-files', '--others', '--directory', '-z'],
+        cwd=app_dir, stderr=subprocess.DEVNULL
+    ).decode('utf-8')
+
+    for entry in filter(None, output.split('\0')):
+        rel = entry.rstrip('/')
+        src = app_dir / rel
+        dst = staging_dir / rel
+        if dst.exists() or not (src.exists() or src.is_symlink()):
+            continue
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        if src.is_dir() and not src.is_symlink():
+            shutil.copytree(src, dst, symlinks=True, copy_function=_link_or_copy)
+        else:
+            shutil.copy2(src, dst, follow_symlinks=False)
+
+
+def _stage(extract_dir, app_dir, staging_dir):
+    log = []
+
+    # 1. Checkout from git bundle
+    output = subprocess.check_output(
+        ['git', 'clone', '--quiet', str(extract_dir / "repo.bundle"), str(staging_dir)],
+        stderr=subprocess.STDOUT
+    ).decode('utf-8')
+    log.append(f"Git: {output.strip() or 'Checkout erstellt.'}")
+
+    # Keep the original remote so online updates keep working afterwards
+    try:
+        origin = subprocess.check_output(
+            ['git', 'config', '--get', 'remote.origin.url'], cwd=app_dir, stderr=subprocess.DEVNULL
+        ).decode('utf-8').strip()
+        if origin:
+            subprocess.check_call(['git', 'remote', 'set-url', 'origin', origin], cwd=staging_dir,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except subprocess.CalledProcessError:
+        pass
+
+    # 2. Local state
+    _carry_over_user_state(app_dir, staging_dir)
+
+    # 3. Dependencies, strictly offline
+    staging_python = staging_dir / ".venv" / "bin" / "python"
+    python = staging_python if staging_python.exists() else Path(sys.executable)
+    pip_cmd = [str(python), '-m', 'pip', 'install', '--no-index', '-r', 'requirements.txt']
+    wheels_dir = extract_dir / "wheels"
+    if wheels_dir.is_dir():
+        pip_cmd[5:5] = ['--find-links', str(wheels_dir)]
+    output = subprocess.check_output(pip_cmd, cwd=staging_dir, stderr=subprocess.STDOUT).decode('utf-8')
+    log.append(f"Pip:\n{output.strip()}")
+
+    # 4. Health check before switching: the new code must at least import
+    subprocess.check_output(
+        [str(python), '-c', 'import config, utils, config_server'],
+        cwd=staging_dir, stderr=subprocess.STDOUT, timeout=120
+    )
+    log.append("Vorabprüfung erfolgreich.")
+    return python, log
+
+
+def _swap_in(app_dir, staging_dir):
+    """Replaces app_dir with staging_dir. Keeps the old version as .previous."""
+    previous = _previous_dir(app_dir)
+    _remove_path(previous)
+    os.rename(app_dir, previous)
+    try:
+        os.rename(staging_dir, app_dir)
+    except OSError:
+        os.rename(previous, app_dir)
+        raise
+    # The running process keeps its cwd (the old directory); move it along so
+    # relative paths and the restart resolve to the new version.
+    os.chdir(app_dir)
+    return previous
+
+
+_install_lock = threading.Lock()
+_install_status = {'state': None, 'version': None, 'message': None}
+
+
+def install_status():
+    """State of the last offline update of this process (None, "running", "installed", "failed")."""
+    with _install_lock:
+        return dict(_install_status)
+
+
+def _set_install_status(state, version, message=None):
+    with _install_lock:
+        _install_status.update(state=state, version=version, message=message)
+
+
+def apply_update_bundle(bundle_path, on_installed):
+    """
+    Verifies an update bundle and installs it in a background thread.
+    The bundle is verified and extracted before this returns (bundle_path can be
+    deleted afterwards); on_installed() is called after the swap and must
+    restart the application.
+    Returns: (success: bool, message: str)
+    """
+    with _install_lock:
+        if _install_status['state'] == "running":
+            return False, "Es wird bereits ein Update installiert."
+        _install_status.update(state="running", version=None, message=None)
+
+    extract_dir = Path(tempfile.mkdtemp(prefix="adarts-bundle-"))
+    try:
+        manifest = _extract_bundle(bundle_path, extract_dir)
+    except (zipfile.BadZipFile, BundleError, OSError, ValueError) as e:
+        _remove_path(extract_dir)
+        if isinstance(e, zipfile.BadZipFile):
+            message = "Die Datei ist kein gültiges Update-Bundle (ZIP)."
+        elif isinstance(e, BundleError):
+            message = str(e)
+        else:
+            message = f"Bundle konnte nicht gelesen werden: {e}"
+        _set_install_status(None, None)
+        return False, message
+
+    version = manifest.get('version') or "unbekannt"
+    _set_install_status("running", version)
+    threading.Thread(target=_install, args=(extract_dir, manifest, on_installed), daemon=True).start()
+    return True, f"Update auf Version {version} wird installiert."
+
+
+def _install(extract_dir, manifest, on_installed):
+    """Stages and swaps in an extracted bundle (background thread)."""
+    app_dir = _app_dir()
+    staging_dir = _staging_dir(app_dir)
+    version = manifest.get('version') or "unbekannt"
+
+    try:
+        _remove_path(staging_dir)
+        try:
+            python, log = _stage(extract_dir, app_dir, staging_dir)
+        except subprocess.CalledProcessError as e:
+            _remove_path(staging_dir)
+            output = e.output.decode('utf-8', errors='replace') if e.output else str(e)
+            return _install_failed(version, f"Update fehlgeschlagen (nichts geändert):\n{output}")
+        except Exception as e:
+            _remove_path(staging_dir)
+            return _install_failed(version, f"Update fehlgeschlagen (nichts geändert): {e}")
+    finally:
+        _remove_path(extract_dir)
+
+    try:
+        previous = _swap_in(app_dir, staging_dir)
+    except OSError as e:
+        _remove_path(staging_dir)
+        return _install_failed(version, f"Verzeichniswechsel fehlgeschlagen (nichts geändert): {e}")
+
+    # No deadline here: the health timeout starts when the new version starts
+    UPDATE_PENDING_PATH.write_text(json.dumps({
+        'app_dir': str(app_dir),
+        'previous_dir': str(previous),
+        'python': str(app_dir / python.relative_to(staging_dir)) if staging_dir in python.parents else str(python),
+        'version': manifest.get('version'),
+    }))
+
+    print(f"[INFO] Offline update to version {version} installed. Restarting.\n" + "\n".join(log))
+    _set_install_status("installed", version)
+    on_installed()
+
+
+def _install_failed(version, message):
+    print(f"[ERROR] Offline update failed: {message}")
+    _set_install_status("failed", version, message)
+
+
+# --- Post-swap health check and rollback ---
+def spawn_update_supervisor(child_pid):
+    """
+    Starts a detached supervisor from the code of the *current* (old) version.
+    It rolls the update back if the new version does not confirm in time.
+    """
+    if not UPDATE_PENDING_PATH.exists():
+        return
+    subprocess.Popen(
+        [sys.executable, str(_MODULE_PATH), 'supervise', '--pid', str(child_pid),
+         '--marker', str(UPDATE_PENDING_PATH.resolve())],
+        cwd=str(_MODULE_PATH.parent), start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def confirm_pending_update():
+    """
+    Called by the new version after startup. Waits until the config server answers,
+    then marks the update as successful and removes the previous version.
+    Runs in a background thread.
+    """
+    if not UPDATE_PENDING_PATH.exists():
+        return
+
+    def _confirm():
+        import urllib.request
+        try:
+            pending = json.loads(UPDATE_PENDING_PATH.read_text())
+        except (OSError, ValueError):
+            return
+
+        deadline = time.time() + HEALTH_TIMEOUT_S
+        while time.time() < deadline:
+            try:
+                with urllib.request.urlopen(HEALTH_CHECK_URL, timeout=2) as response:
+                    if response.status == 200:
+                        break
+            except Exception:
+                pass
+            time.sleep(2)
+        else:
+            print("[ERROR] Update health check failed. Waiting for rollback.")
+            return
+
+        try:
+            UPDATE_PENDING_PATH.unlink()
+        except OSError:
+            pass
+        print(f"[INFO] Update to version {pending.get('version')} confirmed healthy.")
+        _remove_path(Path(pending['previous_dir']))
+
+    threading.Thread(target=_confirm, daemon=True).start()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def rollback(pending):
+    """Restores the previous version and starts it."""
+    app_dir = Path(pending['app_dir'])
+    previous = Path(pending['previous_dir'])
+    if not previous.is_dir():
+        return False
+
+    failed = _failed_dir(app_dir)
+    _remove_path(failed)
+    os.rename(app_dir, failed)
+    os.rename(previous, app_dir)
+    (failed / UPDATE_PENDING_PATH.name).unlink(missing_ok=True)
+
+    subprocess.Popen([pending.get('python', sys.executable), 'darts-browser.py'],
+                     cwd=str(app_dir), start_new_session=True)
+    return True
+
+
+def _supervise(pid, marker):
+    marker = Path(marker)
+    try:
+        pending = json.loads(marker.read_text())
+    except (OSError, ValueError):
+        return 0
+
+    # Started together with the new version: its health timeout starts now
+    deadline = time.time() + HEALTH_TIMEOUT_S
+    while marker.exists():
+        if time.time() > deadline or not _pid_alive(pid):
+            # New version crashed or never became healthy
+            if _pid_alive(pid):
+                try:
+                    os.kill(pid, 15)
+                except OSError:
+                    pass
+                time.sleep(3)
+            return 0 if rollback(pending) else 1
+        time.sleep(2)
+    return 0
+
+
+# --- Bundle creation (build machine) ---
+def create_update_bundle(output_path, private_key_path, wheels_dir=None, repo_dir="."):
+    """Creates a signed update bundle from the git repository at repo_dir."""
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+    private_key = load_pem_private_key(Path(private_key_path).read_bytes(), password=None)
+
+    with tempfile.TemporaryDirectory(prefix="adarts-bundle-") as tmp:
+        tmp = Path(tmp)
+        subprocess.check_call(['git', 'bundle', 'create', str(tmp / "repo.bundle"), 'HEAD', '--branches', '--tags'],
+                              cwd=repo_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        version = subprocess.check_output(['git', 'describe', '--tags', '--always'],
+                                          cwd=repo_dir).decode('ascii').strip().lstrip('v')
+
+        files = {"repo.bundle": _sha256_file(tmp / "repo.bundle")}
+        sizes = {"repo.bundle": (tmp / "repo.bundle").stat().st_size}
+        wheels = sorted(Path(wheels_dir).glob('*.whl')) if wheels_dir else []
+        for wheel in wheels:
+            files[f"wheels/{wheel.name}"] = _sha256_file(wheel)
+            sizes[f"wheels/{wheel.name}"] = wheel.stat().st_size
+
+        manifest = json.dumps({
+            'format': BUNDLE_FORMAT,
+            'version': version,
+            'created': int(time.time()),
+            'files': files,
+            'sizes': sizes,
+        }, indent=2, sort_keys=True).encode('utf-8')
+
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED) as zf:
+            zf.writestr("manifest.json", manifest)
+            zf.writestr("manifest.sig", private_key.sign(manifest))
+            zf.write(tmp / "repo.bundle", arcname="repo.bundle")
+            for wheel in wheels:
+                zf.write(wheel, arcname=f"wheels/{wheel.name}")
+    return version
+
+
+def _generate_keys(private_path, public_path):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+    key = Ed25519PrivateKey.generate()
+    Path(private_path).write_bytes(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    Path(public_path).write_bytes(key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline update bundles for adarts-browser")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_keygen = sub.add_parser('keygen', help="Generate an Ed25519 signing key pair")
+    p_keygen.add_argument('--private', required=True)
+    p_keygen.add_argument('--public', default=UPDATE_PUBKEY_PATH.name)
+
+    p_build = sub.add_parser('build', help="Build a signed bundle from the current repository")
+    p_build.add_argument('--key', required=True, help="Private signing key (PEM)")
+    p_build.add_argument('--wheels', help="Directory with pre-built wheels")
+    p_build.add_argument('--out', required=True)
+
+    p_supervise = sub.add_parser('supervise', help=argparse.SUPPRESS)
+    p_supervise.add_argument('--pid', type=int, required=True)
+    p_supervise.add_argument('--marker', required=True)
+
+    args = parser.parse_args(argv)
+    if args.command == 'keygen':
+        _generate_keys(args.private, args.public)
+        print(f"Keys written: {args.private} (keep secret), {args.public} (deploy to devices)")
+    elif args.command == 'build':
+        version = create_update_bundle(args.out, args.key, args.wheels)
+        print(f"Bundle for version {version} written to {args.out}")
+    elif args.command == 'supervise':
+        return _supervise(args.pid, args.marker)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Disk cache management for the QtWebEngine profiles.
+
+Each BrowserView uses its own profile directory below the configured cache dir
+(``_cache/browser1``, ``_cache/browser2``, ...). Inside a profile we distinguish
+between login state (cookies, local storage, IndexedDB), which must survive a
+cleanup, and pure caches (HTTP cache, code cache, GPU cache), which can be
+evicted at any time.
+
+Deleting is never done in place: directories are renamed into a trash location
+first (instant) and removed by a background thread, so startup is not blocked.
+"""
+
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+from utils import APP_DIR, CLEAR_CACHE_MARKER_PATH
+
+# Subdirectory (set as QWebEngineProfile cachePath) holding the HTTP cache
+HTTP_CACHE_DIRNAME = "HttpCache"
+
+# Directories inside a profile that only contain cached data
+EVICTABLE_DIRS = (
+    HTTP_CACHE_DIRNAME,
+    "Code Cache",
+    "GPUCache",
+    "DawnCache",
+    "DawnGraphiteCache",
+    "Service Worker/CacheStorage",
+    "Service Worker/ScriptCache",
+)
+
+TRASH_PREFIX = ".trash-"
+
+CLEAR_SCOPE_ALL = "all"
+CLEAR_SCOPE_HTTP = "http"
+
+
+def get_cache_root(config):
+    """Returns the absolute cache root (relative to the app's directory)."""
+    return APP_DIR.resolve() / config.cache_dir.lstrip('/\\')
+
+
+def get_profile_dir(config, browser_id):
+    return get_cache_root(config) / f"browser{browser_id}"
+
+
+def get_http_cache_dir(config, browser_id):
+    return get_profile_dir(config, browser_id) / HTTP_CACHE_DIRNAME
+
+
+def get_legacy_cache_root(app_name=None):
+    """
+    Qt's default cache location of the profiles (QStandardPaths::CacheLocation/QtWebEngine),
+    where the HTTP caches were kept before they moved into the profile directories.
+    """
+    app_name = app_name if app_name is not None else Path(sys.argv[0]).name
+    if not app_name:
+        return None
+    base = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return base / app_name / "QtWebEngine"
+
+
+def _dir_size(path):
+    """Returns the size of all files below path in bytes."""
+    total = 0
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        total += _dir_size(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        total += entry.stat(follow_symlinks=False).st_blocks * 512
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return total
+
+
+def _iter_profiles(root):
+    """Yields (browser_id, path) for every profile directory below root."""
+    if not root.exists():
+        return
+    for path in sorted(root.iterdir()):
+        suffix = path.name[len("browser"):]
+        if path.is_dir() and path.name.startswith("browser") and suffix.isdigit():
+            yield int(suffix), path
+
+
+def _is_safe_cache_dir(cache_dir):
+    """Safeguard: Ensure we are never deleting the app directory, its parent or /."""
+    resolved_cache_dir = cache_dir.resolve()
+    resolved_app_dir = APP_DIR.resolve()
+    if resolved_cache_dir == resolved_app_dir or resolved_cache_dir == resolved_app_dir.parent:
+        print(f"[ERROR] Attempt to delete application root or parent directory as cache: {cache_dir}. Aborting.")
+        return False
+    if str(resolved_cache_dir) == '/':
+        print("[ERROR] Attempt to delete root directory as cache. Aborting.")
+        return False
+    return True
+
+
+# --- Reporting ---
+def get_cache_usage(config):
+    """
+    Reports disk usage per profile.
+    Returns a list of dicts: name, total, evictable, storage (all in bytes).
+    """
+    usage = []
+    for browser_id, profile in _iter_profiles(get_cache_root(config)):
+        total = _dir_size(profile)
+        evictable = sum(_dir_size(profile / d) for d in EVICTABLE_DIRS if (profile / d).exists())
+        usage.append({
+            'browser_id': browser_id,
+            'name': profile.name,
+            'total': total,
+            'evictable': evictable,
+            'storage': total - evictable,
+        })
+    return usage
+
+
+# --- Deferred Deletion ---
+def _trash_dir(cache_root):
+    return cache_root.parent / f"{TRASH_PREFIX}{cache_root.name}"
+
+
+def _delete_in_background(paths):
+    def _delete():
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+        if paths:
+            print(f"[INFO] Background cache deletion finished ({len(paths)} directories).")
+
+    if paths:
+        threading.Thread(target=_delete, name="cache-cleanup", daemon=True).start()
+
+
+def move_to_trash(path, trash_dir):
+    """Renames path into trash_dir. Returns the new location or None."""
+    try:
+        trash_dir.mkdir(parents=True, exist_ok=True)
+        target = trash_dir / f"{path.name}-{time.time_ns()}"
+        os.rename(path, target)
+        return target
+    except OSError as e:
+        print(f"[WARN] Could not move {path} to trash: {e}")
+        return None
+
+
+def evict_http_cache(config, browser_id):
+    """Moves all evictable cache directories of one profile to the trash. Keeps login state."""
+    profile = get_profile_dir(config, browser_id)
+    trash = _trash_dir(get_cache_root(config))
+    moved = []
+    for name in EVICTABLE_DIRS:
+        path = profile / name
+        if path.exists():
+            target = move_to_trash(path, trash)
+            if target:
+                moved.append(target)
+    return moved
+
+
+# --- Startup ---
+def _trash_legacy_caches(legacy_root):
+    """Moves the old HTTP caches (browser-N at Qt's default location) to the trash. Returns the paths to delete."""
+    if legacy_root is None:
+        return []
+    trash = _trash_dir(legacy_root)
+    to_delete = list(trash.iterdir()) if trash.exists() else []
+    if legacy_root.is_dir():
+        for path in legacy_root.iterdir():
+            if path.is_dir() and re.fullmatch(r"browser-\d+", path.name):
+                print(f"[INFO] Removing old HTTP cache {path}")
+                target = move_to_trash(path, trash)
+                if target:
+                    to_delete.append(target)
+    return to_delete
+
+
+def perform_startup_maintenance(config):
+    """
+    Handles clear requests and the size budget before the profiles are opened.
+    Only renames directories; the actual deletion runs in a background thread.
+    """
+    root = get_cache_root(config)
+    trash = _trash_dir(root)
+    to_delete = []
+
+    # Leftovers from a previous run that was interrupted while deleting
+    if trash.exists():
+        to_delete.extend(p for p in trash.iterdir())
+
+    if CLEAR_CACHE_MARKER_PATH.exists():
+        try:
+            scope = CLEAR_CACHE_MARKER_PATH.read_text().strip() or CLEAR_SCOPE_ALL
+        except OSError:
+            scope = CLEAR_SCOPE_ALL
+
+        if scope == CLEAR_SCOPE_HTTP:
+            print("[INFO] Clear cache marker found. Evicting HTTP caches (login is kept)...")
+            for browser_id, _ in _iter_profiles(root):
+                to_delete.extend(evict_http_cache(config, browser_id))
+        elif root.exists() and _is_safe_cache_dir(root):
+            print("[INFO] Clear cache marker found. Deleting complete cache...")
+            target = move_to_trash(root, trash)
+            if target:
+                to_delete.append(target)
+
+        try:
+            CLEAR_CACHE_MARKER_PATH.unlink()
+            print("[INFO] Marker file removed.")
+        except OSError as e:
+            print(f"[ERROR] Failed to remove clear cache marker: {e}")
+
+    to_delete.extend(_trash_legacy_caches(get_legacy_cache_root()))
+
+    budget = config.cache_max_mb * 1024 * 1024
+    if budget > 0:
+        for entry in get_cache_usage(config):
+            if entry['total'] > budget and entry['evictable'] > 0:
+                print(f"[INFO] {entry['name']} uses {entry['total'] // (1024 * 1024)} MB "
+                      f"(budget {config.cache_max_mb} MB). Evicting HTTP cache.")
+                to_delete.extend(evict_http_cache(config, entry['browser_id']))
+
+    _delete_in_background(to_delete)
@@ -1,9 +1,13 @@
 import configparser
+import io
 import os
 import uuid
 import subprocess
+from contextlib import contextmanager
 from pathlib import Path
-from utils import CONFIG_PATH, decrypt_value
+from utils import CONFIG_PATH
+from config_store import store_for, parse, revision
+from config_schema import compile_snapshot
 
 __version__ = "0.2.0"
 
@@ -31,54 +35,88 @@ def get_version_from_git():
         return None
 
 class AppConfig:
+    """
+    config.ini: raw options for writing (set, remove_option, save) and the
+    typed settings of config_schema.SETTINGS as attributes (e.g.
+    config.zoom_factor), read from an immutable ConfigSnapshot.
+    """
+
     def __init__(self, config_path=CONFIG_PATH):
-        # Allow # in values by restricting comment prefixes to ;
-        self._config = configparser.ConfigParser(comment_prefixes=';', inline_comment_prefixes=';')
         self._config_path = Path(config_path)
-        # If file exists, read it. If not, we just have an empty config which returns fallbacks.
-        if self._config_path.is_file():
-            self._config.read(self._config_path)
+        self._store = store_for(self._config_path)
+        self._snapshot = None
+        self._config = self._read()
 
         # Ensure device_id exists
-        if not self._config.has_section("main"):
-            self._config.add_section("main")
-        
         if not self._config.has_option("main", "device_id"):
-            # Generate a new UUID if not present
-            new_id = str(uuid.uuid4())
-            self._config.set("main", "device_id", new_id)
-            # Save immediately so the ID persists
-            self.save()
-
-    def save(self):
-        """Saves the current configuration to the file."""
-        with open(self._config_path, 'w') as f:
-            self._config.write(f)
+            with self._store.lock:
+                # Another thread may have created it in the meantime
+                self._config = self._read()
+                if not self._config.has_option("main", "device_id"):
+                    # Generate a new UUID if not present
+                    self.set("main", "device_id", str(uuid.uuid4()))
+                    # Save immediately so the ID persists
+                    self.save("device_id")
+
+    def _read(self):
+        # If the file doesn't exist, we just have an empty config which returns fallbacks.
+        try:
+            return parse(self._store.read_text())
+        except configparser.Error as e:
+            print(f"[WARN] Could not parse {self._config_path.name}: {e}. Using defaults.")
+            return parse("")
+
+    def reload(self):
+        """Re-reads the file (e.g. after a change through the config API)."""
+        self._config = self._read()
+        self._snapshot = None
+
+    @property
+    def snapshot(self):
+        """The typed settings (config_schema.ConfigSnapshot), compiled once per change."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = compile_snapshot(self._config)
+        return snapshot
+
+    def __getattr__(self, name):
+        # Only called for names that are not defined here: the typed settings
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.snapshot, name)
+
+    @property
+    def revision(self):
+        """Revision of the configuration as it would be written (see config_store.revision)."""
+        return revision(self.to_text())
+
+    def to_text(self):
+        """Returns the configuration as it is written to the file."""
+        buffer = io.StringIO()
+        self._config.write(buffer)
+        return buffer.getvalue()
+
+    def save(self, source="app"):
+        """
+        Saves the current configuration to the file (atomically, see config_store).
+        Returns the new revision, or None if nothing changed.
+        """
+        return self._store.write(self.to_text(), source)
 
     def set(self, section, option, value):
         """Sets a configuration value, creating the section if needed."""
         if not self._config.has_section(section):
             self._config.add_section(section)
         self._config.set(section, option, str(value))
+        self._snapshot = None
 
     # --- Read Accessors ---
 
     def get_board_url(self, board_number):
-        try:
-            board_id = self._config.get("boards", f"board{board_number}_id", fallback="").strip()
-            if not board_id:
-                return None
-            return f"https://play.autodarts.io/boards/{board_id}/follow"
-        except (configparser.NoSectionError, configparser.NoOptionError):
+        board_id = getattr(self.snapshot, f"board{board_number}_id", "").strip()
+        if not board_id:
             return None
-
-    @property
-    def device_id(self):
-        return self._config.get("main", "device_id")
-
-    @property
-    def device_name(self):
-        return self._config.get("main", "device_name", fallback="")
+        return f"{self.autodarts_url}/boards/{board_id}/follow"
 
     @property
     def version(self):
@@ -90,101 +128,8 @@ class AppConfig:
         # 2. Fallback to hardcoded version
         return __version__
 
-    @property
-    def use_custom_style(self):
-        return self._config.getboolean("style", "activate", fallback=False)
-
-    @property
-    def browser_count(self):
-        return self._config.getint("main", "browsers", fallback=1)
-
-    @property
-    def cache_dir(self):
-        return self._config.get("main", "cachedir", fallback="_cache/")
-
-    @property
-    def logos_enabled(self):
-        return self._config.getboolean("logos", "enable", fallback=False)
-
-    @property
-    def logos_local(self):
-        return self._config.getboolean("logos", "local", fallback=False)
-
-    @property
-    def logo_source(self):
-        return self._config.get("logos", "logo", fallback="")
-
-    @property
-    def autologin_enabled(self):
-        return self._config.getboolean("autologin", "enable", fallback=False)
-
-    @property
-    def autologin_max_attempts(self):
-        # Prefer 'attempts', fallback to 'versuche' for backward compatibility
-        return self._config.getint("autologin", "attempts", 
-                                  fallback=self._config.getint("autologin", "versuche", fallback=3))
-
-    @property
-    def autologin_username(self):
-        return self._config.get("autologin", "username", fallback="")
-
-    @property
-    def autologin_password(self):
-        # Try 'password' first
-        val = self._config.get("autologin", "password", fallback=None)
-        # If not found or empty, try legacy 'passwort'
-        if not val:
-            val = self._config.get("autologin", "passwort", fallback="")
-        
-        # Decrypt the value (returns plaintext if it wasn't encrypted)
-        return decrypt_value(val)
-
-    @property
-    def refresh_interval_min(self):
-        return self._config.getint("main", "refresh_interval_min", fallback=0)
-
-    @property
-    def zoom_factor(self):
-        try:
-            return self._config.getfloat("main", "zoom_factor", fallback=1.0)
-        except ValueError:
-            return 1.0
-
-    @property
-    def screen(self):
-        return self._config.getint("main", "screen", fallback=0)
-
-    @property
-    def web_auth_enabled(self):
-        return self._config.getboolean("security", "enable_auth", fallback=False)
-
-    @property
-    def web_username(self):
-        return self._config.get("security", "username", fallback="admin")
-
-    @property
-    def web_password_hash(self):
-        return self._config.get("security", "password_hash", fallback="")
-
-    @property
-    def show_qr_on_startup(self):
-        return self._config.getboolean("main", "show_qr", fallback=True)
-
-    @property
-    def qr_show_duration(self):
-        return self._config.getint("main", "qr_duration", fallback=15)
-    
-    @property
-    def view_mode(self):
-        # Migration logic for old boolean setting
-        old_auto_coords = self._config.getboolean("style", "auto_coords_mode", fallback=False)
-        if old_auto_coords:
-            return "Coords mode"
-            
-        return self._config.get("style", "view_mode", fallback="none")
-    
-    # --- Raw Access for Form Population ---
-    # Used by config_server to populate forms, allowing us to get raw values or defaults
+    # --- Raw Access ---
+    # Used by config_server and performance for options outside the schema
     def get(self, section, option, fallback=None):
         return self._config.get(section, option, fallback=fallback)
     
@@ -205,7 +150,23 @@ class AppConfig:
 
     def remove_option(self, section, option):
         """Removes an option from a section."""
+        self._snapshot = None
         return self._config.remove_option(section, option)
 
 def get_config():
-    return AppConfig(CONFIG_PATH)
\ No newline at end of file
+    return AppConfig(CONFIG_PATH)
+
+@contextmanager
+def config_transaction(source, config_path=CONFIG_PATH):
+    """
+    Read-modify-write of config.ini: yields a fresh AppConfig and saves it when
+    the block finishes without an exception. Other writers wait meanwhile.
+    """
+    store = store_for(config_path)
+    with store.lock:
+        config = AppConfig(config_path)
+        before = config.to_text()
+        yield config
+        # A file formatted by hand is not rewritten if nothing was set
+        if config.to_text() != before:
+            config.save(source)
\ No newline at end of file
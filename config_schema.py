@@ -0,0 +1,423 @@
+"""
+Schema of all settings in config.ini.
+
+Every setting is defined once here: section and option, type, default,
+allowed values, the attribute of the typed snapshot, the field of the web
+form (config_server.ConfigForm is built from it), legacy option names and the
+subsystem of the running browser that has to be reapplied when it changes.
+Settings marked SUBSYSTEM_RESTART only take effect after a restart (e.g. the
+number of views or the Chromium flags).
+
+When config.ini is loaded, AppConfig compiles it into a ConfigSnapshot: an
+immutable object with one typed attribute per setting, so reading a setting
+on a hot path (e.g. every page load) is an attribute lookup instead of
+configparser string parsing. Legacy options (autologin versuche/passwort,
+style auto_coords_mode) are migrated while compiling.
+
+The JSON API (/api/config) uses the schema as well. Secrets are write-only
+there: they are never returned, only whether they are set. The revision of a
+configuration (config_store.revision) is a hash of the config.ini text; the
+API returns it as ETag and accepts it in If-Match for optimistic concurrency.
+"""
+
+from credentials import credentials
+from operating_hours import parse_time, parse_days, DEFAULT_OPEN, DEFAULT_CLOSE, DEFAULT_WARMUP_MIN
+from performance import PRESET_CHOICES, DEFAULT_PRESET, validate_flags
+from request_filter import DEFAULT_BLOCK_DOMAINS, DEFAULT_BLOCK_TYPES
+
+API_VERSION = 1
+
+DEFAULT_AUTODARTS_URL = "https://play.autodarts.io"
+DEFAULT_AUTH_URL = "https://login.autodarts.io"
+
+# Applied by the config server itself (e.g. web login, device name)
+SUBSYSTEM_WEB = "web"
+SUBSYSTEM_SYNC = "sync"
+# Reapplied in the running browser (see AutodartsBrowser.apply_config_change)
+SUBSYSTEM_ZOOM = "zoom"
+SUBSYSTEM_PAGES = "pages"
+SUBSYSTEM_REFRESH = "refresh"
+SUBSYSTEM_MEMORY = "memory"
+SUBSYSTEM_LIFECYCLE = "lifecycle"
+SUBSYSTEM_SCHEDULE = "schedule"
+SUBSYSTEM_REQUEST_FILTER = "request_filter"
+SUBSYSTEM_AUTOLOGIN = "autologin"
+SUBSYSTEM_RESTART = "restart"
+
+VIEW_MODE_CHOICES = [
+    ('none', 'Keine Änderung'),
+    ('Segments mode', 'Segments Mode'),
+    ('Coords mode', 'Coords Mode'),
+    ('Live mode', 'Live Mode'),
+]
+
+SECRET_MASK = "********"
+TRUE_VALUES = ("true", "yes", "on", "1")
+FALSE_VALUES = ("false", "no", "off", "0")
+
+
+def _check_time(value):
+    parse_time(value)
+
+
+def _check_days(value):
+    parse_days(value)
+
+
+def _check_flags(value):
+    validate_flags(value)
+
+
+def _check_sync_url(value):
+    if value and not value.startswith(("http://", "https://")):
+        raise ValueError("erwartet eine http(s)-Adresse")
+
+
+def _autodarts_url(value, values):
+    return (value.strip() or DEFAULT_AUTODARTS_URL).rstrip("/")
+
+
+def _auth_url(value, values):
+    """Defaults to the Autodarts login server, or to autodarts_url for a stand-in server."""
+    if value.strip():
+        return value.strip().rstrip("/")
+    autodarts_url = values['autodarts_url']
+    return DEFAULT_AUTH_URL if autodarts_url == DEFAULT_AUTODARTS_URL else autodarts_url
+
+
+def _view_mode_from_auto_coords(parser):
+    # Old boolean setting, replaced by view_mode
+    try:
+        if parser.getboolean("style", "auto_coords_mode", fallback=False):
+            return "Coords mode"
+    except ValueError:
+        pass
+    return None
+
+
+class Setting:
+    """One option of config.ini."""
+
+    __slots__ = ("section", "option", "kind", "default", "subsystem", "attr", "field", "label", "choices",
+                 "minimum", "maximum", "check", "secret", "stored", "legacy", "migrate", "obsolete", "normalize")
+
+    def __init__(self, section, option, kind, default, subsystem, attr, field=None, label=None, choices=None,
+                 minimum=None, maximum=None, check=None, secret=False, stored=None, legacy=(), migrate=None,
+                 obsolete=(), normalize=None):
+        self.section = section
+        self.option = option
+        self.kind = kind  # "str", "int", "float", "bool" or "list"
+        self.default = default
+        self.subsystem = subsystem
+        self.attr = attr  # Attribute of ConfigSnapshot (and AppConfig)
+        self.field = field  # Field of the web form, None if only in config.ini/API
+        self.label = label
+        self.choices = choices  # [(value, label)]
+        self.minimum = minimum
+        self.maximum = maximum
+        self.check = check
+        self.secret = secret
+        self.stored = stored or option  # Option name in config.ini
+        self.legacy = legacy  # Old option names, read if the option is missing or empty
+        self.migrate = migrate  # migrate(parser) -> value from an old setting, or None
+        self.obsolete = obsolete  # (section, option) removed when the setting is written
+        self.normalize = normalize  # normalize(value, values read so far) -> value
+
+    @property
+    def key(self):
+        return f"{self.section}.{self.option}"
+
+    def parse(self, value):
+        """Converts a JSON or form value. Raises ValueError if it is not allowed."""
+        if self.kind == "bool":
+            if isinstance(value, bool):
+                return value
+            if isinstance(value, str) and value.lower() in TRUE_VALUES + FALSE_VALUES:
+                return value.lower() in TRUE_VALUES
+            raise ValueError("erwartet true oder false")
+        if self.kind in ("int", "float"):
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError("erwartet eine Zahl")
+            try:
+                number = int(value) if self.kind == "int" else float(value)
+            except ValueError:
+                raise ValueError("erwartet eine Zahl")
+            if self.kind == "int" and isinstance(value, float) and value != number:
+                raise ValueError("erwartet eine ganze Zahl")
+            if self.minimum is not None and number < self.minimum:
+                raise ValueError(f"mindestens {self.minimum}")
+            if self.maximum is not None and number > self.maximum:
+                raise ValueError(f"höchstens {self.maximum}")
+            return number
+        if self.kind == "list":
+            if isinstance(value, str):
+                value = [item for item in value.replace("\n", ",").split(",")]
+            if not isinstance(value, (list, tuple)) or not all(isinstance(item, str) for item in value):
+                raise ValueError("erwartet eine Liste von Texten")
+            return [item.strip() for item in value if item.strip()]
+        if not isinstance(value, str):
+            raise ValueError("erwartet einen Text")
+        # Spaces are part of a password
+        if not self.secret:
+            value = value.strip()
+        if self.choices is not None and value not in [key for key, _ in self.choices]:
+            raise ValueError(f"erlaubt: {', '.join(key for key, _ in self.choices)}")
+        if self.check is not None:
+            self.check(value)
+        return value
+
+    def read(self, raw):
+        """Converts the config.ini value (None if missing); invalid values give the default."""
+        if raw is None:
+            return list(self.default) if self.kind == "list" else self.default
+        if self.kind == "list":
+            return [item.strip() for item in raw.replace("\n", ",").split(",") if item.strip()]
+        if self.kind == "str":
+            return raw
+        try:
+            return self.parse(raw)
+        except ValueError:
+            return self.default
+
+    def lookup(self, parser):
+        """The raw config.ini value, falling back to the legacy option names. None if missing."""
+        raw = parser.get(self.section, self.stored, fallback=None)
+        for option in self.legacy:
+            if raw:
+                break
+            raw = parser.get(self.section, option, fallback=None) or raw
+        return raw
+
+    def value(self, parser, values):
+        """The typed value of the setting in parser (lists become tuples)."""
+        raw = self.migrate(parser) if self.migrate else None
+        value = self.read(raw if raw is not None else self.lookup(parser))
+        if self.normalize:
+            value = self.normalize(value, values)
+        return tuple(value) if self.kind == "list" else value
+
+    def to_ini(self, value):
+        if self.kind == "bool":
+            return "true" if value else "false"
+        if self.kind == "list":
+            return ", ".join(value)
+        return str(value)
+
+
+SETTINGS = (
+    Setting("main", "device_name", "str", "", SUBSYSTEM_WEB, "device_name",
+            "device_name", "Gerätename (optional)"),
+    Setting("main", "browsers", "int", 1, SUBSYSTEM_RESTART, "browser_count",
+            "browsers", "Anzahl Browser (1 oder 2)", minimum=1, maximum=2),
+    Setting("main", "refresh_interval_min", "int", 0, SUBSYSTEM_REFRESH, "refresh_interval_min",
+            "refresh_interval_min", "Auto-Refresh Intervall (Minuten, 0 = aus)", minimum=0),
+    Setting("main", "zoom_factor", "float", 1.0, SUBSYSTEM_ZOOM, "zoom_factor",
+            "zoom_factor", "Zoom-Faktor (z.B. 1.0 = 100%, 1.2 = 120%)", minimum=0.25, maximum=5.0),
+    Setting("main", "screen", "int", 0, SUBSYSTEM_RESTART, "screen",
+            "screen", "Bildschirm Index (0 = Hauptbildschirm)", minimum=0),
+    Setting("main", "cachedir", "str", "_cache/", SUBSYSTEM_RESTART, "cache_dir"),
+    Setting("main", "cache_max_mb", "int", 0, SUBSYSTEM_RESTART, "cache_max_mb",
+            "cache_max_mb", "Max. Cache-Größe pro Browser (MB, 0 = unbegrenzt)", minimum=0),
+    Setting("main", "memory_budget_mb", "int", 0, SUBSYSTEM_MEMORY, "memory_budget_mb",
+            "memory_budget_mb", "Speicherbudget pro Browser (MB, 0 = aus)", minimum=0),
+    Setting("main", "memory_growth_mb_h", "int", 0, SUBSYSTEM_MEMORY, "memory_growth_mb_h",
+            "memory_growth_mb_h", "Max. Speicherwachstum (MB pro Stunde, 0 = aus)", minimum=0),
+    Setting("main", "freeze_idle_min", "int", 0, SUBSYSTEM_LIFECYCLE, "freeze_idle_min",
+            "freeze_idle_min", "Einfrieren nach Leerlauf (Minuten, 0 = aus)", minimum=0),
+    Setting("main", "discard_idle_min", "int", 0, SUBSYSTEM_LIFECYCLE, "discard_idle_min",
+            "discard_idle_min", "Entladen nach Leerlauf (Minuten, 0 = aus)", minimum=0),
+    Setting("main", "show_qr", "bool", True, SUBSYSTEM_WEB, "show_qr_on_startup",
+            "show_qr", "QR-Code beim Start anzeigen"),
+    Setting("main", "qr_duration", "int", 15, SUBSYSTEM_WEB, "qr_show_duration",
+            "qr_duration", "Anzeigedauer des QR-Codes (Sekunden)", minimum=0),
+    # Can point to a local stand-in server (benchmarks/mock_autodarts.py)
+    Setting("main", "autodarts_url", "str", "", SUBSYSTEM_RESTART, "autodarts_url", normalize=_autodarts_url),
+    Setting("main", "auth_url", "str", "", SUBSYSTEM_RESTART, "auth_url", normalize=_auth_url),
+    Setting("main", "prewarm", "bool", True, SUBSYSTEM_RESTART, "prewarm_enabled"),
+    Setting("performance", "preset", "str", DEFAULT_PRESET, SUBSYSTEM_RESTART, "performance_preset",
+            "performance_preset", "Leistungsprofil", choices=PRESET_CHOICES),
+    Setting("performance", "chromium_flags", "str", "", SUBSYSTEM_RESTART, "performance_chromium_flags",
+            "performance_chromium_flags", "Zusätzliche Chromium-Flags", check=_check_flags),
+    Setting("schedule", "enable", "bool", False, SUBSYSTEM_SCHEDULE, "schedule_enabled",
+            "schedule_enable", "Betriebszeiten aktivieren"),
+    Setting("schedule", "open", "str", DEFAULT_OPEN, SUBSYSTEM_SCHEDULE, "schedule_open",
+            "schedule_open", "Öffnet um (HH:MM)", check=_check_time),
+    Setting("schedule", "close", "str", DEFAULT_CLOSE, SUBSYSTEM_SCHEDULE, "schedule_close",
+            "schedule_close", "Schließt um (HH:MM)", check=_check_time),
+    Setting("schedule", "days", "str", "", SUBSYSTEM_SCHEDULE, "schedule_days",
+            "schedule_days", "Tage (leer = täglich)", check=_check_days),
+    Setting("schedule", "warmup_min", "int", DEFAULT_WARMUP_MIN, SUBSYSTEM_SCHEDULE, "schedule_warmup_min",
+            "schedule_warmup_min", "Vorlauf vor Öffnung (Minuten)", minimum=0, maximum=120),
+    Setting("boards", "board1_id", "str", "", SUBSYSTEM_RESTART, "board1_id",
+            "board1_id", "Board 1 ID (UUID)"),
+    Setting("boards", "board2_id", "str", "", SUBSYSTEM_RESTART, "board2_id",
+            "board2_id", "Board 2 ID (UUID)"),
+    Setting("style", "activate", "bool", False, SUBSYSTEM_PAGES, "use_custom_style",
+            "style_activate", "Eigenes Styling (style.css) aktivieren"),
+    Setting("style", "view_mode", "str", "none", SUBSYSTEM_PAGES, "view_mode",
+            "view_mode", "Automatische Ansicht", choices=VIEW_MODE_CHOICES,
+            migrate=_view_mode_from_auto_coords,
+            # auto_coords_mode ended up in [boards] in an old version
+            obsolete=(("style", "auto_coords_mode"), ("boards", "auto_coords_mode"))),
+    Setting("logos", "enable", "bool", False, SUBSYSTEM_RESTART, "logos_enabled",
+            "logos_enable", "Logo anzeigen"),
+    Setting("logos", "local", "bool", False, SUBSYSTEM_RESTART, "logos_local",
+            "logos_local", "Lokales Logo verwenden"),
+    Setting("logos", "logo", "str", "", SUBSYSTEM_RESTART, "logo_source",
+            "logos_logo", "Logo URL oder Pfad"),
+    Setting("request_filter", "enable", "bool", False, SUBSYSTEM_RESTART, "request_filter_enabled"),
+    Setting("request_filter", "dry_run", "bool", False, SUBSYSTEM_REQUEST_FILTER, "request_filter_dry_run"),
+    Setting("request_filter", "block_domains", "list", DEFAULT_BLOCK_DOMAINS, SUBSYSTEM_REQUEST_FILTER,
+            "request_filter_block_domains"),
+    Setting("request_filter", "allow_domains", "list", (), SUBSYSTEM_REQUEST_FILTER,
+            "request_filter_allow_domains"),
+    Setting("request_filter", "block_types", "list", DEFAULT_BLOCK_TYPES, SUBSYSTEM_REQUEST_FILTER,
+            "request_filter_block_types"),
+    Setting("autologin", "enable", "bool", False, SUBSYSTEM_AUTOLOGIN, "autologin_enabled",
+            "autologin_enable", "Auto-Login aktivieren"),
+    Setting("autologin", "username", "str", "", SUBSYSTEM_AUTOLOGIN, "autologin_username",
+            "autologin_username", "Benutzername (Email)"),
+    # Encrypted (see credentials); ConfigSnapshot.autologin_password decrypts it
+    Setting("autologin", "password", "str", "", SUBSYSTEM_AUTOLOGIN, "autologin_password_token",
+            "autologin_password", "Passwort", secret=True, legacy=("passwort",)),
+    Setting("autologin", "attempts", "int", 3, SUBSYSTEM_AUTOLOGIN, "autologin_max_attempts",
+            "autologin_attempts", "Max. Login-Versuche", minimum=0, legacy=("versuche",)),
+    Setting("security", "enable_auth", "bool", False, SUBSYSTEM_WEB, "web_auth_enabled",
+            "security_enable", "Passwortschutz für Konfiguration aktivieren"),
+    Setting("security", "username", "str", "admin", SUBSYSTEM_WEB, "web_username",
+            "security_username", "Benutzername (Standard: admin)"),
+    Setting("security", "password", "str", "", SUBSYSTEM_WEB, "web_password_hash",
+            "security_new_password", "Neues Passwort setzen (leer lassen zum Beibehalten)",
+            secret=True, stored="password_hash"),
+    # Central config source polled by config_sync ("" = off)
+    Setting("sync", "url", "str", "", SUBSYSTEM_SYNC, "sync_url", check=_check_sync_url),
+    Setting("sync", "interval_s", "int", 300, SUBSYSTEM_SYNC, "sync_interval_s", minimum=10, maximum=86400),
+)
+
+SETTINGS_BY_KEY = {setting.key: setting for setting in SETTINGS}
+FORM_SETTINGS = tuple(setting for setting in SETTINGS if setting.field)
+# Settings the central config source (config_sync) may change: not the web login, the sync
+# itself, the servers the kiosk talks to or the Chromium flags (a proxy or remote debugging
+# port would redirect or expose the kiosk)
+SYNC_SETTINGS = frozenset(setting.key for setting in SETTINGS
+                          if setting.section not in ("security", "sync")
+                          and setting.key not in ("main.autodarts_url", "main.auth_url",
+                                                  "performance.chromium_flags"))
+
+
+class ConfigSnapshot:
+    """Typed, read-only values of a config.ini: one attribute per setting (Setting.attr)."""
+
+    __slots__ = tuple(setting.attr for setting in SETTINGS) + ("device_id", "_autologin_password")
+
+    def __init__(self, values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_autologin_password", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ConfigSnapshot is read-only ({name})")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"ConfigSnapshot is read-only ({name})")
+
+    @property
+    def autologin_password(self):
+        """Decrypted on first use (returns plaintext if it wasn't encrypted)."""
+        if self._autologin_password is None:
+            object.__setattr__(self, "_autologin_password", credentials.decrypt(self.autologin_password_token))
+        return self._autologin_password
+
+
+def compile_snapshot(parser):
+    """Compiles a parsed config.ini (ConfigParser) into a ConfigSnapshot."""
+    values = {}
+    for setting in SETTINGS:
+        values[setting.attr] = setting.value(parser, values)
+    values['device_id'] = parser.get("main", "device_id", fallback=None)
+    return ConfigSnapshot(values)
+
+
+def current_values(snapshot):
+    """Returns {section: {option: value}} of all settings; secrets are masked."""
+    values = {}
+    for setting in SETTINGS:
+        value = getattr(snapshot, setting.attr)
+        if setting.secret:
+            value = SECRET_MASK if value else ""
+        elif setting.kind == "list":
+            value = list(value)
+        values.setdefault(setting.section, {})[setting.option] = value
+    return values
+
+
+def describe():
+    """Returns the schema as JSON-serialisable list."""
+    return [{
+        'key': s.key,
+        'type': s.kind,
+        'default': list(s.default) if s.kind == "list" else s.default,
+        'subsystem': s.subsystem,
+        'choices': [key for key, _ in s.choices] if s.choices else None,
+        'minimum': s.minimum,
+        'maximum': s.maximum,
+        'secret': s.secret,
+    } for s in SETTINGS]
+
+
+def secret_matches(setting, value, stored):
+    """True if the secret value equals the stored one (encrypted, or hashed for the web password)."""
+    if not stored:
+        return False
+    if setting.key == "security.password":
+        # Only the config server compares passwords: keep werkzeug out of the kiosk start
+        from werkzeug.security import check_password_hash
+        return check_password_hash(stored, value)
+    return credentials.decrypt(stored) == value
+
+
+def validate_patch(patch, snapshot):
+    """
+    Validates a partial update {section: {option: value}} against the schema and
+    the current values of snapshot (a ConfigSnapshot).
+    Returns (changes, errors): changes maps Setting -> new value for the values
+    that actually change, errors maps "section.option" -> message.
+    """
+    current = current_values(snapshot)
+    changes = {}
+    errors = {}
+    if not isinstance(patch, dict):
+        return changes, {'': "erwartet ein Objekt {Abschnitt: {Option: Wert}}"}
+    for section, options in patch.items():
+        if not isinstance(options, dict):
+            errors[section] = "erwartet ein Objekt {Option: Wert}"
+            continue
+        for option, value in options.items():
+            key = f"{section}.{option}"
+            setting = SETTINGS_BY_KEY.get(key)
+            if setting is None:
+                errors[key] = "unbekannte Einstellung"
+                continue
+            try:
+                parsed = setting.parse(value)
+            except ValueError as e:
+                errors[key] = str(e)
+                continue
+            if setting.secret:
+                # An empty or masked secret keeps the stored one (like the form), the same one is no change
+                if parsed and parsed != SECRET_MASK and \
+                        not secret_matches(setting, parsed, getattr(snapshot, setting.attr)):
+                    changes[setting] = parsed
+            elif parsed != current[section][option]:
+                changes[setting] = parsed
+
+    # Checks across settings, on the resulting values
+    schedule = dict(current['schedule'], **{s.option: v for s, v in changes.items() if s.section == "schedule"})
+    if schedule['enable'] and schedule['open'] == schedule['close'] and not errors:
+        errors['schedule.close'] = "Öffnungs- und Schließzeit dürfen nicht gleich sein"
+    return changes, errors
+
+
+def subsystems(settings):
+    """Sorted names of the subsystems affected by the given settings."""
+    return sorted({setting.subsystem for setting in settings})
@@ -1,21 +1,44 @@
+import json
 import threading
 import time
 import zipfile
 import io
 import os
 import shutil
+import tempfile
 from datetime import timedelta
 from functools import wraps
-from flask import Flask, render_template, request, flash, redirect, url_for, session, send_file, make_response
+from flask import Flask, render_template, request, flash, redirect, url_for, session, send_file, make_response, g, jsonify
 from wtforms import Form, StringField, IntegerField, BooleanField, PasswordField, TextAreaField, FloatField, validators, SelectField
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 
 # Import centralized configuration and utilities
-from config import get_config
+from config import get_config, config_transaction
+from config_store import config_store
+from credentials import credentials
+from bundle_update import apply_update_bundle, install_status
+from cache_manager import get_cache_usage, CLEAR_SCOPE_ALL, CLEAR_SCOPE_HTTP
+from address_service import address_service
+from startup import load_startup_trace, import_time_report, IMPORT_REPORT_TARGETS
+from refresh_scheduler import refresh_scheduler
+from memory_watchdog import memory_watchdog
+from page_timing import page_timing
+import profiling
+from stall_detector import stall_detector
+from request_filter import request_filter
+from load_retry import load_retry
+from page_lifecycle import page_lifecycle
+from operating_hours import operating_schedule
+import config_schema
+from config_schema import FORM_SETTINGS, SUBSYSTEM_RESTART, SUBSYSTEM_WEB, SUBSYSTEM_SYNC
+from live_config import live_config
+from fleet import fleet, FleetError, COMMANDS, DEFAULT_TIMEOUT_S
+from config_sync import config_sync
+import metrics
 from utils import (
     APP_DIR, CSS_PATH, THEMES_DIR, LOG_PATH, CONFIG_PATH, THEME_REPO_BASE_URL,
-    trigger_restart, trigger_reload, request_clear_cache, encrypt_value,
+    trigger_restart, trigger_reload, request_clear_cache,
     git_check_update, git_perform_update,
     fetch_available_themes, fetch_theme_content, get_local_theme_metadata
 )
@@ -40,6 +63,19 @@ def background_update_check():
     except Exception as e:
         print(f"[WARN] Auto-update check failed: {e}")
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+        metrics.HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
 @app.context_processor
 def inject_device_info():
     config = get_config()
@@ -51,6 +87,24 @@ def inject_device_info():
         global_update_available=is_available
     )
 
+def _basic_auth_ok(config):
+    auth = request.authorization
+    return bool(auth and auth.username == config.web_username and config.web_password_hash
+                and check_password_hash(config.web_password_hash, auth.password or ""))
+
+def api_login_required(f):
+    """Like login_required, but answers 401 (JSON) and accepts HTTP Basic auth for scripts."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        config = get_config()
+        if config.web_auth_enabled and not session.get('logged_in') and not _basic_auth_ok(config):
+            response = jsonify(error="Anmeldung erforderlich")
+            response.status_code = 401
+            response.headers["WWW-Authenticate"] = 'Basic realm="adarts-browser"'
+            return response
+        return f(*args, **kwargs)
+    return decorated_function
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -88,52 +142,80 @@ def login():
             
     return render_template('login.html')
 
+@app.route('/qr.png')
+def qr_code():
+    """QR code pointing to this config server, served from the address service cache."""
+    try:
+        png = address_service.get_qr_png()
+    except Exception as e:
+        print(f"[ERROR] Failed to generate QR code: {e}")
+        return "QR-Code konnte nicht erzeugt werden.", 500
+    response = make_response(png)
+    response.headers["Content-Type"] = "image/png"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics (no login, so a central monitoring host can scrape it). ?format=json for JSON."""
+    wants_json = request.args.get('format') == 'json' or \
+        request.accept_mimetypes.best_match(['text/plain', 'application/json']) == 'application/json'
+    if wants_json:
+        return jsonify(metrics.registry.to_dict())
+    response = make_response(metrics.registry.render_prometheus())
+    response.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    return response
+
 @app.route('/logout')
 def logout():
     session.pop('logged_in', None)
     flash('Ausgeloggt.', 'info')
     return redirect(url_for('login'))
 
+def _setting_validator(setting):
+    """Validates a form field with the rules of its setting (see config_schema.SETTINGS)."""
+    def validate(form, field):
+        # Empty numbers are reported by the field itself, empty passwords keep the stored one
+        if field.data is None or (setting.secret and not field.data):
+            return
+        try:
+            setting.parse(field.data)
+        except ValueError as e:
+            raise validators.ValidationError(str(e))
+    return validate
+
+_FIELD_CLASSES = {"int": IntegerField, "float": FloatField}
+
+def _form_field(setting):
+    if setting.kind == "bool":
+        return BooleanField(setting.label)
+    if setting.choices:
+        return SelectField(setting.label, choices=setting.choices)
+    field_class = PasswordField if setting.secret else _FIELD_CLASSES.get(setting.kind, StringField)
+    return field_class(setting.label, [_setting_validator(setting)])
+
 class ConfigForm(Form):
-    # Main Section
-    device_name = StringField('Gerätename (optional)')
-    browsers = IntegerField('Anzahl Browser (1 oder 2)', [validators.NumberRange(min=1, max=2)])
-    refresh_interval_min = IntegerField('Auto-Refresh Intervall (Minuten, 0 = aus)')
-    zoom_factor = FloatField('Zoom-Faktor (z.B. 1.0 = 100%, 1.2 = 120%)')
-    screen = IntegerField('Bildschirm Index (0 = Hauptbildschirm)')
-    
-    # Boards Section
-    board1_id = StringField('Board 1 ID (UUID)')
-    board2_id = StringField('Board 2 ID (UUID)')
-    
-    # Style Section
-    style_activate = BooleanField('Eigenes Styling (style.css) aktivieren')
-    view_mode = SelectField('Automatische Ansicht', choices=[
-        ('none', 'Keine Änderung'),
-        ('Segments mode', 'Segments Mode'),
-        ('Coords mode', 'Coords Mode'),
-        ('Live mode', 'Live Mode')
-    ])
-    
-    # Logos Section
-    logos_enable = BooleanField('Logo anzeigen')
-    logos_local = BooleanField('Lokales Logo verwenden')
-    logos_logo = StringField('Logo URL oder Pfad')
-    
-    # Autologin Section
-    autologin_enable = BooleanField('Auto-Login aktivieren')
-    autologin_username = StringField('Benutzername (Email)')
-    autologin_password = PasswordField('Passwort')
-    autologin_attempts = IntegerField('Max. Login-Versuche')
-
-    # Security Section
-    security_enable = BooleanField('Passwortschutz für Konfiguration aktivieren')
-    security_username = StringField('Benutzername (Standard: admin)')
-    security_new_password = PasswordField('Neues Passwort setzen (leer lassen zum Beibehalten)')
-    
-    # Advanced / QR
-    show_qr = BooleanField('QR-Code beim Start anzeigen')
-    qr_duration = IntegerField('Anzeigedauer des QR-Codes (Sekunden)')
+    """One field per setting with a form field in config_schema.SETTINGS (added below)."""
+
+    def validate_schedule_close(self, field):
+        if self.schedule_enable.data and (field.data or "").strip() == (self.schedule_open.data or "").strip():
+            raise validators.ValidationError("Öffnungs- und Schließzeit dürfen nicht gleich sein")
+
+for _setting in FORM_SETTINGS:
+    setattr(ConfigForm, _setting.field, _form_field(_setting))
+
+def store_setting(config, setting, value):
+    """Sets a parsed value in config: secrets encrypted or hashed, obsolete options removed."""
+    if setting.key == "autologin.password":
+        value = credentials.encrypt(value)
+    elif setting.key == "security.password":
+        value = generate_password_hash(value)
+    else:
+        value = setting.to_ini(value)
+    config.set(setting.section, setting.stored, value)
+    for section, option in setting.obsolete:
+        if config.has_section(section):
+            config.remove_option(section, option)
 
 class CSSForm(Form):
     css_content = TextAreaField('CSS Inhalt')
@@ -237,93 +319,28 @@ def index():
     form = ConfigForm(request.form)
 
     if request.method == 'POST' and form.validate():
-        # Update config object from form data using the centralized AppConfig methods
-        config.set('main', 'device_name', form.device_name.data)
-        config.set('main', 'browsers', form.browsers.data)
-        config.set('main', 'refresh_interval_min', form.refresh_interval_min.data)
-        config.set('main', 'zoom_factor', form.zoom_factor.data)
-        config.set('main', 'screen', form.screen.data)
-
-        config.set('boards', 'board1_id', form.board1_id.data)
-        config.set('boards', 'board2_id', form.board2_id.data)
-
-        if not config.has_section('style'): config.add_section('style')
-        config.set('style', 'activate', str(form.style_activate.data).lower())
-        config.set('style', 'view_mode', form.view_mode.data)
-        
-        # Cleanup old setting to prevent conflicts
-        if config.has_section('style'):
-            config.remove_option('style', 'auto_coords_mode')
-            # Also remove from [boards] if it was ever there (mistake in previous version)
-            if config.has_section('boards'):
-                config.remove_option('boards', 'auto_coords_mode')
-
-        config.set('logos', 'enable', str(form.logos_enable.data).lower())
-        config.set('logos', 'local', str(form.logos_local.data).lower())
-        config.set('logos', 'logo', form.logos_logo.data)
-
-        config.set('autologin', 'enable', str(form.autologin_enable.data).lower())
-        config.set('autologin', 'username', form.autologin_username.data)
-        
-        # Only update password if a new one is provided
-        new_autologin_pw = form.autologin_password.data
-        if new_autologin_pw:
-            encrypted_pw = encrypt_value(new_autologin_pw)
-            config.set('autologin', 'password', encrypted_pw)
-            
-        config.set('autologin', 'attempts', form.autologin_attempts.data)
+        with config_transaction("web") as config:
+            for setting in FORM_SETTINGS:
+                value = getattr(form, setting.field).data
+                # Passwords are only updated if a new one is provided
+                if setting.secret and not value:
+                    continue
+                store_setting(config, setting, setting.parse(value))
 
-        # Security Section
-        config.set('security', 'enable_auth', str(form.security_enable.data).lower())
-        config.set('security', 'username', form.security_username.data)
-        
-        # Only update hash if a new password is provided
-        new_pass = form.security_new_password.data
-        if new_pass:
-            hashed_pw = generate_password_hash(new_pass)
-            config.set('security', 'password_hash', hashed_pw)
-            
-        # Advanced / QR
-        config.set('main', 'show_qr', str(form.show_qr.data).lower())
-        config.set('main', 'qr_duration', form.qr_duration.data)
-
-        config.save()
+        credentials.invalidate()
         trigger_restart()
         flash('Konfiguration gespeichert! Anwendung startet neu...', 'success')
         return redirect(url_for('index'))
+    elif request.method == 'POST':
+        for name, errors in form.errors.items():
+            flash(f'{getattr(form, name).label.text}: {", ".join(errors)}', 'danger')
 
     # Populate form from config (GET request)
     try:
-        # Use fallback values that match AppConfig properties defaults
-        form.device_name.data = config.get('main', 'device_name', fallback='')
-        form.browsers.data = config.getint('main', 'browsers', fallback=1)
-        form.refresh_interval_min.data = config.getint('main', 'refresh_interval_min', fallback=0)
-        form.zoom_factor.data = config.getfloat('main', 'zoom_factor', fallback=1.0)
-        form.screen.data = config.getint('main', 'screen', fallback=0)
-        
-        # QR Defaults
-        form.show_qr.data = config.getboolean('main', 'show_qr', fallback=True)
-        form.qr_duration.data = config.getint('main', 'qr_duration', fallback=15)
-        
-        form.board1_id.data = config.get('boards', 'board1_id', fallback='')
-        form.board2_id.data = config.get('boards', 'board2_id', fallback='')
-        
-        form.style_activate.data = config.getboolean('style', 'activate', fallback=False)
-        form.view_mode.data = config.view_mode # Use property to handle migration logic
-        
-        form.logos_enable.data = config.getboolean('logos', 'enable', fallback=False)
-        form.logos_local.data = config.getboolean('logos', 'local', fallback=False)
-        form.logos_logo.data = config.get('logos', 'logo', fallback='')
-        
-        form.autologin_enable.data = config.getboolean('autologin', 'enable', fallback=False)
-        form.autologin_username.data = config.get('autologin', 'username', fallback='')
-        # Do not populate password field for security and because it might be encrypted
-        form.autologin_password.data = "" 
-        # Retrieve attempts from config.py using the new name
-        form.autologin_attempts.data = config.getint('autologin', 'attempts', fallback=3)
-
-        form.security_enable.data = config.getboolean('security', 'enable_auth', fallback=False)
-        form.security_username.data = config.get('security', 'username', fallback='admin')
+        snapshot = config.snapshot
+        for setting in FORM_SETTINGS:
+            # Passwords are never sent to the browser (the autologin one is encrypted anyway)
+            getattr(form, setting.field).data = "" if setting.secret else getattr(snapshot, setting.attr)
 
     except Exception as e:
         flash(f'Fehler beim Laden der Konfiguration: {e}', 'danger')
@@ -333,7 +350,220 @@ def index():
         'id': config.device_id
     }
 
-    return render_template('config.html', form=form, device_info=device_info)
+    return render_template('config.html', form=form, device_info=device_info, offline_update=install_status())
+
+# --- Config API ---
+def _api_error(status, message, details=None):
+    response = jsonify(api_version=config_schema.API_VERSION, error=message, details=details or {})
+    response.status_code = status
+    return response
+
+def _config_response(config, revision, **extra):
+    response = jsonify(api_version=config_schema.API_VERSION, revision=revision, device_id=config.device_id,
+                       config=config_schema.current_values(config.snapshot), **extra)
+    response.headers["ETag"] = f'"{revision}"'
+    return response
+
+@app.route('/api/config', methods=['GET'])
+@api_login_required
+def api_get_config():
+    config = get_config()
+    return _config_response(config, config_store.current_revision())
+
+@app.route('/api/config/schema', methods=['GET'])
+@api_login_required
+def api_config_schema():
+    return jsonify(api_version=config_schema.API_VERSION, settings=config_schema.describe())
+
+class ConfigPatchError(Exception):
+    def __init__(self, status, message, details=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details or {}
+
+def apply_config_patch(patch, source, if_match=None):
+    """
+    Applies a partial update {section: {option: value}} (config API, central
+    sync). With if_match the update is only applied to that revision. Only the
+    affected subsystems are reapplied; settings that need a restart trigger one.
+    Returns (config, revision, changed, subsystems, restart, applied).
+    Raises ConfigPatchError.
+    """
+    # Read-check-write under the store's lock; saved when the block is left
+    with config_transaction(source) as config:
+        current_revision = config_store.current_revision()
+        if if_match and if_match.strip() != "*" and \
+                current_revision not in [tag.strip().strip('"') for tag in if_match.split(",")]:
+            raise ConfigPatchError(412, "Die Konfiguration wurde inzwischen geändert", {'revision': current_revision})
+
+        changes, errors = config_schema.validate_patch(patch, config.snapshot)
+        if errors:
+            raise ConfigPatchError(400, "Ungültige Einstellungen", errors)
+        if not changes:
+            return config, current_revision, [], [], False, False
+
+        for setting, value in changes.items():
+            store_setting(config, setting, value)
+
+        subsystems = config_schema.subsystems(changes)
+        restart = SUBSYSTEM_RESTART in subsystems
+        revision = config.revision
+        if not restart:
+            live_config.expect(revision)
+
+    credentials.invalidate()
+    if SUBSYSTEM_WEB in subsystems:
+        metrics.INFO.clear()
+        metrics.INFO.set(1, device_id=config.device_id, device_name=config.device_name, version=config.version)
+    if SUBSYSTEM_SYNC in subsystems:
+        config_sync.reconfigure()
+    if restart:
+        trigger_restart()
+        applied = False
+    else:
+        applied = live_config.apply([s for s in subsystems if s not in (SUBSYSTEM_WEB, SUBSYSTEM_SYNC)])
+    changed = sorted(setting.key for setting in changes)
+    print(f"[INFO] Config changed by {source}: {', '.join(changed)} "
+          f"({'restart' if restart else 'subsystems: ' + ', '.join(subsystems)})")
+    return config, revision, changed, subsystems, restart, applied
+
+@app.route('/api/config', methods=['PATCH'])
+@api_login_required
+def api_patch_config():
+    """
+    Partial update {section: {option: value}}. With If-Match the update is only
+    applied to that revision (412 otherwise).
+    """
+    patch = request.get_json(force=True, silent=True)
+    if patch is None:
+        return _api_error(400, "Ungültiges JSON")
+    try:
+        config, revision, changed, subsystems, restart, applied = \
+            apply_config_patch(patch, "api", request.headers.get("If-Match"))
+    except ConfigPatchError as e:
+        return _api_error(e.status, e.message, e.details)
+    return _config_response(config, revision, changed=changed, subsystems=subsystems, restart=restart,
+                            applied=applied)
+
+def _request_text():
+    return request.get_data(cache=False).decode("utf-8", errors="replace")
+
+@app.route('/api/css', methods=['PUT'])
+@api_login_required
+def api_put_css():
+    """Replaces style.css (the views pick it up through the file watcher)."""
+    if not write_css(_request_text()):
+        return _api_error(500, "Fehler beim Speichern der CSS-Datei")
+    return jsonify(api_version=config_schema.API_VERSION, saved="style.css")
+
+@app.route('/api/themes/<name>', methods=['PUT'])
+@api_login_required
+def api_put_theme(name):
+    if not save_theme(name, _request_text()):
+        return _api_error(400, f"Ungültiger Theme-Name '{name}'")
+    return jsonify(api_version=config_schema.API_VERSION, saved=_sanitize_theme_name(name))
+
+@app.route('/api/commands/<name>', methods=['POST'])
+@api_login_required
+def api_command(name):
+    if name == 'reload':
+        trigger_reload()
+    elif name == 'restart':
+        trigger_restart()
+    else:
+        return _api_error(404, f"Unbekannter Befehl '{name}'")
+    print(f"[INFO] Command '{name}' received through the API")
+    return jsonify(api_version=config_schema.API_VERSION, command=name)
+
+# --- Fleet ---
+def _fleet_action(action, targets, data):
+    """Runs one fleet action. data is a dict (form or JSON). Raises FleetError."""
+    if action == 'probe':
+        return fleet.probe(targets)
+    if action == 'config':
+        patch = data.get('patch')
+        if isinstance(patch, str):
+            try:
+                patch = json.loads(patch)
+            except ValueError as e:
+                raise FleetError(f"Ungültiges JSON: {e}")
+        return fleet.push_config(patch, targets)
+    if action == 'css':
+        css = data.get('css')
+        if css is None:
+            css = read_css()
+        return fleet.push_css(css, targets)
+    if action == 'theme':
+        name = data.get('theme') or ""
+        css = data.get('css')
+        if css is None:
+            css = load_theme(name)
+        if not name or css is None:
+            raise FleetError(f"Theme '{name}' nicht gefunden")
+        return fleet.push_theme(name, css, targets)
+    if action in COMMANDS:
+        return fleet.command(action, targets)
+    raise FleetError(f"Unbekannte Aktion '{action}'")
+
+@app.route('/fleet', methods=['GET', 'POST'])
+@login_required
+def fleet_page():
+    if request.method == 'POST':
+        action = request.form.get('action')
+        try:
+            if action == 'add':
+                timeout = request.form.get('timeout', type=float) or DEFAULT_TIMEOUT_S
+                peer = fleet.add_peer(request.form.get('url', ''), request.form.get('username', ''),
+                                      request.form.get('password', ''), timeout)
+                flash(f'Gerät "{peer.label}" hinzugefügt.', 'success')
+            elif action == 'remove':
+                if fleet.registry.remove(request.form.get('device_id')):
+                    flash('Gerät entfernt.', 'success')
+            else:
+                targets = request.form.getlist('targets')
+                if not targets:
+                    flash('Bitte mindestens ein Gerät auswählen.', 'warning')
+                else:
+                    report = _fleet_action(action, targets, request.form.to_dict())
+                    category = 'success' if not report.failed else 'warning'
+                    flash(f'{report.succeeded} von {len(report.results)} Geräten erfolgreich '
+                          f'({report.elapsed_ms} ms).', category)
+        except FleetError as e:
+            flash(str(e), 'danger')
+        return redirect(url_for('fleet_page'))
+
+    return render_template('fleet.html', peers=fleet.registry.all(), report=fleet.last_report,
+                           themes=list_themes(), commands=COMMANDS)
+
+@app.route('/api/fleet', methods=['GET'])
+@api_login_required
+def api_fleet():
+    report = fleet.last_report
+    return jsonify(api_version=config_schema.API_VERSION,
+                   peers=[{key: value for key, value in peer.to_dict().items() if key != 'password_token'}
+                          for peer in fleet.registry.all()],
+                   last_report=report.to_dict() if report else None)
+
+@app.route('/api/fleet', methods=['POST'])
+@api_login_required
+def api_fleet_action():
+    """
+    {"action": "config|css|theme|reload|restart|probe", "targets": [device_id, ...],
+     "patch": {...}, "css": "...", "theme": "name"}. Without targets all peers are used;
+    css/theme default to the local style.css or theme file.
+    """
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        return _api_error(400, "Ungültiges JSON")
+    try:
+        report = _fleet_action(data.get('action'), data.get('targets') or None, data)
+    except FleetError as e:
+        return _api_error(400, str(e))
+    response = jsonify(api_version=config_schema.API_VERSION, **report.to_dict())
+    # 207: some peers failed
+    response.status_code = 200 if not report.failed else 207
+    return response
 
 @app.route('/css', methods=['GET', 'POST'])
 @login_required
@@ -560,14 +790,33 @@ def reload_pages():
 @app.route('/clear_cache', methods=['POST'])
 @login_required
 def clear_cache():
-    if request_clear_cache():
-        flash('Cache-Löschung angefordert! Anwendung startet neu...', 'info')
+    scope = request.form.get('scope', CLEAR_SCOPE_ALL)
+    if scope not in (CLEAR_SCOPE_ALL, CLEAR_SCOPE_HTTP):
+        scope = CLEAR_SCOPE_ALL
+
+    if request_clear_cache(scope):
+        if scope == CLEAR_SCOPE_HTTP:
+            flash('HTTP-Cache-Löschung angefordert (Login bleibt erhalten)! Anwendung startet neu...', 'info')
+        else:
+            flash('Cache-Löschung angefordert! Anwendung startet neu...', 'info')
     else:
         flash('Fehler beim Anfordern der Cache-Löschung.', 'danger')
     
     return redirect(url_for('index'))
 
 
+@app.route('/rotate_key', methods=['POST'])
+@login_required
+def rotate_key():
+    try:
+        with config_store.lock:
+            count = credentials.rotate_key(get_config())
+        flash(f'Neuer Schlüssel erzeugt, {count} Passwort/Passwörter neu verschlüsselt.', 'success')
+    except Exception as e:
+        print(f"[ERROR] Key rotation failed: {e}")
+        flash(f'Fehler beim Erneuern des Schlüssels: {e}', 'danger')
+    return redirect(url_for('index'))
+
 @app.route('/logs')
 @login_required
 def view_logs():
@@ -588,6 +837,84 @@ def view_logs():
     return render_template('logs.html', logs=logs)
 
 
+@app.route('/diagnostics')
+@login_required
+def diagnostics(import_reports=None):
+    config = get_config()
+    cache_usage = get_cache_usage(config)
+    return render_template('diagnostics.html', cache_usage=cache_usage, cache_max_mb=config.cache_max_mb,
+                           startup_trace=load_startup_trace(), import_reports=import_reports,
+                           refresh=refresh_scheduler.snapshot(), memory=memory_watchdog.snapshot(),
+                           timing=page_timing.summary(), stalls=stall_detector.snapshot(),
+                           filtering=request_filter.snapshot(), retries=load_retry.snapshot(),
+                           lifecycle=page_lifecycle.snapshot(), schedule=operating_schedule.snapshot(),
+                           config_journal=config_store.snapshot(), sync=config_sync.snapshot())
+
+
+@app.route('/diagnostics/imports', methods=['POST'])
+@login_required
+def diagnostics_imports():
+    # Each report imports the module in a fresh interpreter, this takes a few seconds
+    reports = []
+    for module, description in IMPORT_REPORT_TARGETS:
+        report = import_time_report(module)
+        report['description'] = description
+        reports.append(report)
+    return diagnostics(import_reports=reports)
+
+
+def _profiling_seconds():
+    return request.form.get('seconds', 10, type=int) or 10
+
+def _download(content, filename, mimetype='text/plain'):
+    response = make_response(content)
+    response.headers["Content-Type"] = mimetype
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return response
+
+@app.route('/profiling/sample', methods=['POST'])
+@login_required
+def profiling_sample():
+    """Sampling profile of the Qt main thread and/or the Flask threads as collapsed stacks (flamegraph)."""
+    threads = request.form.get('threads', profiling.THREADS_ALL)
+    try:
+        folded, samples = profiling.sample_stacks(_profiling_seconds(), threads=threads)
+    except profiling.ProfilerBusy as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('diagnostics'))
+    print(f"[INFO] Sampling profile finished ({samples} samples, threads: {threads}).")
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return _download(folded, f"adarts-profile-{threads}-{timestamp}.folded")
+
+@app.route('/profiling/cprofile', methods=['POST'])
+@login_required
+def profiling_cprofile():
+    """cProfile of the Qt main thread, as text report or as pstats file."""
+    try:
+        report, stats = profiling.profile_main_thread(_profiling_seconds())
+    except profiling.ProfilerBusy as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('diagnostics'))
+    except RuntimeError as e:
+        flash(f'Profiling fehlgeschlagen: {e}', 'danger')
+        return redirect(url_for('diagnostics'))
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    if request.form.get('format') == 'pstats':
+        return _download(stats, f"adarts-main-{timestamp}.prof", 'application/octet-stream')
+    return _download(report, f"adarts-main-{timestamp}.txt")
+
+@app.route('/profiling/tracemalloc', methods=['POST'])
+@login_required
+def profiling_tracemalloc():
+    """Allocations made during the time window (tracemalloc snapshot diff)."""
+    try:
+        report = profiling.tracemalloc_diff(_profiling_seconds())
+    except profiling.ProfilerBusy as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('diagnostics'))
+    timestamp = time.strftime("%Y%m%d-%H%M%S")
+    return _download(report, f"adarts-tracemalloc-{timestamp}.txt")
+
 @app.route('/check_update', methods=['POST'])
 @login_required
 def check_update():
@@ -616,9 +943,44 @@ def perform_update():
         trigger_restart()
     else:
         flash(f"Fehler beim Update: {msg}", 'danger')
-        
+
     return redirect(url_for('index'))
 
+@app.route('/upload_update', methods=['POST'])
+@login_required
+def upload_update():
+    if 'update_bundle' not in request.files or request.files['update_bundle'].filename == '':
+        flash('Keine Datei ausgewählt.', 'danger')
+        return redirect(url_for('index'))
+
+    file = request.files['update_bundle']
+    # Store the upload next to the app (not in /tmp, which may be a small tmpfs)
+    fd, tmp_path = tempfile.mkstemp(prefix='.adarts-upload-', suffix='.adbundle', dir=APP_DIR.resolve().parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            shutil.copyfileobj(file.stream, f)
+        # Verified and extracted here; checkout, pip and the swap run in the background
+        success, msg = apply_update_bundle(tmp_path, _restart_after_update)
+    finally:
+        os.unlink(tmp_path)
+
+    if success:
+        print(f"[INFO] Offline update verified: {msg}")
+        flash(f"{msg} Die Anwendung startet danach automatisch neu.", 'success')
+        session.pop('update_available', None)
+        UPDATE_CACHE['available'] = False
+    else:
+        print(f"[ERROR] Offline update failed: {msg}")
+        flash(f"Fehler beim Offline-Update: {msg}", 'danger')
+
+    return redirect(url_for('index'))
+
+def _restart_after_update():
+    # The swap moved the watched trigger files to .previous, so touching
+    # .restart_trigger would not be noticed: ask the browser directly
+    if not live_config.apply([SUBSYSTEM_RESTART]):
+        trigger_restart()
+
 @app.route('/backup')
 @login_required
 def create_backup():
@@ -692,11 +1054,14 @@ def restore_backup():
                     # Create directory if needed
                     if member.is_dir():
                         target_path.mkdir(parents=True, exist_ok=True)
+                    elif member.filename == 'config.ini':
+                        config_store.write(zf.read(member).decode('utf-8'), "restore")
                     else:
                         target_path.parent.mkdir(parents=True, exist_ok=True)
                         with open(target_path, 'wb') as f:
                             f.write(zf.read(member))
             
+            credentials.reload()
             flash('Backup erfolgreich wiederhergestellt! Anwendung startet neu...', 'success')
             trigger_restart()
             return redirect(url_for('index'))
@@ -709,8 +1074,19 @@ def restore_backup():
         return redirect(url_for('index'))
 
 
+def _apply_synced_config(patch):
+    """Config part of the central sync (see config_sync). Returns the changed settings."""
+    try:
+        return apply_config_patch(patch, "sync")[2]
+    except ConfigPatchError as e:
+        details = "; ".join(f"{key}: {message}" for key, message in e.details.items())
+        raise ValueError(e.message + (f" ({details})" if details else ""))
+
 def start_server(host='0.0.0.0', port=5000):
     """Starts the Flask server in a daemon thread with retry logic."""
+    config = get_config()
+    metrics.INFO.set(1, device_id=config.device_id, device_name=config.device_name, version=config.version)
+
     def run():
         retries = 10
         while retries > 0:
@@ -735,4 +1111,9 @@ def start_server(host='0.0.0.0', port=5000):
 
     # Start auto-update check thread
     update_thread = threading.Thread(target=background_update_check, daemon=True)
-    update_thread.start()
\ No newline at end of file
+    update_thread.start()
+
+    # Central config sync (only polls if [sync] url is set)
+    config_sync.start(apply_config=_apply_synced_config,
+                      read_css=read_css, write_css=write_css, load_theme=load_theme,
+                      save_theme=save_theme, delete_theme=delete_theme)
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""
+Transactional storage of config.ini.
+
+All writers (web form, config API, key rotation, device ID creation, backup
+restore) go through one store per file. A transaction holds the store's lock
+from reading the file to writing it, so concurrent Flask requests can't
+overwrite each other's changes. Writes are atomic: the text goes to a
+temporary file next to config.ini, is fsynced and renamed over the old file,
+so the file watcher in darts-browser.py never sees a half-written file.
+Writing the same content again is skipped.
+
+Every write appends a line (JSON) to config.journal: time, revision, previous
+revision, source and the changed options. The watcher compares the revision
+of the file with the last one it handled, so rewrites without a change don't
+restart the application; the journal tells which part of the application
+wrote a revision. External edits (e.g. with an editor) have no journal entry.
+
+This module has no Qt imports and doesn't know AppConfig; see
+config.config_transaction() for the read-modify-write helper.
+"""
+
+import configparser
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+from utils import CONFIG_PATH, CONFIG_JOURNAL_PATH
+
+# The journal is rotated to config.journal.1 beyond this size
+JOURNAL_MAX_BYTES = 256 * 1024
+RECENT_ENTRIES = 50
+
+
+def revision(text):
+    """Revision of a config.ini text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def parse(text):
+    """Parses a config.ini text the way AppConfig does. Raises configparser.Error if invalid."""
+    # Allow # in values by restricting comment prefixes to ;
+    parser = configparser.ConfigParser(comment_prefixes=';', inline_comment_prefixes=';')
+    parser.read_string(text)
+    return parser
+
+
+def changed_options(old_text, new_text):
+    """Sorted "section.option" names whose value differs between the two texts."""
+    try:
+        old, new = parse(old_text), parse(new_text)
+    except configparser.Error:
+        return []
+    changed = set()
+    for section in set(old.sections()) | set(new.sections()):
+        old_items = dict(old.items(section, raw=True)) if old.has_section(section) else {}
+        new_items = dict(new.items(section, raw=True)) if new.has_section(section) else {}
+        changed.update(f"{section}.{option}" for option in set(old_items) | set(new_items)
+                       if old_items.get(option) != new_items.get(option))
+    return sorted(changed)
+
+
+def atomic_write(path, text, mode=None):
+    """Writes text to path via a temporary file, fsync and rename; keeps the file mode unless mode is given."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    if mode is None:
+        try:
+            mode = path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself (not supported on every platform)
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class ConfigStore:
+    """Reads and writes one config file and its journal. Thread safe."""
+
+    def __init__(self, path=CONFIG_PATH, journal_path=CONFIG_JOURNAL_PATH):
+        self.path = Path(path)
+        self.journal_path = Path(journal_path)
+        # Held for a whole read-modify-write; reentrant for nested saves
+        self.lock = threading.RLock()
+        self._cache = None  # (stat key, text)
+        self._recent = None
+
+    def _stat_key(self):
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def read_text(self):
+        """Returns the file content ("" if it doesn't exist). Unchanged files are not read again."""
+        with self.lock:
+            key = self._stat_key()
+            if key is None:
+                return ""
+            if self._cache is None or self._cache[0] != key:
+                self._cache = (key, self.path.read_text(encoding="utf-8"))
+            return self._cache[1]
+
+    def current_revision(self):
+        return revision(self.read_text())
+
+    def write(self, text, source):
+        """
+        Writes text atomically and records it in the journal.
+        Returns the new revision, or None if the file already had this content.
+        """
+        with self.lock:
+            old_text = self.read_text()
+            if text == old_text and self.path.exists():
+                metrics.CONFIG_WRITES.inc(source=source, result="unchanged")
+                return None
+            atomic_write(self.path, text)
+            self._cache = (self._stat_key(), text)
+            entry = {
+                'time': datetime.now().isoformat(timespec="seconds"),
+                'revision': revision(text),
+                'previous': revision(old_text) if old_text else None,
+                'source': source,
+                'changed': changed_options(old_text, text),
+            }
+            self._append_journal(entry)
+        metrics.CONFIG_WRITES.inc(source=source, result="written")
+        return entry['revision']
+
+    # --- Journal ---
+    def _append_journal(self, entry):
+        """Caller must hold the lock. Journal errors never fail the write itself."""
+        self._load_recent().append(entry)
+        try:
+            if self.journal_path.exists() and self.journal_path.stat().st_size > JOURNAL_MAX_BYTES:
+                os.replace(self.journal_path, self.journal_path.with_name(self.journal_path.name + ".1"))
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"[WARN] Could not write config journal: {e}")
+
+    def _load_recent(self):
+        """The last journal entries, read from the file once. Caller must hold the lock."""
+        if self._recent is None:
+            self._recent = deque(maxlen=RECENT_ENTRIES)
+            try:
+                with open(self.journal_path, encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            self._recent.append(json.loads(line))
+                        except ValueError:
+                            continue  # Torn last line after a power loss
+            except OSError:
+                pass
+        return self._recent
+
+    def journal_entry(self, rev):
+        """The newest journal entry of revision rev, or None (e.g. edited by hand)."""
+        with self.lock:
+            for entry in reversed(self._load_recent()):
+                if entry.get('revision') == rev:
+                    return entry
+        return None
+
+    def snapshot(self, limit=10):
+        """Current revision and the last journal entries, newest first (for the diagnostics page)."""
+        with self.lock:
+            recent = list(self._load_recent())[-limit:]
+            return {'revision': self.current_revision(), 'entries': recent[::-1]}
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def store_for(path):
+    """The store of a config file (one per file, so all writers share its lock)."""
+    path = Path(path).absolute()
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            journal_path = CONFIG_JOURNAL_PATH if path == CONFIG_PATH.absolute() \
+                else path.with_name(path.stem + ".journal")
+            store = _stores[path] = ConfigStore(path, journal_path)
+        return store
+
+
+config_store = store_for(CONFIG_PATH)
@@ -0,0 +1,403 @@
+"""
+Pull-based config sync from a central source.
+
+As an alternative to pushing from the Flotte page (fleet.py), each kiosk can
+poll a central URL for its desired settings, CSS and themes ([sync] url,
+interval_s). The URL is per device: {device_id} in it is replaced by the
+device ID, otherwise the ID is appended as the last path segment. The central
+source answers with JSON:
+
+    {"device_id": "...",         the device the answer is for
+     "version": "42",            opaque version of the desired state
+     "base": "41",               version a delta applies to (null: full state)
+     "config": {"main": {"zoom_factor": 1.2}},   like PATCH /api/config
+     "css": "...",               style.css (missing: unchanged)
+     "themes": {"Dark": "...", "Old": null}}     theme files (null: delete)
+
+The source is trusted only if its answers are signed (Ed25519 over the body,
+base64 in the X-Signature header, verified with sync_signing.pub; the key
+pair is made with "python bundle_update.py keygen") or, without that key,
+if it is an https URL. Only the settings in config_schema.SYNC_SETTINGS can
+be changed: not the web login ([security]), [sync] itself, the Autodarts
+server URLs or the Chromium flags, so a spoofed source can't lock out the
+venue or redirect the kiosk.
+
+Polls are conditional: the last ETag goes in If-None-Match (304: nothing to
+do) and the last version in ?since=, so the source can send only what
+changed since then. A delta whose base is not our version is dropped and the
+full state is fetched instead. Changes go through the same paths as the web
+interface (config_server.apply_config_patch, write_css, save_theme), and only
+settings, CSS or themes that actually differ from the local ones are written.
+
+Polls are spread with jitter (first poll and every interval), errors back off
+exponentially and a Retry-After of the source is honored, so a hundred
+kiosks do not poll in lockstep. The last applied state (without passwords)
+is kept in sync_cache.json (mode 0600): after a restart the first poll is
+conditional, and if the source is unreachable then, the last-good state is
+applied from the cache.
+
+This module has no Flask imports; config_server.start_server() passes the
+functions that apply the changes.
+"""
+
+import base64
+import gzip
+import http.client
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlencode, quote
+
+import metrics
+from config import get_config
+from config_schema import SETTINGS_BY_KEY, SYNC_SETTINGS
+from config_store import atomic_write
+from load_retry import backoff_delay
+from utils import SYNC_CACHE_PATH, SYNC_PUBKEY_PATH
+
+REQUEST_TIMEOUT_S = 15
+# Base64 Ed25519 signature of the response body (see verify_response)
+SIGNATURE_HEADER = "X-Signature"
+# The first poll after start is spread over this time
+STARTUP_SPREAD_S = 15
+RETRY_BASE_S = 30
+MAX_BACKOFF_S = 1800
+INTERVAL_JITTER = 0.2
+
+RESULT_NOT_MODIFIED = "not_modified"
+RESULT_UNCHANGED = "unchanged"
+RESULT_CHANGED = "changed"
+RESULT_ERROR = "error"
+
+
+class SyncError(Exception):
+    """The central source could not be read or its answer not applied."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def device_url(url, device_id):
+    """The poll URL of one device."""
+    if "{device_id}" in url:
+        return url.replace("{device_id}", quote(device_id, safe=""))
+    return f"{url.rstrip('/')}/{quote(device_id, safe='')}"
+
+
+def merge_state(state, payload):
+    """New desired state: payload is a delta on state, or the full state if it has no base."""
+    if payload.get('base') is None:
+        state = {'config': {}, 'css': None, 'themes': {}}
+    else:
+        state = {'config': {section: dict(options) for section, options in state.get('config', {}).items()},
+                 'css': state.get('css'), 'themes': dict(state.get('themes', {}))}
+    for section, options in (payload.get('config') or {}).items():
+        # Passwords are not cached: config.ini keeps them (encrypted or hashed) anyway
+        state['config'].setdefault(section, {}).update(
+            (option, value) for option, value in options.items()
+            if not getattr(SETTINGS_BY_KEY.get(f"{section}.{option}"), 'secret', False))
+    if payload.get('css') is not None:
+        state['css'] = payload['css']
+    for name, css in (payload.get('themes') or {}).items():
+        if css is None:
+            state['themes'].pop(name, None)
+        else:
+            state['themes'][name] = css
+    return state
+
+
+def verify_response(url, data, signature, device_id, pubkey_path=SYNC_PUBKEY_PATH):
+    """
+    Checks that an answer comes from the central source: signed with the key of
+    sync_signing.pub (and meant for this device), or, without that key, received
+    over https. Returns the parsed payload. Raises SyncError.
+    """
+    signed = pubkey_path.exists()
+    if signed:
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives.serialization import load_pem_public_key
+
+        if not signature:
+            raise SyncError(f"Antwort ist nicht signiert ({SIGNATURE_HEADER} fehlt)")
+        try:
+            load_pem_public_key(pubkey_path.read_bytes()).verify(base64.b64decode(signature), data)
+        except (InvalidSignature, ValueError):
+            raise SyncError(f"Ungültige Signatur (passt nicht zu {pubkey_path.name})")
+    elif not url.startswith("https://"):
+        raise SyncError(f"Ohne {pubkey_path.name} werden nur https-Quellen akzeptiert")
+    try:
+        payload = json.loads(data)
+    except ValueError as e:
+        raise SyncError(f"Ungültiges JSON: {e}")
+    _check_payload(payload)
+    # A signed answer for another device must not be replayed to this one
+    if signed and payload.get('device_id') != device_id:
+        raise SyncError(f"Antwort ist für ein anderes Gerät ({payload.get('device_id')})")
+    return payload
+
+
+def _check_payload(payload):
+    if not isinstance(payload, dict):
+        raise SyncError("Antwort ist kein JSON-Objekt")
+    if not isinstance(payload.get('config') or {}, dict) or \
+            not all(isinstance(options, dict) for options in (payload.get('config') or {}).values()):
+        raise SyncError("'config' muss {Abschnitt: {Option: Wert}} sein")
+    blocked = sorted(f"{section}.{option}" for section, options in payload['config'].items()
+                     for option in options if f"{section}.{option}" not in SYNC_SETTINGS) \
+        if payload.get('config') else []
+    if blocked:
+        raise SyncError(f"Nicht zentral änderbar: {', '.join(blocked)}")
+    if payload.get('css') is not None and not isinstance(payload['css'], str):
+        raise SyncError("'css' muss ein Text sein")
+    themes = payload.get('themes') or {}
+    if not isinstance(themes, dict) or not all(css is None or isinstance(css, str) for css in themes.values()):
+        raise SyncError("'themes' muss {Name: CSS oder null} sein")
+
+
+class ConfigSync:
+    """Polls the central source in a background thread. Thread safe."""
+
+    def __init__(self, cache_path=SYNC_CACHE_PATH):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._handlers = None
+        self._cache = None
+        self._cache_applied = False
+        self.polls = 0
+        self.changes = 0
+        self.failures = 0
+        self.last_poll = None
+        self.last_result = None
+        self.last_change = None
+        self.last_error = None
+        self.next_poll_at = None
+
+    # --- Cache ---
+    def _load_cache(self):
+        """{'url', 'etag', 'version', 'state'} of the last applied state. Caller must hold the lock."""
+        if self._cache is None:
+            try:
+                self._cache = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._cache = {}
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Could not read {self.cache_path.name}: {e}")
+                self._cache = {}
+        return self._cache
+
+    def _save_cache(self, cache):
+        with self._lock:
+            self._cache = cache
+        try:
+            atomic_write(self.cache_path, json.dumps(cache), mode=0o600)
+        except OSError as e:
+            print(f"[WARN] Could not write {self.cache_path.name}: {e}")
+
+    # --- Polling ---
+    def _fetch(self, url, cache, device_id, full=False):
+        """GET of the device URL. Returns (etag, payload), payload None for 304. Raises SyncError."""
+        if not SYNC_PUBKEY_PATH.exists() and not url.startswith("https://"):
+            raise SyncError(f"Ohne {SYNC_PUBKEY_PATH.name} werden nur https-Quellen akzeptiert")
+        headers = {'Accept': "application/json", 'Accept-Encoding': "gzip",
+                   'User-Agent': f"adarts-browser/{get_config().version}"}
+        if not full and cache.get('url') == url:
+            if cache.get('etag'):
+                headers['If-None-Match'] = cache['etag']
+            if cache.get('version') is not None:
+                url += ("&" if "?" in url else "?") + urlencode({'since': cache['version']})
+        request = urllib.request.Request(url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_S) as response:
+                data = response.read()
+                if response.headers.get("Content-Encoding") == "gzip":
+                    data = gzip.decompress(data)
+                etag = response.headers.get("ETag")
+                signature = response.headers.get(SIGNATURE_HEADER)
+                # After redirects: the address the answer really came from
+                final_url = response.geturl()
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return cache.get('etag'), None
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            raise SyncError(f"HTTP {e.code}",
+                            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            raise SyncError(f"{type(e).__name__}: {getattr(e, 'reason', e)}")
+        return etag, verify_response(final_url, data, signature, device_id)
+
+    def _apply(self, config_patch, css, themes):
+        """Applies what differs from the local files. Returns the changed items (["config", "css", "theme:X"])."""
+        handlers = self._handlers
+        changed = []
+        if config_patch:
+            try:
+                if handlers['apply_config'](config_patch):
+                    changed.append("config")
+            except ValueError as e:
+                raise SyncError(str(e))
+        if css is not None and css != handlers['read_css']():
+            if not handlers['write_css'](css):
+                raise SyncError("Fehler beim Speichern der CSS-Datei")
+            changed.append("css")
+        for name, theme_css in themes.items():
+            if theme_css is None:
+                if handlers['load_theme'](name) is not None and handlers['delete_theme'](name):
+                    changed.append(f"theme:{name}")
+            elif theme_css != handlers['load_theme'](name):
+                if not handlers['save_theme'](name, theme_css):
+                    raise SyncError(f"Ungültiger Theme-Name '{name}'")
+                changed.append(f"theme:{name}")
+        for item in changed:
+            metrics.SYNC_CHANGES.inc(kind=item.split(":")[0])
+        return changed
+
+    def poll_once(self):
+        """Polls the source once and applies changes. Returns a RESULT_* value."""
+        config = get_config()
+        if not config.sync_url:
+            return None
+        url = device_url(config.sync_url, config.device_id)
+        with self._lock:
+            cache = dict(self._load_cache())
+        try:
+            etag, payload = self._fetch(url, cache, config.device_id)
+            if payload is not None and payload.get('base') is not None and \
+                    (cache.get('url') != url or payload['base'] != cache.get('version')):
+                # A delta on a state we don't have: fetch everything
+                etag, payload = self._fetch(url, cache, config.device_id, full=True)
+                if payload is not None and payload.get('base') is not None:
+                    raise SyncError("Die Quelle liefert nur Änderungen, aber nicht den vollständigen Stand")
+            if payload is None:
+                result, changed = RESULT_NOT_MODIFIED, []
+            else:
+                changed = self._apply(payload.get('config'), payload.get('css'), payload.get('themes') or {})
+                previous = cache.get('state', {}) if cache.get('url') == url else {}
+                self._save_cache({'url': url, 'etag': etag, 'version': payload.get('version', etag),
+                                  'state': merge_state(previous, payload)})
+                result = RESULT_CHANGED if changed else RESULT_UNCHANGED
+        except SyncError as e:
+            with self._lock:
+                self.polls += 1
+                self.failures += 1
+                self.last_poll = time.strftime("%d.%m. %H:%M:%S")
+                self.last_result = RESULT_ERROR
+                self.last_error = str(e)
+            metrics.SYNC_POLLS.inc(result=RESULT_ERROR)
+            raise
+        with self._lock:
+            self.polls += 1
+            self.failures = 0
+            self.last_poll = time.strftime("%d.%m. %H:%M:%S")
+            self.last_result = result
+            self.last_error = None
+            self._cache_applied = True
+            if changed:
+                self.changes += 1
+                self.last_change = f"{self.last_poll}: {', '.join(changed)}"
+        metrics.SYNC_POLLS.inc(result=result)
+        if changed:
+            print(f"[INFO] Central config applied (version {payload.get('version', etag)}): {', '.join(changed)}")
+        return result
+
+    def apply_cached(self):
+        """Applies the last-good state from the cache once (source unreachable at start)."""
+        with self._lock:
+            if self._cache_applied:
+                return []
+            self._cache_applied = True
+            cache = dict(self._load_cache())
+        state = cache.get('state')
+        if not state:
+            return []
+        config_patch = {section: {option: value for option, value in options.items()
+                                  if f"{section}.{option}" in SYNC_SETTINGS}
+                        for section, options in (state.get('config') or {}).items()}
+        changed = self._apply(config_patch, state.get('css'), state.get('themes') or {})
+        print(f"[INFO] Central config unreachable, last-good version {cache.get('version')} applied"
+              + (f": {', '.join(changed)}" if changed else " (no changes)"))
+        return changed
+
+    def _next_delay(self, error=None):
+        interval = get_config().sync_interval_s
+        if error is None:
+            return backoff_delay(1, base=interval, maximum=interval, jitter=INTERVAL_JITTER)
+        delay = backoff_delay(self.failures, base=RETRY_BASE_S, maximum=max(interval, MAX_BACKOFF_S))
+        return max(delay, error.retry_after or 0)
+
+    def _run(self):
+        delay = random.uniform(0, STARTUP_SPREAD_S)
+        while True:
+            with self._lock:
+                self.next_poll_at = time.time() + delay
+            if self._wake.wait(delay):
+                self._wake.clear()
+            if not get_config().sync_url:
+                with self._lock:
+                    self.next_poll_at = None
+                self._wake.wait()
+                self._wake.clear()
+                delay = random.uniform(0, STARTUP_SPREAD_S)
+                continue
+            try:
+                self.poll_once()
+                delay = self._next_delay()
+            except SyncError as e:
+                print(f"[WARN] Central config sync failed: {e}")
+                try:
+                    self.apply_cached()
+                except SyncError as cache_error:
+                    print(f"[WARN] Last-good config could not be applied: {cache_error}")
+                delay = self._next_delay(e)
+            except Exception as e:
+                print(f"[ERROR] Central config sync: {e}")
+                delay = self._next_delay(SyncError(str(e)))
+
+    def configure(self, **handlers):
+        """
+        Sets the functions that apply changes: apply_config(patch) -> changed settings
+        (ValueError if invalid), read_css(), write_css(css), load_theme(name),
+        save_theme(name, css), delete_theme(name).
+        """
+        self._handlers = handlers
+
+    def start(self, **handlers):
+        """Sets the handlers (see configure) and starts the poll thread."""
+        self.configure(**handlers)
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="config-sync", daemon=True)
+        self._thread.start()
+
+    def reconfigure(self):
+        """[sync] changed: poll now (or stop polling)."""
+        self._wake.set()
+
+    def snapshot(self):
+        """Returns configuration and state (for the diagnostics page)."""
+        config = get_config()
+        with self._lock:
+            cache = self._load_cache()
+            return {
+                'enabled': bool(config.sync_url),
+                'url': device_url(config.sync_url, config.device_id) if config.sync_url else None,
+                'interval_s': config.sync_interval_s,
+                'version': cache.get('version'),
+                'polls': self.polls,
+                'changes': self.changes,
+                'failures': self.failures,
+                'last_poll': self.last_poll,
+                'last_result': self.last_result,
+                'last_change': self.last_change,
+                'last_error': self.last_error,
+                'next_poll_in_s': max(0, round(self.next_poll_at - time.time())) if self.next_poll_at else None,
+            }
+
+
+config_sync = ConfigSync()
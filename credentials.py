@@ -0,0 +1,170 @@
+"""
+Credential encryption.
+
+Secrets in config.ini (currently the autologin password) are encrypted with a
+Fernet key stored in .secret.key. The service loads the key once, keeps a
+single cipher and caches decrypted values in memory, so reading a secret on a
+hot path (e.g. every autologin attempt) never touches the disk.
+
+Key rotation writes the new key in front of the old one first (both are
+accepted while decrypting), re-encrypts all stored secrets in one pass and
+finally drops the old key. An interrupted rotation therefore never leaves a
+secret that cannot be decrypted.
+"""
+
+import os
+import threading
+
+from utils import KEY_PATH
+
+# (section, option) of all encrypted values in config.ini
+SECRET_OPTIONS = (
+    ("autologin", "password"),
+    ("autologin", "passwort"),  # legacy name
+)
+
+
+def _write_key_file(path, keys):
+    """Writes keys (newest first, one per line) atomically with mode 0600."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\n".join(keys))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class CredentialService:
+    """Holds the encryption key and a cache of decrypted secrets."""
+
+    def __init__(self, key_path=KEY_PATH):
+        self.key_path = key_path
+        self._lock = threading.RLock()
+        self._keys = None
+        self._cipher = None
+        self._plain_cache = {}
+        self._rotation_hooks = []
+
+    def add_rotation_hook(self, hook):
+        """
+        Registers a store of secrets outside config.ini (e.g. the fleet peers).
+        hook(reencrypt) is called during a key rotation; reencrypt(token) returns
+        the token encrypted with the new key. The hook returns the number of secrets.
+        """
+        self._rotation_hooks.append(hook)
+
+    # --- Key ---
+    def _load(self):
+        """Loads (or creates) the key file. Caller must hold the lock."""
+        from cryptography.fernet import Fernet, MultiFernet
+
+        if self._cipher is not None:
+            return self._cipher
+        try:
+            keys = [line.strip() for line in self.key_path.read_bytes().splitlines() if line.strip()]
+        except FileNotFoundError:
+            keys = []
+        if not keys:
+            keys = [Fernet.generate_key()]
+            _write_key_file(self.key_path, keys)
+        self._keys = keys
+        self._cipher = MultiFernet([Fernet(k) for k in keys])
+        return self._cipher
+
+    def reload(self):
+        """Drops the cached key and secrets (e.g. after a backup restore)."""
+        with self._lock:
+            self._keys = None
+            self._cipher = None
+            self._plain_cache.clear()
+
+    def invalidate(self):
+        """Drops the decrypted secrets. Call when the config changed."""
+        with self._lock:
+            self._plain_cache.clear()
+
+    # --- Encryption ---
+    def encrypt(self, value):
+        """Encrypts a string value."""
+        if not value:
+            return ""
+        with self._lock:
+            token = self._load().encrypt(value.encode()).decode()
+            self._plain_cache[token] = value
+        return token
+
+    def decrypt(self, value):
+        """Decrypts a string value. Returns original value if decryption fails (e.g. was plaintext)."""
+        if not value:
+            return ""
+        from cryptography.fernet import InvalidToken
+
+        with self._lock:
+            plain = self._plain_cache.get(value)
+            if plain is not None:
+                return plain
+            try:
+                plain = self._load().decrypt(value.encode()).decode()
+            except (InvalidToken, Exception):
+                # If decryption fails, assume it's plaintext (migration scenario)
+                plain = value
+            self._plain_cache[value] = plain
+            return plain
+
+    # --- Rotation ---
+    def rotate_key(self, config):
+        """
+        Generates a new key and re-encrypts all secrets of config (an AppConfig).
+        Saves config and the key file. Returns the number of re-encrypted secrets.
+        """
+        from cryptography.fernet import Fernet, MultiFernet, InvalidToken
+
+        with self._lock:
+            self._load()
+            new_key = Fernet.generate_key()
+            old_keys = list(self._keys)
+
+            # 1. Accept both keys, so config.ini stays readable if we are interrupted
+            _write_key_file(self.key_path, [new_key] + old_keys)
+            rotating = MultiFernet([Fernet(k) for k in [new_key] + old_keys])
+
+            def reencrypt(token):
+                try:
+                    plain = rotating.decrypt(token.encode()).decode()
+                except InvalidToken:
+                    # Plaintext from an old config: encrypt it now
+                    plain = token
+                new_token = rotating.encrypt(plain.encode()).decode()
+                # Configs loaded before the rotation still hold the old token
+                self._plain_cache[token] = plain
+                self._plain_cache[new_token] = plain
+                return new_token
+
+            # 2. Re-encrypt every stored secret in one pass
+            count = 0
+            for section, option in SECRET_OPTIONS:
+                token = config.get(section, option, fallback="")
+                if not token:
+                    continue
+                config.set(section, option, reencrypt(token))
+                count += 1
+            config.save("rotate_key")
+            for hook in self._rotation_hooks:
+                count += hook(reencrypt)
+
+            # 3. Drop the old key
+            _write_key_file(self.key_path, [new_key])
+            self._keys = [new_key]
+            self._cipher = MultiFernet([Fernet(new_key)])
+            return count
+
+
+credentials = CredentialService()
@@ -1,37 +1,97 @@
 import sys
 import os
-import shutil
 import threading
 import time
 import subprocess
 import base64
+import configparser
 import json
-from urllib.parse import quote
+from urllib.parse import quote, urlparse
 from pathlib import Path
 from PySide6.QtWidgets import QMainWindow, QApplication, QVBoxLayout, QWidget, QMessageBox, QLabel
-from PySide6.QtCore import QUrl, QFile, Qt, QTimer, QFileSystemWatcher, QByteArray
+from PySide6.QtCore import QUrl, QFile, Qt, QTimer, QFileSystemWatcher, QByteArray, Signal, QObject, Slot, QEvent
 from PySide6.QtGui import QPixmap
+from PySide6.QtWebChannel import QWebChannel
 from PySide6.QtWebEngineWidgets import QWebEngineView
 from PySide6.QtWebEngineCore import (
     QWebEngineProfile,
+    QWebEngineLoadingInfo,
     QWebEnginePage,
     QWebEngineScript,
     QWebEngineSettings,
+    QWebEngineUrlRequestInterceptor,
 )
 from config import AppConfig, __version__
-from http_server import ServeDirectoryWithHTTP
-from config_server import start_server
+from bundle_update import confirm_pending_update, spawn_update_supervisor
+from cache_manager import get_cache_root, get_profile_dir, get_http_cache_dir, perform_startup_maintenance
+from address_service import address_service
+from startup import trace, StartupOrchestrator, wait_for_display, wait_for_network
+from refresh_scheduler import refresh_scheduler, ACTION_RELOAD, TICK_S as REFRESH_TICK_S
+from memory_watchdog import memory_watchdog, SAMPLE_INTERVAL_S as MEMORY_SAMPLE_INTERVAL_S
+import metrics
+from page_timing import page_timing
+import profiling
+from stall_detector import stall_detector, HEARTBEAT_MS
+from performance import PerformanceProfile, apply_chromium_flags
+from request_filter import request_filter, resource_type_name
+from load_retry import load_retry, probe_connectivity, PROBE_INTERVAL_S as RETRY_PROBE_INTERVAL_S
+from page_lifecycle import (
+    page_lifecycle, STATE_ACTIVE, STATE_FROZEN, STATE_DISCARDED,
+    TICK_S as LIFECYCLE_TICK_S, PEEK_WINDOW_S,
+)
+from live_config import live_config
+from config_store import config_store, parse as parse_config, revision as config_revision
+from config_schema import (
+    SUBSYSTEM_ZOOM, SUBSYSTEM_PAGES, SUBSYSTEM_REFRESH, SUBSYSTEM_MEMORY,
+    SUBSYSTEM_LIFECYCLE, SUBSYSTEM_SCHEDULE, SUBSYSTEM_REQUEST_FILTER, SUBSYSTEM_AUTOLOGIN,
+    SUBSYSTEM_RESTART,
+)
+from operating_hours import operating_schedule, PHASE_OPEN, PHASE_WARMUP, PHASE_CLOSED, TICK_S as SCHEDULE_TICK_S
+from prewarm import (
+    PREWARM_MAX_WAIT_MS, SESSION_PROBE_MS, SessionProbe,
+    prewarm_origins, prewarm_page_url, preconnect_script, is_prewarm_url,
+)
 from utils import (
     APP_DIR, SCRIPTS_DIR, CONFIG_PATH, CSS_PATH,
-    RESTART_TRIGGER_PATH, RELOAD_TRIGGER_PATH, CLEAR_CACHE_MARKER_PATH, LOG_PATH, LOG_DIR,
-    get_local_ip_address, generate_qr_code_image
+    RESTART_TRIGGER_PATH, RELOAD_TRIGGER_PATH, LOG_PATH, LOG_DIR
 )
 
 # --- Global Config ---
 config = AppConfig(CONFIG_PATH)
+# Replaced in main() by the [performance] section of the config
+performance_profile = PerformanceProfile()
+
+# Save the startup trace at the latest after this time, even if no page loaded
+STARTUP_TRACE_TIMEOUT_MS = 90 * 1000
 
 # --- Script Templates ---
-try:
+# Loaded by load_templates() in a startup worker thread (see main()).
+LOGIN_SCRIPT_TPL = LOGO_SCRIPT_TPL = CSS_INJECT_TPL = OFFLINE_PAGE_TPL = None
+SETUP_NEEDED_TPL = OFFLINE_CHECK_SCRIPT_TPL = VIEW_MODE_TPL = ACTIVITY_PROBE_TPL = None
+PAGE_TIMING_TPL = PRECONNECT_TPL = None
+
+# Screenshot of the last successfully loaded board, shown while a load is retried
+LAST_GOOD_CAPTURE_MS = 10 * 1000
+
+# A suspended view is resumed even if its blank page does not report back
+RESUME_TIMEOUT_MS = 3000
+
+# Editors may write config.ini in several steps; it is evaluated once it is quiet
+CONFIG_SETTLE_MS = 500
+
+# Reads the report of scripts/activity_probe.js
+ACTIVITY_QUERY = "window.__adartsProbe ? window.__adartsProbe.report() : null"
+
+# Console messages of scripts/offline_check.js
+CONNECTION_LOST_MSG = "[Autodarts Browser] Connection lost."
+CONNECTION_RESTORED_MSG = "[Autodarts Browser] Connection restored."
+
+
+def load_templates():
+    """Reads all script and page templates. Raises FileNotFoundError if one is missing."""
+    global LOGIN_SCRIPT_TPL, LOGO_SCRIPT_TPL, CSS_INJECT_TPL, OFFLINE_PAGE_TPL
+    global SETUP_NEEDED_TPL, OFFLINE_CHECK_SCRIPT_TPL, VIEW_MODE_TPL, ACTIVITY_PROBE_TPL, PAGE_TIMING_TPL
+    global PRECONNECT_TPL
     with open(SCRIPTS_DIR / "login.js", "r") as f:
         LOGIN_SCRIPT_TPL = f.read()
     with open(SCRIPTS_DIR / "logo.js", "r") as f:
@@ -46,23 +106,75 @@ try:
         OFFLINE_CHECK_SCRIPT_TPL = f.read()
     with open(SCRIPTS_DIR / "view_mode.js", "r") as f:
         VIEW_MODE_TPL = f.read()
-except FileNotFoundError as e:
-    app = QApplication(sys.argv)
-    QMessageBox.critical(None, "Script Error",
-                         f"A script file was not found.\n{e}")
-    sys.exit(1)
-
-
-def run_script(view, script_code, name=""):
+    with open(SCRIPTS_DIR / "activity_probe.js", "r") as f:
+        ACTIVITY_PROBE_TPL = f.read()
+    with open(SCRIPTS_DIR / "preconnect.js", "r") as f:
+        PRECONNECT_TPL = f.read()
+
+    # The page timing collector needs the QWebChannel client library shipped with Qt
+    webchannel_js = QFile(":/qtwebchannel/qwebchannel.js")
+    if webchannel_js.open(QFile.OpenModeFlag.ReadOnly):
+        with open(SCRIPTS_DIR / "page_timing.js", "r") as f:
+            PAGE_TIMING_TPL = bytes(webchannel_js.readAll()).decode("utf-8") + "\n" + f.read()
+        webchannel_js.close()
+    else:
+        print("[WARN] qwebchannel.js not available. Page timing is disabled.")
+
+
+def run_script(view, script_code, name="", injection_point=QWebEngineScript.DocumentReady):
     """Helper to create and run a QWebEngineScript."""
     script = QWebEngineScript()
     script.setSourceCode(script_code)
-    script.setInjectionPoint(QWebEngineScript.DocumentReady)
+    script.setInjectionPoint(injection_point)
     script.setRunsOnSubFrames(True)
     script.setWorldId(QWebEngineScript.ApplicationWorld)
     view.page.scripts().insert(script)
 
 
+class KioskPage(QWebEnginePage):
+    """Page that reports the connectivity changes logged by offline_check.js."""
+
+    def __init__(self, profile, on_connectivity_changed, parent=None):
+        super().__init__(profile, parent)
+        self._on_connectivity_changed = on_connectivity_changed
+
+    def javaScriptConsoleMessage(self, level, message, line_number, source_id):
+        if message.startswith(CONNECTION_LOST_MSG):
+            self._on_connectivity_changed(False)
+        elif message.startswith(CONNECTION_RESTORED_MSG):
+            self._on_connectivity_changed(True)
+        super().javaScriptConsoleMessage(level, message, line_number, source_id)
+
+
+class TimingBridge(QObject):
+    """QWebChannel object 'timingBridge': receives the reports of page_timing.js."""
+
+    def __init__(self, view):
+        super().__init__(view)
+        self._view = view
+
+    @Slot(str)
+    def report(self, payload):
+        try:
+            report = json.loads(payload)
+        except ValueError:
+            return
+        self._view.on_timing_report(report)
+
+
+class RequestInterceptor(QWebEngineUrlRequestInterceptor):
+    """Blocks the requests of one view according to the request filter rules."""
+
+    def __init__(self, browser_id, parent=None):
+        super().__init__(parent)
+        self.browser_id = browser_id
+
+    def interceptRequest(self, info):
+        resource_type = resource_type_name(info.resourceType().name)
+        if request_filter.check(self.browser_id, info.requestUrl().host(), resource_type):
+            info.block(True)
+
+
 class BrowserView(QWebEngineView):
     """A self-contained browser widget for displaying a single Autodarts board."""
 
@@ -70,69 +182,418 @@ class BrowserView(QWebEngineView):
         super().__init__(parent)
         self.browser_id = browser_id
         self.target_url = target_url
+        self.board_id = getattr(config.snapshot, f"board{browser_id}_id", "").strip()
         self.login_attempts = 0
+        self._injected_ms = 0.0  # Run time of our scripts since the last load started
+        self._login_pending = False  # Autologin injected on a login page, waiting for the target page
+        self._load_started = None
+        self._online = None
+        self._prewarming = False
+        self._prewarm_callback = None
+        self._session_probe = None
+        self.suspended = False  # Outside the operating hours
+        self._resume_callback = None
 
         # Create profile and page without parents to manage their lifecycle manually
         self.profile = QWebEngineProfile(f"browser-{browser_id}")
 
         # Ensure cache directory is relative to the app's directory
-        cache_dir = config.cache_dir.lstrip('/\\')
         self.profile.setPersistentStoragePath(
-            str(APP_DIR / cache_dir / f"browser{self.browser_id}"))
-
-        self.page = QWebEnginePage(self.profile)
+            str(get_profile_dir(config, self.browser_id)))
+        # Keep the HTTP cache inside the profile so it can be evicted separately from the login state
+        self.profile.setCachePath(
+            str(get_http_cache_dir(config, self.browser_id)))
+        cache_bytes = performance_profile.http_cache_bytes(config.cache_max_mb)
+        if cache_bytes:
+            self.profile.setHttpCacheMaximumSize(cache_bytes)
+
+        if request_filter.enabled:
+            self.request_interceptor = RequestInterceptor(self.browser_id, self)
+            self.profile.setUrlRequestInterceptor(self.request_interceptor)
+
+        self.page = KioskPage(self.profile, self._set_online)
         self.page.settings().setAttribute(
             QWebEngineSettings.WebAttribute.ShowScrollBars, False)
+        # Failed loads show the placeholder below instead of Chromium's error page
+        self.page.settings().setAttribute(
+            QWebEngineSettings.WebAttribute.ErrorPageEnabled, False)
+        for attribute, enabled in performance_profile.web_attributes().items():
+            self.page.settings().setAttribute(getattr(QWebEngineSettings.WebAttribute, attribute), enabled)
         self.setPage(self.page)
 
+        # Page scripts persist across loads, the probe only needs to be added once
+        run_script(self, ACTIVITY_PROBE_TPL, name="activityProbe")
+        if config.prewarm_enabled:
+            origins = prewarm_origins(config.autodarts_url, config.auth_url)
+            run_script(self, preconnect_script(PRECONNECT_TPL, origins), name="preconnect",
+                       injection_point=QWebEngineScript.DocumentCreation)
+
+        # Navigation/Paint Timing reports arrive through the web channel
+        if PAGE_TIMING_TPL:
+            self.timing_bridge = TimingBridge(self)
+            self.channel = QWebChannel(self.page)
+            self.channel.registerObject("timingBridge", self.timing_bridge)
+            self.page.setWebChannel(self.channel, QWebEngineScript.ApplicationWorld)
+            run_script(self, PAGE_TIMING_TPL, name="pageTiming")
+
+        self.loadStarted.connect(self._on_load_started)
         self.loadFinished.connect(self._on_load_finished)
+        self.page.loadingChanged.connect(self._on_loading_changed)
+
+        # Load retry: backoff timer and the "last good" placeholder
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self._retry_load)
+        self._last_good_path = get_cache_root(config) / f"last_good_{self.browser_id}.png"
+        self._last_good = QPixmap(str(self._last_good_path)) if self._last_good_path.is_file() else None
+        self.placeholder = QLabel(self)
+        self.placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.placeholder.setStyleSheet("background-color: black; color: #aaaaaa; font-size: 20px;")
+        self.placeholder.hide()
+        self.retry_status = QLabel(self)
+        self.retry_status.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 170); color: white; padding: 6px 12px; font-size: 14px;")
+        self.retry_status.hide()
+
+        # Idle freezing: screenshot shown while the page is frozen, tap to wake
+        self.freeze_cover = QLabel(self)
+        self.freeze_cover.setScaledContents(True)
+        self.freeze_cover.setStyleSheet("background-color: black;")
+        self.freeze_cover.installEventFilter(self)
+        self.freeze_cover.hide()
+        self.peek_timer = QTimer(self)
+        self.peek_timer.setSingleShot(True)
+        self.peek_timer.timeout.connect(self._on_peek_done)
+        self._peek_callback = None
 
     def load_target_url(self):
+        self._prewarming = False
         if self.target_url:
             self.setUrl(QUrl(self.target_url))
 
+    def prewarm(self, origins, callback):
+        """
+        Loads the preconnect page and checks the stored login session.
+        callback(browser_id) is called when both are done.
+        """
+        self._prewarming = True
+        self._prewarm_callback = callback
+        self._session_probe = SessionProbe(urlparse(config.auth_url).hostname)
+        store = self.profile.cookieStore()
+        store.cookieAdded.connect(self._on_cookie_loaded)
+        store.loadAllCookies()
+        QTimer.singleShot(SESSION_PROBE_MS, self._on_session_probe_done)
+        self.setUrl(QUrl(prewarm_page_url(origins)))
+
+    # --- Load Retry ---
+    def _on_loading_changed(self, info):
+        # Only real failures are retried; loads stopped by a new navigation are not
+        if self.suspended or info.status() != QWebEngineLoadingInfo.LoadStatus.LoadFailedStatus:
+            return
+        url = info.url().toString()
+        if self.target_url.startswith("data:") or is_prewarm_url(url):
+            return
+        error = f"{info.errorString() or 'error'} ({info.errorCode()})"
+        delay = load_retry.failed(self.browser_id, error)
+        print(f"[Browser {self.browser_id}] Load of {url} failed: {error}. Retrying in {delay:.1f}s.")
+        self._show_placeholder(f"Keine Verbindung zu Autodarts - neuer Versuch in {delay:.0f} s")
+        self.retry_timer.start(int(delay * 1000))
+
+    def _retry_load(self):
+        self.retry_timer.stop()
+        load_retry.retry_started(self.browser_id)
+        print(f"[Browser {self.browser_id}] Retrying page load...")
+        self.retry_status.setText("Verbindung wird wiederhergestellt ...")
+        self.retry_status.adjustSize()
+        self.load_target_url()
+
+    def retry_now(self):
+        """Retries a failed load immediately (e.g. when the network is back)."""
+        if self.retry_timer.isActive():
+            self._retry_load()
+
+    def _show_placeholder(self, text):
+        if self._last_good is not None and not self._last_good.isNull():
+            self.placeholder.setPixmap(self._last_good.scaled(
+                self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation))
+        else:
+            self.placeholder.setText("Verbindung zu Autodarts wird hergestellt ...")
+        self.placeholder.setGeometry(self.rect())
+        self.placeholder.show()
+        self.placeholder.raise_()
+        self.retry_status.setText(text)
+        self.retry_status.adjustSize()
+        self.retry_status.move(10, self.height() - self.retry_status.height() - 10)
+        self.retry_status.show()
+        self.retry_status.raise_()
+
+    def _hide_placeholder(self):
+        self.placeholder.hide()
+        self.retry_status.hide()
+
+    def _capture_last_good(self):
+        if self.url().toString().split("#")[0] != self.target_url or self.browser_id in load_retry.failing():
+            return
+        self._last_good = self.grab()
+        image = self._last_good.toImage()
+        path = self._last_good_path
+        # Encoding the PNG takes a while, keep it off the GUI thread
+        threading.Thread(target=lambda: image.save(str(path), "PNG"), name="last-good", daemon=True).start()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.placeholder.isVisible():
+            self.placeholder.setGeometry(self.rect())
+            self.retry_status.move(10, self.height() - self.retry_status.height() - 10)
+        if self.freeze_cover.isVisible():
+            self.freeze_cover.setGeometry(self.rect())
+
+    # --- Page Lifecycle ---
+    def can_freeze(self):
+        """Only a loaded board page is frozen; setup pages, logins, loads and retries are not."""
+        return (not self.suspended and not self.target_url.startswith("data:") and not self._prewarming
+                and self._load_started is None and not self.retry_timer.isActive()
+                and self.url().toString().split("#")[0] == self.target_url)
+
+    def freeze(self, discard=False):
+        """Covers the view with a screenshot and freezes (or discards) the hidden page."""
+        self.peek_timer.stop()
+        if not self.freeze_cover.isVisible():
+            self.freeze_cover.setPixmap(self.grab())
+            self.freeze_cover.setGeometry(self.rect())
+            self.freeze_cover.show()
+            self.freeze_cover.raise_()
+            # Chromium only freezes or discards pages that are not visible
+            self.page.setVisible(False)
+        state = STATE_DISCARDED if discard else STATE_FROZEN
+        if page_lifecycle.state(self.browser_id) != state:
+            print(f"[Browser {self.browser_id}] Board idle. Page {state}.")
+        self.page.setLifecycleState(
+            QWebEnginePage.LifecycleState.Discarded if discard else QWebEnginePage.LifecycleState.Frozen)
+        page_lifecycle.transition(self.browser_id, state)
+
+    def peek(self, callback):
+        """Lets the frozen page run hidden for PEEK_WINDOW_S, then calls callback(report)."""
+        page_lifecycle.peek_started(self.browser_id)
+        self._peek_callback = callback
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        self.peek_timer.start(PEEK_WINDOW_S * 1000)
+
+    def _on_peek_done(self):
+        callback, self._peek_callback = self._peek_callback, None
+        if callback is not None:
+            self.query_activity(callback)
+
+    def thaw(self, reason):
+        """Shows the page again. A discarded page is reloaded by Chromium."""
+        if page_lifecycle.state(self.browser_id) == STATE_ACTIVE:
+            return
+        print(f"[Browser {self.browser_id}] Waking up page ({reason}).")
+        self.peek_timer.stop()
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        self.page.setVisible(True)
+        self.freeze_cover.hide()
+        page_lifecycle.transition(self.browser_id, STATE_ACTIVE, reason)
+
+    # --- Operating Hours ---
+    def suspend(self):
+        """Replaces the board with a blank page and discards the renderer (venue closed)."""
+        self.suspended = True
+        self._resume_callback = None
+        self.retry_timer.stop()
+        self.peek_timer.stop()
+        self._peek_callback = None
+        self._hide_placeholder()
+        self.freeze_cover.hide()
+        if page_lifecycle.state(self.browser_id) != STATE_ACTIVE:
+            page_lifecycle.transition(self.browser_id, STATE_ACTIVE, "Betriebszeiten")
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        self.setUrl(QUrl("about:blank"))
+
+    def _on_blank_loaded(self):
+        if self._resume_callback is not None:
+            # After the other loadFinished slots, they still see the view as suspended
+            QTimer.singleShot(0, self._finish_resume)
+            return
+        # Chromium only discards pages that are not visible
+        self.page.setVisible(False)
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Discarded)
+
+    def resume(self, callback):
+        """Wakes a suspended view; callback(browser) is called when it can load the board again."""
+        self._resume_callback = callback
+        # Waking the discarded page reloads the blank page first
+        self.page.setLifecycleState(QWebEnginePage.LifecycleState.Active)
+        QTimer.singleShot(RESUME_TIMEOUT_MS, self._finish_resume)
+
+    def _finish_resume(self):
+        if not self.suspended or self._resume_callback is None:
+            return
+        callback, self._resume_callback = self._resume_callback, None
+        self.suspended = False
+        self.page.setVisible(True)
+        callback(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self.freeze_cover and event.type() == QEvent.Type.MouseButtonPress:
+            self.thaw("Antippen")
+            return True
+        return super().eventFilter(obj, event)
+
+    def _on_cookie_loaded(self, cookie):
+        if self._session_probe is None:
+            return
+        expires = cookie.expirationDate()
+        self._session_probe.add(bytes(cookie.name()).decode("utf-8", "replace"), cookie.domain(),
+                                expires.toSecsSinceEpoch() if expires.isValid() else None)
+
+    def _on_session_probe_done(self):
+        # loadAllCookies() has no completion signal; the stored cookies arrive within a few ms
+        self.profile.cookieStore().cookieAdded.disconnect(self._on_cookie_loaded)
+        valid, detail = self._session_probe.session()
+        self._session_probe = None
+        state = "valid" if valid else "missing"
+        print(f"[Browser {self.browser_id}] Stored login session: {state} ({detail}).")
+        metrics.STORED_SESSION.set(1 if valid else 0, browser=self.browser_id)
+        self._finish_prewarm()
+
+    def _finish_prewarm(self):
+        # Done when the preconnect page has loaded and the session probe has finished
+        if self._prewarming or self._session_probe is not None or self._prewarm_callback is None:
+            return
+        callback, self._prewarm_callback = self._prewarm_callback, None
+        callback(self.browser_id)
+
+    def reload_page(self):
+        """Reloads the page and records how long it takes."""
+        if self.suspended:
+            return
+        refresh_scheduler.reload_started(self.browser_id)
+        state = page_lifecycle.state(self.browser_id)
+        self.thaw("Neu laden")
+        # Waking a discarded page already reloads it
+        if state != STATE_DISCARDED:
+            self.reload()
+
+    def query_activity(self, callback):
+        """Calls callback(report) with the activity probe's report (None if unavailable)."""
+        def _on_result(result):
+            try:
+                report = json.loads(result) if result else None
+            except (TypeError, ValueError):
+                report = None
+            callback(report)
+
+        self.page.runJavaScript(ACTIVITY_QUERY, QWebEngineScript.ApplicationWorld, _on_result)
+
+    def run_now(self, script_code, name):
+        """Runs script_code in the current page and records how long it takes."""
+        started = time.perf_counter()
+
+        def _on_done(_result):
+            duration = time.perf_counter() - started
+            self._injected_ms += duration * 1000
+            metrics.SCRIPT_INJECTION_SECONDS.observe(duration, browser=self.browser_id, script=name)
+
+        self.page.runJavaScript(script_code, QWebEngineScript.MainWorld, _on_done)
+
+    def _set_online(self, online):
+        metrics.CONNECTIVITY_ONLINE.set(1 if online else 0, browser=self.browser_id)
+        if online != self._online:
+            if self._online is not None:
+                metrics.CONNECTIVITY_CHANGES.inc(browser=self.browser_id, state="online" if online else "offline")
+                # Reported during a peek: the board's state has to be shown again
+                page_lifecycle.activity(self.browser_id)
+                self.thaw("Verbindungsänderung")
+            self._online = online
+
+    def on_timing_report(self, report):
+        if report.get('url', "").startswith("data:"):
+            return
+        page_timing.add(self.browser_id, self.board_id, report, injected_ms=self._injected_ms)
+
+    def _on_load_started(self):
+        self._load_started = time.perf_counter()
+        self._injected_ms = 0.0
+
     def _on_load_finished(self, ok):
+        if self.suspended:
+            # The blank page shown outside the operating hours
+            self._on_blank_loaded()
+            return
+        if is_prewarm_url(self.url().toString()):
+            # The preconnect page, not a board load
+            if self._prewarming:
+                self._prewarming = False
+                self._finish_prewarm()
+            return
+        refresh_scheduler.reload_finished(self.browser_id, ok)
+        metrics.PAGE_LOADS.inc(browser=self.browser_id, result="ok" if ok else "failed")
+        if self._load_started is not None:
+            metrics.PAGE_LOAD_SECONDS.observe(time.perf_counter() - self._load_started, browser=self.browser_id)
+            self._load_started = None
+        # One snapshot for the whole load (plain attribute reads)
+        settings = config.snapshot
         current_url = self.url().toString().split("#")[0]
         is_target_page = current_url == self.target_url
 
         if not ok:
             print(
                 f"[Browser {self.browser_id}] Page failed to load: {current_url}")
+            if not self.target_url.startswith("data:"):
+                self._set_online(False)
             return
 
+        if not self.target_url.startswith("data:"):
+            self._set_online(True)
+            recovered_s = load_retry.succeeded(self.browser_id)
+            if recovered_s is not None:
+                print(f"[Browser {self.browser_id}] Recovered after {recovered_s:.1f}s.")
+            self.retry_timer.stop()
+            self._hide_placeholder()
+
         # Apply Zoom Factor
-        self.setZoomFactor(config.zoom_factor)
+        self.setZoomFactor(settings.zoom_factor)
 
         if is_target_page:
             print(
                 f"[Browser {self.browser_id}] Successfully loaded target URL.")
+            if not self.target_url.startswith("data:"):
+                QTimer.singleShot(LAST_GOOD_CAPTURE_MS, self._capture_last_good)
             self.login_attempts = 0  # Reset login attempts on success
+            if self._login_pending:
+                self._login_pending = False
+                metrics.AUTOLOGIN_RESULTS.inc(browser=self.browser_id, result="success")
 
-            if config.use_custom_style:
+            if settings.use_custom_style:
                 self._inject_css()
-            if config.logos_enabled:
+            if settings.logos_enabled:
                 self._insert_logo()
 
             # Always try to inject autologin script, in case login form is on the target page
-            if config.autologin_enabled:
+            if settings.autologin_enabled:
                 # Check max attempts even for target page to be safe, though usually we want to retry if we landed here but are logged out
-                if self.login_attempts < config.autologin_max_attempts:
+                if self.login_attempts < settings.autologin_max_attempts:
                     self.login_attempts += 1
                     self._inject_autologin()
 
-            if config.view_mode and config.view_mode != 'none':
+            if settings.view_mode and settings.view_mode != 'none':
                 self._inject_view_mode()
 
         else:
             print(
-                f"[Browser {self.browser_id}] Redirected to {current_url}. Attempting login... (Attempt {self.login_attempts + 1}/{config.autologin_max_attempts})")
-            if config.autologin_enabled:
-                if self.login_attempts < config.autologin_max_attempts:
+                f"[Browser {self.browser_id}] Redirected to {current_url}. Attempting login... (Attempt {self.login_attempts + 1}/{settings.autologin_max_attempts})")
+            if settings.autologin_enabled:
+                if self.login_attempts < settings.autologin_max_attempts:
                     self.login_attempts += 1
+                    self._login_pending = True
                     self._inject_autologin()
                 else:
                     print(
                         f"[Browser {self.browser_id}] Max login attempts reached. Stopping autologin.")
+                    if self._login_pending:
+                        self._login_pending = False
+                        metrics.AUTOLOGIN_RESULTS.inc(browser=self.browser_id, result="exhausted")
 
         # Inject offline check script
         self._inject_offline_check()
@@ -150,7 +611,8 @@ class BrowserView(QWebEngineView):
             '{password}', config.autologin_password
         )
         run_script(self, script_code, name="autologin")
-        self.page.runJavaScript(script_code)
+        metrics.AUTOLOGIN_ATTEMPTS.inc(browser=self.browser_id)
+        self.run_now(script_code, "autologin")
 
     def _inject_view_mode(self):
         mode = config.view_mode
@@ -158,7 +620,7 @@ class BrowserView(QWebEngineView):
             f"[Browser {self.browser_id}] Injecting View Mode script for '{mode}'...")
         script_code = VIEW_MODE_TPL.replace('{view_mode}', mode)
         run_script(self, script_code, name="viewMode")
-        self.page.runJavaScript(script_code)
+        self.run_now(script_code, "viewMode")
 
     def _try_login(self):
         pass
@@ -184,7 +646,7 @@ class BrowserView(QWebEngineView):
                 "{css_b64}", css_b64
             )
             # We run this directly to update immediately
-            self.page.runJavaScript(script_code)
+            self.run_now(script_code, "css")
             print(f"[Browser {self.browser_id}] Injected/Updated custom CSS.")
         except Exception as e:
             print(f"[Browser {self.browser_id}] Error injecting CSS: {e}")
@@ -202,7 +664,7 @@ class BrowserView(QWebEngineView):
 
         script_code = LOGO_SCRIPT_TPL.replace('{logo_url}', logo_url)
         run_script(self, script_code, name="logo")
-        self.page.runJavaScript(script_code)
+        self.run_now(script_code, "logo")
         print(f"[Browser {self.browser_id}] Injected logo.")
 
     def _inject_offline_check(self):
@@ -215,6 +677,8 @@ class BrowserView(QWebEngineView):
 
             script_code = OFFLINE_CHECK_SCRIPT_TPL.replace(
                 '{offline_html_b64}', html_b64
+            ).replace(
+                '{version_url}', f"{config.autodarts_url}/version"
             )
             run_script(self, script_code, name="offlineCheck")
         except Exception as e:
@@ -223,6 +687,14 @@ class BrowserView(QWebEngineView):
 
 
 class AutodartsBrowser(QMainWindow):
+    # Emitted from worker threads, delivered on the GUI thread
+    qr_ready = Signal(bytes)
+    address_changed = Signal(str)
+    network_ready = Signal()
+    connectivity_restored = Signal()
+    config_changed = Signal(object)
+    run_in_gui = Signal(object)
+
     def __init__(self):
         super().__init__()
         self._cleanup_started = False
@@ -232,16 +704,34 @@ class AutodartsBrowser(QMainWindow):
         self.http_server = None
         self.local_http_port = None  # Initialize local HTTP server port
         self.qr_overlay = None # QR Code Widget
+        self.closed_overlay = None  # Black screen outside the operating hours
+        self._warm_pending = set()
+
+        self.qr_ready.connect(self._on_qr_ready)
+        self.address_changed.connect(self._on_address_changed)
+        self.network_ready.connect(self._on_network_ready)
+        # Lets the profiling endpoints enable cProfile on the GUI thread
+        self.run_in_gui.connect(lambda func: func())
+        profiling.set_main_thread_dispatcher(self.run_in_gui.emit)
+        # Changes through /api/config are applied here instead of restarting
+        self.config_changed.connect(self.apply_config_change)
+        live_config.register(self.config_changed.emit)
+        address_service.add_listener(self.address_changed.emit)
 
         self.start_http_server()
+        self.init_request_filter()
         self.init_ui()
-        self.load_pages()
+        self.init_memory_watchdog()
         self.init_refresh_timer()
+        self.init_stall_detector()
+        self.init_load_retry()
+        self.init_page_lifecycle()
         self.init_config_watcher()
 
-        # Show QR Code on startup if enabled or if in setup mode
-        if config.show_qr_on_startup or self.is_setup_mode:
-            self.show_qr_code()
+        for browser in self.browsers:
+            browser.loadFinished.connect(lambda ok, b=browser: self._on_first_load_finished(b, ok))
+        # Last: may suspend the views right away when started outside the operating hours
+        self.init_schedule()
 
     def init_ui(self):
         self.setWindowTitle(f"Autodarts Webbrowser v{__version__}")
@@ -255,17 +745,11 @@ class AutodartsBrowser(QMainWindow):
         self.layout = QVBoxLayout(central_widget)
         self.layout.setContentsMargins(0, 0, 0, 0)
 
-        # Helper to generate Setup Page URL with real IP
-        def get_setup_url():
-            ip = get_local_ip_address()
-            html = SETUP_NEEDED_TPL.replace("&lt;IP-ADRESSE_DIESES_GERÄTS&gt;", ip)
-            return f"data:text/html;charset=utf-8,{quote(html)}"
-
         # Create Browser 1
         url1 = config.get_board_url(1)
         if not url1:
             print("[INFO] No Board URL configured. Loading setup_needed.html.")
-            url1 = get_setup_url()
+            url1 = self._get_setup_url()
             self.is_setup_mode = True
 
         browser1 = BrowserView(1, url1, self)
@@ -277,27 +761,41 @@ class AutodartsBrowser(QMainWindow):
             url2 = config.get_board_url(2)
             if not url2:
                 print("[INFO] No Board 2 URL configured. Loading setup_needed.html.")
-                url2 = get_setup_url()
+                url2 = self._get_setup_url()
                 self.is_setup_mode = True
 
             browser2 = BrowserView(2, url2, self)
             self.browsers.append(browser2)
             self.layout.addWidget(browser2)
 
+    def _get_setup_url(self):
+        """Generates the Setup Page URL with the (cached) real IP."""
+        html = SETUP_NEEDED_TPL.replace("&lt;IP-ADRESSE_DIESES_GERÄTS&gt;", address_service.get_ip())
+        return f"data:text/html;charset=utf-8,{quote(html)}"
+
     def show_qr_code(self):
+        """Shows the QR overlay. The image is rendered off the GUI thread (and cached)."""
+        def _render():
+            try:
+                self.qr_ready.emit(address_service.get_qr_png())
+            except Exception as e:
+                print(f"[ERROR] Failed to generate QR code: {e}")
+
+        threading.Thread(target=_render, name="qr-render", daemon=True).start()
+
+    def _on_qr_ready(self, img_data):
         try:
-            # Get IP and generate QR data
-            ip = get_local_ip_address()
-            url = f"http://{ip}:5000"
-            print(f"[INFO] Generating QR code for: {url}")
-            
-            # Generate Image (Bytes)
-            img_data = generate_qr_code_image(url)
-            
+            print(f"[INFO] Showing QR code for: {address_service.config_url}")
+
             # Create Pixmap
             pixmap = QPixmap()
             pixmap.loadFromData(QByteArray(img_data))
-            
+
+            if self.qr_overlay:
+                # Already visible (e.g. network change): only update the image
+                self.qr_overlay.setPixmap(pixmap.scaled(200, 200, Qt.AspectRatioMode.KeepAspectRatio))
+                return
+
             # Create Overlay Label
             self.qr_overlay = QLabel(self)
             self.qr_overlay.setPixmap(pixmap.scaled(200, 200, Qt.AspectRatioMode.KeepAspectRatio))
@@ -309,39 +807,56 @@ class AutodartsBrowser(QMainWindow):
                 padding: 10px;
             """)
             self.qr_overlay.setFixedSize(220, 220)
-            
+
             # Position bottom-right
+            self._position_qr_overlay()
             self.qr_overlay.show()
             self.qr_overlay.raise_()
-            
+
             # Auto-hide timer only if NOT in setup mode
             if not self.is_setup_mode:
                 duration_ms = config.qr_show_duration * 1000
                 QTimer.singleShot(duration_ms, self.hide_qr_code)
             else:
                 print("[INFO] Setup mode active: QR code will remain visible.")
-            
+
         except Exception as e:
             print(f"[ERROR] Failed to show QR code: {e}")
 
+    def _on_address_changed(self, ip):
+        # Setup pages and a visible QR code show the IP, keep them current
+        if self.is_setup_mode:
+            for browser in self.browsers:
+                if browser.target_url.startswith("data:"):
+                    browser.target_url = self._get_setup_url()
+                    browser.load_target_url()
+        if self.qr_overlay:
+            self.show_qr_code()
+
     def hide_qr_code(self):
         if self.qr_overlay:
             self.qr_overlay.hide()
             self.qr_overlay.deleteLater()
             self.qr_overlay = None
 
+    def _position_qr_overlay(self):
+        # Bottom Right Corner with padding
+        margin = 20
+        x = self.width() - self.qr_overlay.width() - margin
+        y = self.height() - self.qr_overlay.height() - margin
+        self.qr_overlay.move(x, y)
+
     def resizeEvent(self, event):
         # Update QR code position if it exists
         if hasattr(self, 'qr_overlay') and self.qr_overlay and self.qr_overlay.isVisible():
-            # Bottom Right Corner with padding
-            margin = 20
-            x = self.width() - self.qr_overlay.width() - margin
-            y = self.height() - self.qr_overlay.height() - margin
-            self.qr_overlay.move(x, y)
+            self._position_qr_overlay()
+        if self.closed_overlay and self.closed_overlay.isVisible():
+            self.closed_overlay.setGeometry(self.rect())
         super().resizeEvent(event)
 
     def start_http_server(self):
         if config.logos_enabled and config.logos_local:  # Only start if local logos are enabled
+            from http_server import ServeDirectoryWithHTTP
             self.http_server, _, self.local_http_port = ServeDirectoryWithHTTP(
                 directory=str(APP_DIR))
             print(
@@ -351,33 +866,380 @@ class AutodartsBrowser(QMainWindow):
             self.local_http_port = 3344
 
     def load_pages(self):
+        with trace.phase("load_pages"):
+            for browser in self.browsers:
+                browser.load_target_url()
+
+    def load_pages_when_ready(self, network_probe):
+        """Starts loading as soon as the network probe (a Future) is done and the views are pre-warmed."""
+        # Local setup pages don't need the network
         for browser in self.browsers:
-            browser.load_target_url()
+            if browser.target_url.startswith("data:"):
+                browser.load_target_url()
+        self._network_is_ready = False
+        self._pages_loaded = False
+        self._prewarm_pending = set()
+        if config.prewarm_enabled:
+            self._start_prewarm()
+        # The callback runs in the probe thread (or right here if already done);
+        # the signal delivers it on the GUI thread.
+        network_probe.add_done_callback(lambda _: self.network_ready.emit())
+
+    def _start_prewarm(self):
+        origins = prewarm_origins(config.autodarts_url, config.auth_url)
+        views = [b for b in self.browsers if not b.target_url.startswith("data:") and not b.suspended]
+        if not views:
+            return
+        trace.mark("prewarm_started")
+        print(f"[INFO] Pre-warming connections to {', '.join(origins)}")
+        for browser in views:
+            self._prewarm_pending.add(browser.browser_id)
+            browser.prewarm(origins, self._on_view_prewarmed)
+        # Pre-warming must never hold back the boards for long
+        QTimer.singleShot(PREWARM_MAX_WAIT_MS, self._on_prewarm_timeout)
+
+    def _on_view_prewarmed(self, browser_id):
+        self._prewarm_pending.discard(browser_id)
+        if not self._prewarm_pending:
+            trace.mark("prewarm_done")
+        self._load_pages_if_ready()
+
+    def _on_prewarm_timeout(self):
+        if self._prewarm_pending:
+            print(f"[WARN] Pre-warming not finished after {PREWARM_MAX_WAIT_MS} ms. Loading pages anyway.")
+            self._prewarm_pending.clear()
+        self._load_pages_if_ready()
+
+    def _on_network_ready(self):
+        self._network_is_ready = True
+        self._load_pages_if_ready()
+
+    def _load_pages_if_ready(self):
+        if self._pages_loaded or not self._network_is_ready or self._prewarm_pending:
+            return
+        self._pages_loaded = True
+        with trace.phase("load_pages"):
+            for browser in self.browsers:
+                if not browser.target_url.startswith("data:") and not browser.suspended:
+                    browser.load_target_url()
+
+    def _on_first_load_finished(self, browser, ok):
+        if (not ok or "first_page_loaded" in trace.marks or browser.suspended
+                or is_prewarm_url(browser.url().toString())):
+            return
+        trace.mark("first_page_loaded")
+        print(f"[INFO] First page loaded {trace.marks['first_page_loaded'] / 1000:.1f}s after process start.")
+        self.save_startup_trace()
+
+    def save_startup_trace(self):
+        threading.Thread(target=trace.save, name="startup-trace", daemon=True).start()
 
     def refresh_pages(self):
-        print("[INFO] Auto-refreshing all pages...")
+        print("[INFO] Reloading all pages...")
         for browser in self.browsers:
-            browser.reload()
+            browser.reload_page()
 
     def update_css(self):
         print("[INFO] Updating CSS in all browsers...")
         for browser in self.browsers:
-            browser._inject_css()
+            if not browser.suspended:
+                browser._inject_css()
+
+    def _refresh_timer_needed(self):
+        # The memory watchdog requests its reloads through the scheduler as well
+        return config.refresh_interval_min > 0 or memory_watchdog.enabled
 
     def init_refresh_timer(self):
         interval_min = config.refresh_interval_min
+        # Also configured when disabled, so manual reloads are timed
+        refresh_scheduler.configure(interval_min * 60, [b.browser_id for b in self.browsers])
+        if self._refresh_timer_needed():
+            if not hasattr(self, 'refresh_timer'):
+                self.refresh_timer = QTimer(self)
+                self.refresh_timer.timeout.connect(self._on_refresh_tick)
+            self.refresh_timer.start(REFRESH_TICK_S * 1000)
+        elif hasattr(self, 'refresh_timer'):
+            self.refresh_timer.stop()
         if interval_min > 0:
-            self.refresh_timer = QTimer(self)
-            self.refresh_timer.timeout.connect(self.refresh_pages)
-            interval_ms = interval_min * 60 * 1000
-            self.refresh_timer.start(interval_ms)
             print(
-                f"[INFO] Auto-refresh enabled. Interval: {interval_min} minutes.")
+                f"[INFO] Auto-refresh enabled. Interval: {interval_min} minutes (staggered, idle-aware).")
+
+    def _on_refresh_tick(self):
+        for browser_id in refresh_scheduler.due_views():
+            browser = next(b for b in self.browsers if b.browser_id == browser_id)
+            if page_lifecycle.state(browser_id) != STATE_ACTIVE:
+                # A frozen page runs nothing that could leak
+                refresh_scheduler.postpone(browser_id)
+                continue
+            browser.query_activity(lambda report, b=browser: self._on_activity_report(b, report))
+
+    def _on_activity_report(self, browser, report):
+        action, reason = refresh_scheduler.decide(browser.browser_id, report)
+        if action == ACTION_RELOAD:
+            print(f"[Browser {browser.browser_id}] Auto-refresh ({reason}).")
+            browser.reload_page()
+        else:
+            print(f"[Browser {browser.browser_id}] Auto-refresh {action} ({reason}).")
+
+    def init_stall_detector(self):
+        # Heartbeat of the event loop; the detector thread notices when it stops
+        self.heartbeat_timer = QTimer(self)
+        self.heartbeat_timer.timeout.connect(stall_detector.beat)
+        self.heartbeat_timer.start(HEARTBEAT_MS)
+        # Start once the event loop runs, window creation is not a stall
+        QTimer.singleShot(0, stall_detector.start)
+
+    def init_request_filter(self):
+        """Configures the request filter before the views (and their interceptors) are created."""
+        # The Autodarts host itself is never blocked by a domain rule
+        allow_domains = list(config.request_filter_allow_domains) + [urlparse(config.autodarts_url).hostname]
+        request_filter.configure(
+            config.request_filter_enabled, config.request_filter_dry_run,
+            config.request_filter_block_domains, allow_domains, config.request_filter_block_types)
+        if request_filter.enabled:
+            mode = "dry run" if request_filter.dry_run else "blocking"
+            print(f"[INFO] Request filter enabled ({mode}). "
+                  f"{len(config.request_filter_block_domains)} blocked domains, types: "
+                  f"{', '.join(config.request_filter_block_types) or '-'}")
+
+    def init_load_retry(self):
+        """Probes the Autodarts host while pages are failing, so they retry as soon as it is back."""
+        self._retry_probe_running = False
+        self.connectivity_restored.connect(self._on_connectivity_restored)
+        self.retry_probe_timer = QTimer(self)
+        self.retry_probe_timer.timeout.connect(self._on_retry_probe_tick)
+        self.retry_probe_timer.start(RETRY_PROBE_INTERVAL_S * 1000)
+
+    def _on_retry_probe_tick(self):
+        if self._retry_probe_running or not load_retry.failing():
+            return
+        self._retry_probe_running = True
+
+        def _probe():
+            try:
+                if load_retry.connectivity(probe_connectivity(config.autodarts_url)):
+                    self.connectivity_restored.emit()
+            finally:
+                self._retry_probe_running = False
+
+        threading.Thread(target=_probe, name="retry-probe", daemon=True).start()
+
+    def _on_connectivity_restored(self):
+        failing = load_retry.failing()
+        print(f"[INFO] Autodarts reachable again. Retrying {len(failing)} page(s) now.")
+        for browser in self.browsers:
+            if browser.browser_id in failing:
+                browser.retry_now()
+
+    def init_page_lifecycle(self):
+        """Freezes views whose board has been idle for a while (see page_lifecycle.py)."""
+        page_lifecycle.configure(config.freeze_idle_min * 60, config.discard_idle_min * 60,
+                                 [b.browser_id for b in self.browsers])
+        if not page_lifecycle.enabled:
+            if hasattr(self, 'lifecycle_timer'):
+                self.lifecycle_timer.stop()
+            return
+        if not hasattr(self, 'lifecycle_timer'):
+            self.lifecycle_timer = QTimer(self)
+            self.lifecycle_timer.timeout.connect(self._on_lifecycle_tick)
+        self.lifecycle_timer.start(LIFECYCLE_TICK_S * 1000)
+        print(f"[INFO] Idle freezing enabled. Freeze after {config.freeze_idle_min or '-'} min, "
+              f"discard after {config.discard_idle_min or '-'} min.")
+
+    def _on_lifecycle_tick(self):
+        for browser in self.browsers:
+            if page_lifecycle.state(browser.browser_id) == STATE_ACTIVE and browser.can_freeze():
+                browser.query_activity(lambda report, b=browser: self._on_lifecycle_report(b, report))
+        for browser_id in page_lifecycle.due_peeks():
+            browser = next(b for b in self.browsers if b.browser_id == browser_id)
+            browser.peek(lambda report, b=browser: self._on_peek_report(b, report))
+
+    def _on_lifecycle_report(self, browser, report):
+        target = page_lifecycle.report(browser.browser_id, report)
+        # The view may have started loading since the query
+        if target and browser.can_freeze():
+            browser.freeze(discard=target == STATE_DISCARDED)
+
+    def _on_peek_report(self, browser, report):
+        if page_lifecycle.state(browser.browser_id) != STATE_FROZEN:
+            return
+        target = page_lifecycle.peek_finished(browser.browser_id, report)
+        if target == STATE_ACTIVE:
+            browser.thaw("Aktivität auf dem Board")
+        else:
+            browser.freeze(discard=target == STATE_DISCARDED)
+
+    def init_schedule(self):
+        """Suspends the boards outside the operating hours (see operating_hours.py)."""
+        operating_schedule.configure(config.schedule_enabled, config.schedule_open, config.schedule_close,
+                                     config.schedule_days, config.schedule_warmup_min)
+        if hasattr(self, 'schedule_timer'):
+            self.schedule_timer.stop()
+        if not operating_schedule.enabled or self.is_setup_mode:
+            if operating_schedule.enabled:
+                print("[INFO] Setup mode active: operating hours are ignored.")
+            # Changed at runtime: boards suspended by the old schedule come back
+            self._open_venue()
+            return
+        print(f"[INFO] Operating hours: {operating_schedule.hours.describe()}, "
+              f"warm start {config.schedule_warmup_min} min before opening.")
+        if not hasattr(self, 'schedule_timer'):
+            for browser in self.browsers:
+                browser.loadFinished.connect(lambda ok, b=browser: self._on_warm_load_finished(b, ok))
+            self.schedule_timer = QTimer(self)
+            self.schedule_timer.timeout.connect(self._on_schedule_tick)
+        self.schedule_timer.start(SCHEDULE_TICK_S * 1000)
+        self._on_schedule_tick()
+
+    def _on_schedule_tick(self):
+        phase = operating_schedule.update()
+        if phase == PHASE_CLOSED:
+            self._close_venue()
+        elif phase == PHASE_WARMUP:
+            # The boards load behind the black screen
+            self._show_closed_overlay()
+            self._warm_start()
+        elif phase == PHASE_OPEN:
+            self._open_venue()
+
+    def _open_venue(self):
+        self._warm_start()
+        if self.closed_overlay and self.closed_overlay.isVisible():
+            print("[INFO] Opening time reached. Showing boards.")
+            self.closed_overlay.hide()
+
+    def _close_venue(self):
+        print("[INFO] Outside operating hours. Suspending boards.")
+        self._show_closed_overlay()
+        self._set_background_timers(False)
+        self._warm_pending.clear()
+        for browser in self.browsers:
+            browser.suspend()
+
+    def _warm_start(self):
+        views = [b for b in self.browsers if b.suspended]
+        if not views:
+            return
+        print(f"[INFO] Warm start: loading {len(views)} board(s) before opening.")
+        operating_schedule.warm_start_begun()
+        # A fresh day: restagger the reloads and forget the idle time of the last evening
+        refresh_scheduler.configure(config.refresh_interval_min * 60, [b.browser_id for b in self.browsers])
+        for browser in views:
+            page_lifecycle.activity(browser.browser_id)
+            self._warm_pending.add(browser.browser_id)
+            browser.resume(self._on_view_resumed)
+        self._set_background_timers(True)
+
+    def _on_view_resumed(self, browser):
+        if config.prewarm_enabled:
+            origins = prewarm_origins(config.autodarts_url, config.auth_url)
+            browser.prewarm(origins, lambda _browser_id, b=browser: b.load_target_url())
+        else:
+            browser.load_target_url()
+
+    def _on_warm_load_finished(self, browser, ok):
+        # Ready once the board itself (not the login page) has loaded
+        if not ok or browser.browser_id not in self._warm_pending:
+            return
+        if browser.url().toString().split("#")[0] != browser.target_url:
+            return
+        self._warm_pending.discard(browser.browser_id)
+        if not self._warm_pending:
+            operating_schedule.warm_start_done()
+            print(f"[INFO] Boards ready {operating_schedule.last_warm_start_s}s after warm start.")
+
+    def _set_background_timers(self, running):
+        """Stops the periodic timers while closed; on opening only those of enabled features restart."""
+        timers = {'refresh_timer': self._refresh_timer_needed(), 'memory_timer': True,
+                  'lifecycle_timer': page_lifecycle.enabled, 'retry_probe_timer': True}
+        for name, enabled in timers.items():
+            timer = getattr(self, name, None)
+            if timer is None:
+                continue
+            if running and enabled:
+                timer.start()
+            else:
+                timer.stop()
+
+    def _show_closed_overlay(self):
+        if self.closed_overlay is None:
+            self.closed_overlay = QLabel(self)
+            self.closed_overlay.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            # Nearly black: readable up close, but no light in the room
+            self.closed_overlay.setStyleSheet("background-color: black; color: #3a3a3a; font-size: 18px;")
+        self.closed_overlay.setText(f"Geschlossen - Öffnungszeiten: {operating_schedule.hours.describe()}")
+        self.closed_overlay.setGeometry(self.rect())
+        self.closed_overlay.show()
+        self.closed_overlay.raise_()
+        if self.qr_overlay:
+            self.qr_overlay.raise_()
+
+    def apply_config_change(self, subsystems):
+        """Reapplies the subsystems affected by a change through /api/config (Qt thread)."""
+        if SUBSYSTEM_RESTART in subsystems:
+            # Requested directly, e.g. after an offline update moved the watched files away
+            print("[INFO] Restart requested by the config server.")
+            self._trigger_restart()
+            return
+        config.reload()
+        print(f"[INFO] Applying config change: {', '.join(subsystems) or 'no browser subsystem'}")
+        if SUBSYSTEM_ZOOM in subsystems:
+            for browser in self.browsers:
+                browser.setZoomFactor(config.zoom_factor)
+        if SUBSYSTEM_REQUEST_FILTER in subsystems:
+            self.init_request_filter()
+        if SUBSYSTEM_MEMORY in subsystems:
+            memory_watchdog.configure(config.memory_budget_mb, config.memory_growth_mb_h)
+        if SUBSYSTEM_REFRESH in subsystems or SUBSYSTEM_MEMORY in subsystems:
+            self.init_refresh_timer()
+        if SUBSYSTEM_LIFECYCLE in subsystems:
+            # The new settings start from awake views
+            for browser in self.browsers:
+                browser.thaw("Konfiguration")
+            self.init_page_lifecycle()
+        if SUBSYSTEM_SCHEDULE in subsystems:
+            self.init_schedule()
+        elif operating_schedule.phase == PHASE_CLOSED:
+            # Timers restarted above stay off while the venue is closed
+            self._set_background_timers(False)
+        if SUBSYSTEM_AUTOLOGIN in subsystems:
+            # Views stuck on the login page try again with the new credentials
+            for browser in self.browsers:
+                browser.login_attempts = 0
+                if not browser.suspended and browser.url().toString().split("#")[0] != browser.target_url:
+                    browser.load_target_url()
+        if SUBSYSTEM_PAGES in subsystems:
+            self.refresh_pages()
+
+    def init_memory_watchdog(self):
+        memory_watchdog.configure(config.memory_budget_mb, config.memory_growth_mb_h)
+        # Samples are always recorded for the diagnostics page
+        self.memory_timer = QTimer(self)
+        self.memory_timer.timeout.connect(self._on_memory_tick)
+        self.memory_timer.start(MEMORY_SAMPLE_INTERVAL_S * 1000)
+        if memory_watchdog.enabled:
+            print(f"[INFO] Memory watchdog enabled. Budget: {config.memory_budget_mb} MB, "
+                  f"growth limit: {config.memory_growth_mb_h} MB/h.")
+
+    def _on_memory_tick(self):
+        for browser in self.browsers:
+            memory_watchdog.sample(browser.browser_id, browser.page.renderProcessPid())
+            if not memory_watchdog.enabled or page_lifecycle.state(browser.browser_id) != STATE_ACTIVE:
+                continue
+            reason = memory_watchdog.check(browser.browser_id)
+            # Recycles only this view, once it is idle (between games)
+            if reason and refresh_scheduler.request_reload(browser.browser_id, reason):
+                memory_watchdog.recycled(browser.browser_id)
+                print(f"[Browser {browser.browser_id}] Recycle requested: {reason}")
 
     def init_config_watcher(self):
         self.watcher = QFileSystemWatcher()
 
-        # Watch config file
+        # Watch config file; only changes of its content count
+        self._config_revision = config_store.current_revision()
+        self.config_settle_timer = QTimer(self)
+        self.config_settle_timer.setSingleShot(True)
+        self.config_settle_timer.timeout.connect(self._on_config_settled)
         self.watcher.addPath(str(CONFIG_PATH))
 
         # Watch style file
@@ -401,10 +1263,12 @@ class AutodartsBrowser(QMainWindow):
     def _on_file_changed(self, path):
         changed_path = str(Path(path).absolute())
         print(f"[DEBUG] File changed: {changed_path}")
+        # An atomic write replaces the file, and the watcher drops the old one
+        if path not in self.watcher.files() and Path(path).exists():
+            self.watcher.addPath(path)
 
         if str(CONFIG_PATH.absolute()) == changed_path:
-            print("[INFO] config.ini changed. Scheduling restart.")
-            self._trigger_restart()
+            self.config_settle_timer.start(CONFIG_SETTLE_MS)
 
         elif str(CSS_PATH.absolute()) == changed_path:
             print("[INFO] style.css changed. Updating styles.")
@@ -418,6 +1282,28 @@ class AutodartsBrowser(QMainWindow):
             print("[INFO] Reload trigger detected. Reloading all browser pages.")
             self.refresh_pages()
 
+    def _on_config_settled(self):
+        try:
+            text = config_store.read_text()
+            parse_config(text)
+        except (OSError, configparser.Error) as e:
+            # Half written or broken; the next write triggers again
+            print(f"[WARN] config.ini can't be read ({e}). Waiting for the next change.")
+            return
+        revision = config_revision(text)
+        if revision == self._config_revision:
+            print("[DEBUG] config.ini rewritten without changes. Ignored.")
+            return
+        self._config_revision = revision
+        entry = config_store.journal_entry(revision)
+        source = entry['source'] if entry else "external"
+        changed = ", ".join(entry['changed']) if entry else "unknown"
+        if live_config.is_expected(revision):
+            print(f"[INFO] config.ini changed through the config API ({changed}). Applied without restart.")
+        else:
+            print(f"[INFO] config.ini changed by {source} ({changed}). Scheduling restart.")
+            self._trigger_restart()
+
     def _trigger_restart(self):
         self._is_restarting = True
         # Stop watching to prevent multiple triggers
@@ -431,8 +1317,23 @@ class AutodartsBrowser(QMainWindow):
         self._cleanup_started = True
 
         print("[INFO] Cleaning up resources...")
+        live_config.register(None)
         if hasattr(self, 'refresh_timer'):
             self.refresh_timer.stop()
+        if hasattr(self, 'memory_timer'):
+            self.memory_timer.stop()
+        if hasattr(self, 'heartbeat_timer'):
+            self.heartbeat_timer.stop()
+        if hasattr(self, 'retry_probe_timer'):
+            self.retry_probe_timer.stop()
+        if hasattr(self, 'lifecycle_timer'):
+            self.lifecycle_timer.stop()
+        if hasattr(self, 'schedule_timer'):
+            self.schedule_timer.stop()
+        for browser in self.browsers:
+            browser.retry_timer.stop()
+            browser.peek_timer.stop()
+        stall_detector.stop()
 
         if self.http_server:
             print("[INFO] Shutting down HTTP server...")
@@ -453,37 +1354,13 @@ class AutodartsBrowser(QMainWindow):
         QTimer.singleShot(200, QApplication.instance().quit)
 
 
-def perform_cache_cleanup():
-    if CLEAR_CACHE_MARKER_PATH.exists():
-        print("[INFO] Clear cache marker found. Deleting cache...")
-        cache_dir_rel = config.cache_dir.lstrip('/\\')
-        cache_dir = APP_DIR / cache_dir_rel
-        try:
-            if cache_dir.exists():
-                # Safeguard: Ensure we are not deleting critical directories
-                resolved_cache_dir = cache_dir.resolve()
-                resolved_app_dir = APP_DIR.resolve()
-
-                # Prevent deleting the app's root directory or its parent
-                if resolved_cache_dir == resolved_app_dir or resolved_cache_dir == resolved_app_dir.parent:
-                    print(
-                        f"[ERROR] Attempt to delete application root or parent directory as cache: {cache_dir}. Aborting cache clear.")
-                    return
-                # Also check if cache_dir is a critical system path (e.g. root)
-                if str(resolved_cache_dir) == '/':
-                    print(
-                        f"[ERROR] Attempt to delete root directory as cache. Aborting cache clear.")
-                    return
-
-                shutil.rmtree(cache_dir)
-                print(f"[INFO] Cache directory {cache_dir} deleted.")
-            CLEAR_CACHE_MARKER_PATH.unlink()
-            print("[INFO] Marker file removed.")
-        except Exception as e:
-            print(f"[ERROR] Failed to clear cache: {e}")
+def start_config_server():
+    from config_server import start_server
+    start_server()
 
 
 def main():
+    global performance_profile
     try:
         # Setup logging
         import logging
@@ -507,14 +1384,36 @@ def main():
 
         print(f"Application started. Version: {__version__}")
 
-        # Check for cache clear request
-        perform_cache_cleanup()
+        # Chromium reads its flags when QtWebEngine starts, i.e. before QApplication exists
+        performance_profile = PerformanceProfile.from_config(config)
+        chromium_flags = apply_chromium_flags(performance_profile)
+        print(f"[INFO] Performance preset: {performance_profile.preset}. Chromium flags: {chromium_flags or '-'}")
 
-        # Start the configuration server
-        print("Starting configuration server on http://0.0.0.0:5000")
-        start_server()
+        # Independent steps run concurrently; everything is recorded in the startup trace
+        orchestrator = StartupOrchestrator()
+        orchestrator.submit("load_templates", load_templates)
+        # Check for cache clear request and cache budget (deletion runs in background)
+        orchestrator.submit("cache_maintenance", perform_startup_maintenance, config)
+        orchestrator.submit("network_probe", wait_for_network, urlparse(config.autodarts_url).hostname)
+
+        # Resolve the local address and pre-render the QR code in the background
+        address_service.start()
+
+        # Readiness probe instead of a fixed sleep in start.sh
+        with trace.phase("wait_for_display"):
+            wait_for_display()
 
-        app = QApplication(sys.argv)
+        with trace.phase("qapplication"):
+            app = QApplication(sys.argv)
+
+        try:
+            orchestrator.result("load_templates")
+        except FileNotFoundError as e:
+            QMessageBox.critical(None, "Script Error",
+                                 f"A script file was not found.\n{e}")
+            sys.exit(1)
+        # Profiles must not be opened while cache directories are being moved
+        orchestrator.result("cache_maintenance")
 
         # --- Screen Selection ---
         screens = app.screens()
@@ -528,11 +1427,30 @@ def main():
         print(
             f"[INFO] Using screen {target_screen_index}: {target_screen.name()}")
 
-        main_window = AutodartsBrowser()
-        main_window.setScreen(target_screen)
-        main_window.showFullScreen()
+        with trace.phase("main_window"):
+            main_window = AutodartsBrowser()
+            main_window.setScreen(target_screen)
+            main_window.showFullScreen()
+
+        # First page load starts before the config server and the QR code
+        main_window.load_pages_when_ready(orchestrator.future("network_probe"))
+        # Keep a trace even if no page ever loads (e.g. offline)
+        QTimer.singleShot(STARTUP_TRACE_TIMEOUT_MS, main_window.save_startup_trace)
+
+        # Start the configuration server. Importing Flask & co. happens in the
+        # worker thread, not before the first frame.
+        print("Starting configuration server on http://0.0.0.0:5000")
+        orchestrator.submit("config_server", start_config_server)
+
+        # Show QR Code on startup if enabled or if in setup mode
+        if config.show_qr_on_startup or main_window.is_setup_mode:
+            main_window.show_qr_code()
 
         app.aboutToQuit.connect(main_window.cleanup)
+        app.aboutToQuit.connect(orchestrator.shutdown)
+
+        # After an offline update: confirm once the config server answers
+        confirm_pending_update()
 
         exit_code = app.exec()
 
@@ -541,7 +1459,9 @@ def main():
             # Give some time for resources (like port 5000) to be released
             time.sleep(2)
             # Clean restart using subprocess to release all file descriptors (sockets)
-            subprocess.Popen([sys.executable] + sys.argv)
+            child = subprocess.Popen([sys.executable] + sys.argv)
+            # Roll back an offline update if the new version does not come up
+            spawn_update_supervisor(child.pid)
             sys.exit(0)
         else:
             print("[INFO] Application has exited.")
@@ -0,0 +1,442 @@
+"""
+Fleet mode: pushing config, CSS, themes and commands to other kiosks.
+
+Every adarts-browser device runs its own config server with its own login.
+This device keeps a registry of peer devices (fleet.json, known by device_id
+and device_name, passwords encrypted like the autologin password) and sends
+the same request to all of them at once, through the JSON API of each peer:
+
+    PATCH /api/config            config patch (see config_schema)
+    PUT   /api/css               style.css
+    PUT   /api/themes/<name>     a theme file
+    POST  /api/commands/<name>   reload or restart
+
+Requests run concurrently in a thread pool over kept-alive connections (one
+small pool per peer). Each peer has its own timeout; failed requests are
+retried with backoff: connection errors and 502/503/504 for idempotent
+requests, for commands only if the request could not be sent at all (a
+restart must not run twice; commands always use a new connection, so a
+dropped kept-alive connection can't hide whether the peer got them). The results of all peers are collected into one
+FleetReport, so pushing to 30 devices takes as long as the slowest one.
+
+This module has no Flask imports; config_server.py provides the page and the
+API on top of it.
+"""
+
+import base64
+import http.client
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, quote
+
+import metrics
+from config_store import atomic_write
+from credentials import credentials
+from load_retry import backoff_delay
+from utils import FLEET_PATH
+
+DEFAULT_PORT = 5000
+CONNECT_TIMEOUT_S = 3
+DEFAULT_TIMEOUT_S = 10
+MAX_ATTEMPTS = 3
+RETRY_BASE_S = 0.5
+RETRY_MAX_S = 4
+MAX_WORKERS = 32
+# Idle connections kept per peer
+POOL_SIZE = 4
+RETRY_STATUS = (502, 503, 504)
+
+ACTION_CONFIG = "config"
+ACTION_CSS = "css"
+ACTION_THEME = "theme"
+ACTION_RELOAD = "reload"
+ACTION_RESTART = "restart"
+ACTION_PROBE = "probe"
+COMMANDS = (ACTION_RELOAD, ACTION_RESTART)
+
+
+class FleetError(Exception):
+    """A peer could not be added or an action is invalid."""
+
+
+def normalize_url(url):
+    """http://host:port of a peer; the port defaults to 5000."""
+    url = (url or "").strip().rstrip("/")
+    if "://" not in url:
+        url = "http://" + url
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise FleetError(f"Ungültige Adresse '{url}'")
+    return f"{parsed.scheme}://{parsed.hostname}:{parsed.port or DEFAULT_PORT}"
+
+
+class Peer:
+    __slots__ = ("url", "device_id", "device_name", "username", "password_token", "timeout_s",
+                 "last_seen", "last_error")
+
+    def __init__(self, url, device_id, device_name="", username="", password_token="",
+                 timeout_s=DEFAULT_TIMEOUT_S, last_seen=None, last_error=None):
+        self.url = url
+        self.device_id = device_id
+        self.device_name = device_name
+        self.username = username
+        self.password_token = password_token
+        self.timeout_s = timeout_s
+        self.last_seen = last_seen
+        self.last_error = last_error
+
+    @property
+    def label(self):
+        return self.device_name or self.url
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+
+class PeerRegistry:
+    """The known peers, stored in fleet.json. Thread safe."""
+
+    def __init__(self, path=FLEET_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._peers = None
+
+    def _load(self):
+        """Caller must hold the lock."""
+        if self._peers is None:
+            self._peers = {}
+            try:
+                for data in json.loads(self.path.read_text(encoding="utf-8")).get('peers', []):
+                    peer = Peer.from_dict(data)
+                    self._peers[peer.device_id] = peer
+            except FileNotFoundError:
+                pass
+            except (ValueError, TypeError, KeyError) as e:
+                print(f"[WARN] Could not read {self.path.name}: {e}")
+        return self._peers
+
+    def _save(self):
+        data = {'peers': [peer.to_dict() for peer in self._peers.values()]}
+        atomic_write(self.path, json.dumps(data, indent=2))
+
+    def all(self):
+        with self._lock:
+            return sorted(self._load().values(), key=lambda peer: (peer.device_name or peer.url).lower())
+
+    def get(self, device_id):
+        with self._lock:
+            return self._load().get(device_id)
+
+    def select(self, device_ids=None):
+        """The peers with the given ids (all peers if None or empty)."""
+        peers = self.all()
+        if not device_ids:
+            return peers
+        return [peer for peer in peers if peer.device_id in device_ids]
+
+    def put(self, peer):
+        with self._lock:
+            peers = self._load()
+            # The same device may have been registered under an old address
+            for device_id in [d for d, p in peers.items() if p.url == peer.url and d != peer.device_id]:
+                del peers[device_id]
+            peers[peer.device_id] = peer
+            self._save()
+
+    def remove(self, device_id):
+        with self._lock:
+            if self._load().pop(device_id, None) is None:
+                return False
+            self._save()
+            return True
+
+    def update_status(self, results):
+        """Stores when each peer last answered (and its name, if the answer had one)."""
+        with self._lock:
+            peers = self._load()
+            for result in results:
+                peer = peers.get(result.device_id)
+                if peer is None:
+                    continue
+                if result.ok:
+                    peer.last_seen = time.strftime("%d.%m. %H:%M:%S")
+                    peer.last_error = None
+                    name = (result.body or {}).get('config', {}).get('main', {}).get('device_name')
+                    if name is not None:
+                        peer.device_name = name
+                else:
+                    peer.last_error = result.error
+            self._save()
+
+    def reencrypt(self, reencrypt):
+        """Key rotation hook (see credentials.rotate_key). Returns the number of passwords."""
+        with self._lock:
+            peers = [peer for peer in self._load().values() if peer.password_token]
+            for peer in peers:
+                peer.password_token = reencrypt(peer.password_token)
+            if peers:
+                self._save()
+            return len(peers)
+
+
+class ConnectionPool:
+    """Kept-alive HTTP connections, a few idle ones per peer. Thread safe."""
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, url, timeout_s, reuse=True):
+        """Returns (connection, reused). reuse=False always opens a new connection."""
+        with self._lock:
+            idle = self._idle.get(url) if reuse else None
+        if idle is not None:
+            try:
+                connection = idle.get_nowait()
+                connection.timeout = timeout_s
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout_s)
+                return connection, True
+            except queue.Empty:
+                pass
+        parsed = urlparse(url)
+        connection_class = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        return connection_class(parsed.hostname, parsed.port, timeout=min(CONNECT_TIMEOUT_S, timeout_s)), False
+
+    def release(self, url, connection):
+        with self._lock:
+            idle = self._idle.setdefault(url, queue.Queue(self.size))
+        try:
+            idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = list(self._idle.values()), {}
+        for idle in pools:
+            while not idle.empty():
+                idle.get_nowait().close()
+
+
+class PeerResult:
+    __slots__ = ("device_id", "device_name", "url", "ok", "status", "error", "attempts", "elapsed_ms", "body")
+
+    def __init__(self, peer):
+        self.device_id = peer.device_id
+        self.device_name = peer.device_name
+        self.url = peer.url
+        self.ok = False
+        self.status = None
+        self.error = None
+        self.attempts = 0
+        self.elapsed_ms = None
+        self.body = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FleetReport:
+    """The results of one action on all peers."""
+
+    def __init__(self, action, results, elapsed_ms):
+        self.action = action
+        self.results = results
+        self.elapsed_ms = elapsed_ms
+        self.time = time.strftime("%d.%m. %H:%M:%S")
+
+    @property
+    def succeeded(self):
+        return sum(1 for result in self.results if result.ok)
+
+    @property
+    def failed(self):
+        return len(self.results) - self.succeeded
+
+    def to_dict(self):
+        return {
+            'action': self.action,
+            'time': self.time,
+            'elapsed_ms': self.elapsed_ms,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'results': [result.to_dict() for result in self.results],
+        }
+
+
+class FleetClient:
+    """Sends requests to peers concurrently."""
+
+    def __init__(self, pool=None, max_workers=MAX_WORKERS, sleep=time.sleep):
+        self.pool = pool or ConnectionPool()
+        self.max_workers = max_workers
+        self._sleep = sleep
+
+    def _headers(self, peer, content_type):
+        headers = {'Accept': "application/json", 'Connection': "keep-alive"}
+        if content_type:
+            headers['Content-Type'] = content_type
+        if peer.username:
+            password = credentials.decrypt(peer.password_token)
+            token = base64.b64encode(f"{peer.username}:{password}".encode()).decode()
+            headers['Authorization'] = f"Basic {token}"
+        return headers
+
+    def _send(self, peer, method, path, body, headers, idempotent):
+        """
+        One request. Returns (status, body). Raises OSError/HTTPException;
+        sent is True on the exception if the request may have reached the peer.
+        Non-idempotent requests use a new connection: a failure on a kept-alive
+        one can't tell whether the peer already got the request.
+        """
+        for fresh in (False, True):
+            connection, reused = self.pool.acquire(peer.url, peer.timeout_s, reuse=idempotent)
+            try:
+                if connection.sock is None:
+                    try:
+                        connection.connect()
+                    except (OSError, http.client.HTTPException) as e:
+                        e.sent = False
+                        raise
+                    connection.sock.settimeout(peer.timeout_s)
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                # A kept-alive connection may have been closed by the peer; once more on a new one
+                if reused and not fresh and isinstance(e, (ConnectionError, http.client.RemoteDisconnected,
+                                                           http.client.CannotSendRequest)):
+                    continue
+                if not hasattr(e, "sent"):
+                    e.sent = True
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.pool.release(peer.url, connection)
+            return response.status, data
+        raise AssertionError("unreachable")
+
+    def request(self, peer, method, path, body=None, content_type=None, idempotent=True):
+        """Sends one request with retries. Returns a PeerResult."""
+        result = PeerResult(peer)
+        headers = self._headers(peer, content_type)
+        start = time.perf_counter()
+        while True:
+            result.attempts += 1
+            retry = False
+            try:
+                status, data = self._send(peer, method, path, body, headers, idempotent)
+                result.status = status
+                try:
+                    result.body = json.loads(data) if data else None
+                except ValueError:
+                    result.body = None
+                result.ok = 200 <= status < 300
+                if not result.ok:
+                    message = result.body.get('error') if isinstance(result.body, dict) else None
+                    result.error = f"HTTP {status}" + (f": {message}" if message else "")
+                    retry = idempotent and status in RETRY_STATUS
+            except (OSError, http.client.HTTPException) as e:
+                result.error = f"{type(e).__name__}: {e}" if str(e) else type(e).__name__
+                retry = idempotent or not e.sent
+            if result.ok or not retry or result.attempts >= MAX_ATTEMPTS:
+                break
+            self._sleep(backoff_delay(result.attempts, base=RETRY_BASE_S, maximum=RETRY_MAX_S))
+        result.elapsed_ms = round((time.perf_counter() - start) * 1000)
+        return result
+
+    def fan_out(self, action, peers, method, path, body=None, content_type=None, idempotent=True):
+        """Sends the same request to all peers at once. Returns a FleetReport."""
+        start = time.perf_counter()
+        if peers:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(peers)),
+                                    thread_name_prefix="fleet") as executor:
+                results = list(executor.map(
+                    lambda peer: self.request(peer, method, path, body, content_type, idempotent), peers))
+        else:
+            results = []
+        report = FleetReport(action, results, round((time.perf_counter() - start) * 1000))
+        for result in results:
+            metrics.FLEET_REQUESTS.inc(action=action, result="ok" if result.ok else "failed")
+        metrics.FLEET_FANOUT_SECONDS.observe(report.elapsed_ms / 1000, action=action)
+        return report
+
+
+class Fleet:
+    """The actions of the fleet page and API."""
+
+    def __init__(self, registry=None, client=None):
+        self.registry = registry or PeerRegistry()
+        self.client = client or FleetClient()
+        self._lock = threading.Lock()
+        self.last_report = None
+
+    def _finish(self, report):
+        with self._lock:
+            self.last_report = report
+        if report.results:
+            print(f"[INFO] Fleet {report.action}: {report.succeeded} ok, {report.failed} failed "
+                  f"({report.elapsed_ms} ms)")
+        return report
+
+    def add_peer(self, url, username="", password="", timeout_s=DEFAULT_TIMEOUT_S):
+        """Registers a peer after asking it for its device ID. Raises FleetError."""
+        peer = Peer(normalize_url(url), device_id="", username=username.strip(),
+                    password_token=credentials.encrypt(password) if password else "", timeout_s=timeout_s)
+        result = self.client.request(peer, "GET", "/api/config")
+        if not result.ok:
+            raise FleetError(f"{peer.url} antwortet nicht wie erwartet ({result.error})")
+        info = result.body or {}
+        if not info.get('device_id'):
+            raise FleetError(f"{peer.url} ist kein adarts-browser (keine Geräte-ID)")
+        peer.device_id = info['device_id']
+        peer.device_name = info.get('config', {}).get('main', {}).get('device_name', "")
+        peer.last_seen = time.strftime("%d.%m. %H:%M:%S")
+        self.registry.put(peer)
+        return peer
+
+    def probe(self, device_ids=None):
+        """Asks all peers for their config (reachability, current names)."""
+        report = self.client.fan_out(ACTION_PROBE, self.registry.select(device_ids), "GET", "/api/config")
+        self.registry.update_status(report.results)
+        return self._finish(report)
+
+    def push_config(self, patch, device_ids=None):
+        if not isinstance(patch, dict) or not patch:
+            raise FleetError("Die Änderung muss ein Objekt {Abschnitt: {Option: Wert}} sein")
+        body = json.dumps(patch).encode()
+        return self._finish(self.client.fan_out(
+            ACTION_CONFIG, self.registry.select(device_ids), "PATCH", "/api/config", body, "application/json"))
+
+    def push_css(self, css, device_ids=None):
+        return self._finish(self.client.fan_out(
+            ACTION_CSS, self.registry.select(device_ids), "PUT", "/api/css", css.encode("utf-8"),
+            "text/css; charset=utf-8"))
+
+    def push_theme(self, name, css, device_ids=None):
+        return self._finish(self.client.fan_out(
+            ACTION_THEME, self.registry.select(device_ids), "PUT", f"/api/themes/{quote(name)}",
+            css.encode("utf-8"), "text/css; charset=utf-8"))
+
+    def command(self, name, device_ids=None):
+        if name not in COMMANDS:
+            raise FleetError(f"Unbekannter Befehl '{name}'")
+        # Not repeated once sent: a restart must not run twice
+        return self._finish(self.client.fan_out(
+            name, self.registry.select(device_ids), "POST", f"/api/commands/{name}", b"",
+            idempotent=name == ACTION_RELOAD))
+
+
+fleet = Fleet()
+credentials.add_rotation_hook(fleet.registry.reencrypt)
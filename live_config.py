@@ -0,0 +1,51 @@
+"""
+Applying config changes in the running browser without a restart.
+
+The config server runs in the browser's process. After /api/config saved a
+change, it calls live_config.apply() with the affected subsystems;
+darts-browser.py registers the handler that reapplies them on the Qt thread.
+The revision written by the API is announced beforehand with expect(), so the
+config.ini watcher knows the change is already applied and does not restart
+the application. apply() with config_schema.SUBSYSTEM_RESTART restarts the
+browser directly (after an offline update the watched files are gone).
+"""
+
+import threading
+from collections import deque
+
+EXPECTED_REVISIONS = 10
+
+
+class LiveConfig:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handler = None
+        self._expected = deque(maxlen=EXPECTED_REVISIONS)
+
+    def register(self, handler):
+        """handler(subsystems) is called from the config server thread; it must hand over to Qt itself."""
+        self._handler = handler
+
+    @property
+    def available(self):
+        return self._handler is not None
+
+    def expect(self, revision):
+        """Announces a revision that is written and applied live (the watcher must not restart)."""
+        with self._lock:
+            self._expected.append(revision)
+
+    def is_expected(self, revision):
+        with self._lock:
+            return revision in self._expected
+
+    def apply(self, subsystems):
+        """Reapplies the subsystems in the browser. Returns False if no browser is running."""
+        handler = self._handler
+        if handler is None:
+            return False
+        handler(list(subsystems))
+        return True
+
+
+live_config = LiveConfig()
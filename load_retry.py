@@ -0,0 +1,145 @@
+"""
+Automatic retry of failed page loads.
+
+When a board page fails to load, the view retries with exponential backoff and
+jitter (so several kiosks behind one access point don't retry in lockstep).
+While views are failing, a TCP probe checks the Autodarts host every few
+seconds; when it becomes reachable again after being unreachable (e.g. Wi-Fi
+came back), all failing views retry at once instead of waiting for their
+backoff timer.
+
+Per view the number of retries and the time from the first failure to the
+next successful load (time to recover) are kept for the diagnostics page and
+the metrics. The Qt side (timers, placeholder image) is in darts-browser.py.
+"""
+
+import random
+import socket
+import statistics
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+import metrics
+
+BASE_DELAY_S = 2
+MAX_DELAY_S = 60
+JITTER = 0.3
+PROBE_INTERVAL_S = 2
+PROBE_TIMEOUT_S = 2
+RECOVERY_HISTORY = 20
+
+
+def backoff_delay(attempt, base=BASE_DELAY_S, maximum=MAX_DELAY_S, jitter=JITTER, rand=random.random):
+    """Delay before retry number attempt (1, 2, ...): base * 2^(attempt-1), capped, +/- jitter."""
+    delay = min(maximum, base * 2 ** (attempt - 1))
+    return delay * (1 - jitter + 2 * jitter * rand())
+
+
+def probe_connectivity(url, timeout=PROBE_TIMEOUT_S):
+    """Returns True if a TCP connection to the host of url can be opened."""
+    parsed = urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    try:
+        with socket.create_connection((parsed.hostname, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+class ViewRetryState:
+    def __init__(self):
+        self.attempts = 0           # Failed loads since the last success
+        self.failed_since = None    # Time of the first failure
+        self.last_error = ""
+        self.next_retry_at = None
+        self.retries = 0
+        self.recoveries = 0
+        self.recover_times = deque(maxlen=RECOVERY_HISTORY)
+
+
+class LoadRetryTracker:
+    """Backoff state and counters of all views. Thread safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._reachable = None
+
+    def _state(self, browser_id):
+        return self._views.setdefault(browser_id, ViewRetryState())
+
+    def failed(self, browser_id, error="", now=None):
+        """Records a failed load. Returns the delay (s) until the next retry."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._state(browser_id)
+            state.attempts += 1
+            if state.failed_since is None:
+                state.failed_since = now
+            state.last_error = error
+            delay = backoff_delay(state.attempts)
+            state.next_retry_at = now + delay
+            return delay
+
+    def retry_started(self, browser_id):
+        with self._lock:
+            state = self._state(browser_id)
+            state.retries += 1
+            state.next_retry_at = None
+        metrics.LOAD_RETRIES.inc(browser=browser_id)
+
+    def succeeded(self, browser_id, now=None):
+        """Records a successful load. Returns the time to recover (s) if the view was failing."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._state(browser_id)
+            if state.failed_since is None:
+                return None
+            duration = now - state.failed_since
+            state.attempts = 0
+            state.failed_since = None
+            state.next_retry_at = None
+            state.recoveries += 1
+            state.recover_times.append(duration)
+        metrics.LOAD_RECOVERY_SECONDS.observe(duration, browser=browser_id)
+        return duration
+
+    def failing(self):
+        """Returns the ids of the views whose last load failed."""
+        with self._lock:
+            return [browser_id for browser_id, s in self._views.items() if s.failed_since is not None]
+
+    def connectivity(self, reachable):
+        """
+        Records a probe result. Returns True if the host became reachable again
+        (the failing views should retry now).
+        """
+        with self._lock:
+            previous, self._reachable = self._reachable, reachable
+        return reachable and previous is False
+
+    def snapshot(self, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            views = []
+            for browser_id, s in sorted(self._views.items()):
+                times = list(s.recover_times)
+                views.append({
+                    'browser_id': browser_id,
+                    'failing': s.failed_since is not None,
+                    'failing_for_s': round(now - s.failed_since) if s.failed_since is not None else None,
+                    'attempts': s.attempts,
+                    'last_error': s.last_error,
+                    'next_retry_in_s': max(0, round(s.next_retry_at - now)) if s.next_retry_at else None,
+                    'retries': s.retries,
+                    'recoveries': s.recoveries,
+                    'recover_last_s': round(times[-1], 1) if times else None,
+                    'recover_median_s': round(statistics.median(times), 1) if times else None,
+                    'recover_max_s': round(max(times), 1) if times else None,
+                })
+            return {'reachable': self._reachable, 'views': views}
+
+
+load_retry = LoadRetryTracker()
@@ -0,0 +1,164 @@
+"""
+Renderer memory watchdog.
+
+Samples the memory of each view's Chromium renderer process (PSS/RSS from
+/proc/<pid>/smaps_rollup) into a ring buffer. When a view exceeds the
+configured budget or keeps growing too fast, only that view is recycled: the
+reload is requested from the refresh scheduler, which waits until the page is
+idle (i.e. between games).
+
+The Qt side (renderer PID, sampling timer) lives in darts-browser.py.
+"""
+
+import threading
+import time
+from collections import deque
+
+import metrics
+
+SAMPLE_INTERVAL_S = 30
+# Two hours of samples per view
+RING_SIZE = 240
+# Growth is measured over this window (same renderer process only)
+GROWTH_WINDOW_S = 30 * 60
+# Minimum time span before the growth rate is trusted
+GROWTH_MIN_SPAN_S = 10 * 60
+# No new recycle request for this long after a recycle
+RECYCLE_COOLDOWN_S = 10 * 60
+
+
+def read_process_memory(pid):
+    """
+    Returns {'pss_mb', 'rss_mb'} of a process or None if it is not readable.
+    PSS (proportional set size) counts shared pages only partially and is the
+    better measure for the many Chromium processes sharing libraries.
+    """
+    if not pid:
+        return None
+    pss_kb = rss_kb = None
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    pss_kb = int(line.split()[1])
+                elif line.startswith("Rss:"):
+                    rss_kb = int(line.split()[1])
+    except (OSError, ValueError):
+        # Older kernels without smaps_rollup: RSS only
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        rss_kb = int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            return None
+    if rss_kb is None:
+        return None
+    return {
+        'pss_mb': round(pss_kb / 1024, 1) if pss_kb is not None else None,
+        'rss_mb': round(rss_kb / 1024, 1),
+    }
+
+
+class MemoryWatchdog:
+    """Keeps memory samples per view and decides when a view needs recycling."""
+
+    def __init__(self, budget_mb=0, growth_mb_per_h=0, ring_size=RING_SIZE):
+        self.budget_mb = budget_mb
+        self.growth_mb_per_h = growth_mb_per_h
+        self.ring_size = ring_size
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._recycles = {}
+        self._last_recycle = {}
+
+    def configure(self, budget_mb, growth_mb_per_h):
+        with self._lock:
+            self.budget_mb = budget_mb
+            self.growth_mb_per_h = growth_mb_per_h
+
+    @property
+    def enabled(self):
+        return self.budget_mb > 0 or self.growth_mb_per_h > 0
+
+    def sample(self, browser_id, pid, now=None):
+        """Records the memory of the renderer pid. Returns the sample or None."""
+        now = time.time() if now is None else now
+        memory = read_process_memory(pid)
+        if memory is None:
+            return None
+        sample = dict(memory, t=now, pid=pid)
+        metrics.RENDERER_MEMORY_BYTES.set(memory['rss_mb'] * 1024 * 1024, browser=browser_id, kind="rss")
+        if memory['pss_mb'] is not None:
+            metrics.RENDERER_MEMORY_BYTES.set(memory['pss_mb'] * 1024 * 1024, browser=browser_id, kind="pss")
+        with self._lock:
+            self._samples.setdefault(browser_id, deque(maxlen=self.ring_size)).append(sample)
+        return sample
+
+    @staticmethod
+    def _value(sample):
+        return sample['pss_mb'] if sample['pss_mb'] is not None else sample['rss_mb']
+
+    def _growth(self, samples):
+        """MB per hour of the current renderer process over the growth window, or None."""
+        if not samples:
+            return None
+        latest = samples[-1]
+        window = [s for s in samples if s['pid'] == latest['pid'] and latest['t'] - s['t'] <= GROWTH_WINDOW_S]
+        span = latest['t'] - window[0]['t']
+        if span < GROWTH_MIN_SPAN_S:
+            return None
+        return (self._value(latest) - self._value(window[0])) / span * 3600
+
+    def check(self, browser_id, now=None):
+        """Returns the reason why the view should be recycled, or None."""
+        now = time.time() if now is None else now
+        with self._lock:
+            samples = self._samples.get(browser_id)
+            if not samples:
+                return None
+            if now - self._last_recycle.get(browser_id, 0) < RECYCLE_COOLDOWN_S:
+                return None
+            current = self._value(samples[-1])
+            if self.budget_mb > 0 and current > self.budget_mb:
+                return f"Speicher {current:.0f} MB > {self.budget_mb} MB"
+            growth = self._growth(samples)
+            if self.growth_mb_per_h > 0 and growth is not None and growth > self.growth_mb_per_h:
+                return f"Speicherwachstum {growth:.0f} MB/h"
+            return None
+
+    def recycled(self, browser_id, now=None):
+        """Notes that a recycle was requested for the view (starts the cooldown)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._last_recycle[browser_id] = now
+            self._recycles[browser_id] = self._recycles.get(browser_id, 0) + 1
+        metrics.VIEW_RECYCLES.inc(browser=browser_id)
+
+    def snapshot(self):
+        """Returns budget and samples of all views (for the diagnostics page)."""
+        with self._lock:
+            views = []
+            for browser_id, samples in sorted(self._samples.items()):
+                samples = [dict(s, time=time.strftime("%H:%M:%S", time.localtime(s['t']))) for s in samples]
+                growth = self._growth(samples)
+                views.append({
+                    'browser_id': browser_id,
+                    'pid': samples[-1]['pid'],
+                    'current': samples[-1],
+                    'peak_mb': max(self._value(s) for s in samples),
+                    'growth_mb_per_h': round(growth, 1) if growth is not None else None,
+                    'recycles': self._recycles.get(browser_id, 0),
+                    'samples': samples,
+                    'series': [self._value(s) for s in samples],
+                })
+            return {
+                'budget_mb': self.budget_mb,
+                'growth_mb_per_h': self.growth_mb_per_h,
+                'sample_interval_s': SAMPLE_INTERVAL_S,
+                'views': views,
+            }
+
+
+memory_watchdog = MemoryWatchdog()
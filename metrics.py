@@ -0,0 +1,284 @@
+"""
+In-process metrics registry.
+
+A small, dependency free implementation of counters, gauges and histograms
+with labels. The config server exposes the registry on /metrics in the
+Prometheus text format (or as JSON with ?format=json), so many kiosks can be
+scraped from a central monitoring host.
+
+All metrics of the application are defined at the bottom of this module.
+"""
+
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        """Returns a list of (suffix, labels, value) for the text format."""
+        with self._lock:
+            return [("", key, value) for key, value in self._values.items()]
+
+    def to_dict(self):
+        with self._lock:
+            values = [{'labels': dict(key), 'value': value} for key, value in self._values.items()]
+        return {'name': self.name, 'type': self.type, 'help': self.documentation, 'values': values}
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def remove(self, **labels):
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def time(self, **labels):
+        """Context manager observing the duration of the with block."""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self._lock:
+            result = []
+            for key, entry in self._values.items():
+                for bound, count in zip(self.buckets, entry['buckets']):
+                    result.append(("_bucket", key + (("le", _format_value(float(bound))),), count))
+                result.append(("_sum", key, entry['sum']))
+                result.append(("_count", key, entry['count']))
+            return result
+
+    def to_dict(self):
+        with self._lock:
+            values = [{
+                'labels': dict(key),
+                'count': entry['count'],
+                'sum': round(entry['sum'], 6),
+                'buckets': {_format_value(float(b)): c for b, c in zip(self.buckets, entry['buckets'])},
+            } for key, entry in self._values.items()]
+        return {'name': self.name, 'type': self.type, 'help': self.documentation, 'values': values}
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render_prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {'timestamp': time.time(), 'metrics': [m.to_dict() for m in metrics]}
+
+
+registry = Registry()
+
+# --- Application Metrics ---
+INFO = registry.gauge(
+    "adarts_info", "Device and version information (always 1).", ("device_id", "device_name", "version"))
+
+PAGE_LOADS = registry.counter(
+    "adarts_page_loads_total", "Finished page loads per browser view.", ("browser", "result"))
+PAGE_LOAD_SECONDS = registry.histogram(
+    "adarts_page_load_seconds", "Duration from load start to load finished.", ("browser",),
+    buckets=(0.5, 1, 2, 3, 5, 10, 20, 30, 60))
+
+PAGE_TIMING_SECONDS = registry.histogram(
+    "adarts_page_timing_seconds", "Navigation/Paint Timing phases reported by the page.", ("browser", "phase"),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30))
+
+STORED_SESSION = registry.gauge(
+    "adarts_stored_session", "1 if a valid login session was stored in the view's profile at startup.", ("browser",))
+LOAD_RETRIES = registry.counter(
+    "adarts_load_retries_total", "Automatic retries of failed page loads.", ("browser",))
+LOAD_RECOVERY_SECONDS = registry.histogram(
+    "adarts_load_recovery_seconds", "Time from the first failed load to the next successful one.", ("browser",),
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 600))
+
+AUTOLOGIN_ATTEMPTS = registry.counter(
+    "adarts_autologin_attempts_total", "Injected autologin scripts.", ("browser",))
+AUTOLOGIN_RESULTS = registry.counter(
+    "adarts_autologin_results_total", "Autologin outcomes (success, exhausted).", ("browser", "result"))
+
+SCRIPT_INJECTION_SECONDS = registry.histogram(
+    "adarts_script_injection_seconds", "Time until an injected script finished running.", ("browser", "script"),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+CONNECTIVITY_ONLINE = registry.gauge(
+    "adarts_connectivity_online", "1 if the page reaches Autodarts, 0 while the offline overlay is shown.",
+    ("browser",))
+CONNECTIVITY_CHANGES = registry.counter(
+    "adarts_connectivity_changes_total", "Connectivity state changes reported by the page.", ("browser", "state"))
+
+RENDERER_MEMORY_BYTES = registry.gauge(
+    "adarts_renderer_memory_bytes", "Memory of the browser view's renderer process.", ("browser", "kind"))
+VIEW_RECYCLES = registry.counter(
+    "adarts_view_recycles_total", "Reloads requested by the memory watchdog.", ("browser",))
+LIFECYCLE_STATE = registry.gauge(
+    "adarts_view_lifecycle_state", "Lifecycle state of the browser view (0 active, 1 frozen, 2 discarded).",
+    ("browser",))
+LIFECYCLE_TRANSITIONS = registry.counter(
+    "adarts_view_lifecycle_transitions_total", "Transitions of idle views to frozen/discarded and back.",
+    ("browser", "state"))
+
+FILTERED_REQUESTS = registry.counter(
+    "adarts_filtered_requests_total", "Requests seen by the request filter (allowed, blocked, would_block).",
+    ("browser", "action"))
+FILTERED_BYTES_SAVED = registry.counter(
+    "adarts_filtered_bytes_saved_total", "Estimated bytes not downloaded because of blocked requests.", ("browser",))
+
+SCHEDULE_OPEN = registry.gauge(
+    "adarts_schedule_open", "0 while the views are suspended outside the operating hours, otherwise 1.")
+SCHEDULE_WARM_START_SECONDS = registry.histogram(
+    "adarts_schedule_warm_start_seconds", "Time from the warm start before opening until all boards are loaded.",
+    buckets=(2, 5, 10, 20, 30, 60, 120, 300))
+
+CONFIG_WRITES = registry.counter(
+    "adarts_config_writes_total", "Writes of config.ini (written, unchanged = skipped).", ("source", "result"))
+
+FLEET_REQUESTS = registry.counter(
+    "adarts_fleet_requests_total", "Requests sent to fleet peers, by action and result.", ("action", "result"))
+FLEET_FANOUT_SECONDS = registry.histogram(
+    "adarts_fleet_fanout_seconds", "Duration of one fleet action on all selected peers.", ("action",),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60))
+SYNC_POLLS = registry.counter(
+    "adarts_sync_polls_total", "Polls of the central config source (not_modified, unchanged, changed, error).",
+    ("result",))
+SYNC_CHANGES = registry.counter(
+    "adarts_sync_changes_total", "Changes applied from the central config source.", ("kind",))
+
+GUI_STALLS = registry.counter(
+    "adarts_gui_stalls_total", "Times the Qt event loop was blocked longer than the stall threshold.")
+GUI_STALL_SECONDS = registry.histogram(
+    "adarts_gui_stall_seconds", "Duration of Qt event loop stalls.",
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 30))
+
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "adarts_http_request_duration_seconds", "Config server request latency.", ("route", "method"))
+HTTP_REQUESTS = registry.counter(
+    "adarts_http_requests_total", "Config server requests.", ("route", "method", "status"))
+
+STARTUP_PHASE_SECONDS = registry.gauge(
+    "adarts_startup_phase_seconds", "Duration of the startup phases of the current process.", ("phase",))
+STARTUP_MARK_SECONDS = registry.gauge(
+    "adarts_startup_mark_seconds", "Time after process start at which a startup milestone was reached.", ("mark",))
@@ -0,0 +1,207 @@
+"""
+Operating hours of the venue ([schedule] section).
+
+Outside the opening hours darts-browser.py blanks the window, suspends the
+browser views (blank page, renderer discarded) and stops the refresh, memory,
+lifecycle and retry timers; the config server keeps running. warmup_min
+before opening the views are started again behind the blank screen, so the
+connections are pre-warmed and the login is done when the boards are shown.
+Every opening therefore starts with fresh pages, without restarting the
+process.
+
+Opening hours are given per opening day; a closing time before the opening
+time means the venue closes after midnight (e.g. 18:00-02:00).
+
+This module has no Qt imports; darts-browser.py does the Qt side.
+"""
+
+import threading
+from datetime import datetime, time as dtime, timedelta
+
+import metrics
+
+PHASE_OPEN = "open"
+PHASE_WARMUP = "warmup"
+PHASE_CLOSED = "closed"
+
+TICK_S = 30
+DEFAULT_OPEN = "10:00"
+DEFAULT_CLOSE = "23:00"
+DEFAULT_WARMUP_MIN = 10
+
+# Monday = 0; German and English abbreviations
+DAY_NAMES = {
+    'mo': 0, 'mon': 0, 'di': 1, 'tue': 1, 'mi': 2, 'wed': 2, 'do': 3, 'thu': 3,
+    'fr': 4, 'fri': 4, 'sa': 5, 'sat': 5, 'so': 6, 'sun': 6,
+}
+DAY_LABELS = ("Mo", "Di", "Mi", "Do", "Fr", "Sa", "So")
+
+
+def parse_time(text):
+    """Parses HH:MM. Raises ValueError if invalid."""
+    try:
+        hours, minutes = (int(part) for part in text.strip().split(":"))
+        return dtime(hours, minutes)
+    except (ValueError, TypeError):
+        raise ValueError(f"Ungültige Uhrzeit '{text}' (erwartet HH:MM)")
+
+
+def parse_days(text):
+    """
+    Parses a list of weekdays like "mo-fr, so" (empty = every day).
+    Returns a sorted tuple of weekday numbers. Raises ValueError if invalid.
+    """
+    days = set()
+    for part in (text or "").replace(" ", "").lower().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        if first not in DAY_NAMES or (last and last not in DAY_NAMES):
+            raise ValueError(f"Ungültiger Wochentag '{part}' (z.B. mo-fr,so)")
+        start = DAY_NAMES[first]
+        end = DAY_NAMES[last] if last else start
+        # Ranges may wrap around the week (fr-mo)
+        days.update((start + offset) % 7 for offset in range((end - start) % 7 + 1))
+    return tuple(sorted(days)) if days else tuple(range(7))
+
+
+def format_days(days):
+    return ", ".join(DAY_LABELS[day] for day in days) if len(days) < 7 else "täglich"
+
+
+class OperatingHours:
+    """Opening hours: the same opening and closing time on the given weekdays."""
+
+    def __init__(self, open_time=DEFAULT_OPEN, close_time=DEFAULT_CLOSE, days="", warmup_min=DEFAULT_WARMUP_MIN):
+        self.open_time = parse_time(open_time)
+        self.close_time = parse_time(close_time)
+        if self.open_time == self.close_time:
+            raise ValueError("Öffnungs- und Schließzeit dürfen nicht gleich sein")
+        self.days = parse_days(days)
+        self.warmup = timedelta(minutes=max(0, warmup_min))
+
+    def _period(self, day):
+        """(opening, closing) datetime of the opening period starting on date day."""
+        start = datetime.combine(day, self.open_time)
+        end = datetime.combine(day, self.close_time)
+        if end <= start:
+            end += timedelta(days=1)
+        return start, end
+
+    def current_period(self, now):
+        """The opening period containing now, or None."""
+        # A period of yesterday may reach past midnight
+        for offset in (-1, 0):
+            day = (now + timedelta(days=offset)).date()
+            if day.weekday() in self.days:
+                start, end = self._period(day)
+                if start <= now < end:
+                    return start, end
+        return None
+
+    def next_opening(self, now):
+        for offset in range(8):
+            day = (now + timedelta(days=offset)).date()
+            if day.weekday() in self.days:
+                start, _ = self._period(day)
+                if start > now:
+                    return start
+        return None
+
+    def phase(self, now):
+        """Returns (phase, time of the next change)."""
+        period = self.current_period(now)
+        if period:
+            return PHASE_OPEN, period[1]
+        opening = self.next_opening(now)
+        if opening - now <= self.warmup:
+            return PHASE_WARMUP, opening
+        return PHASE_CLOSED, opening - self.warmup
+
+    def describe(self):
+        return f"{format_days(self.days)} {self.open_time:%H:%M}-{self.close_time:%H:%M}"
+
+
+class OperatingSchedule:
+    """Current phase and history of the schedule. Thread safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hours = None
+        self.phase = None
+        self.phase_since = None
+        self.closings = 0
+        self.warm_starts = 0
+        self.last_warm_start_s = None
+        self._warm_start_at = None
+
+    def configure(self, enabled, open_time=DEFAULT_OPEN, close_time=DEFAULT_CLOSE, days="",
+                  warmup_min=DEFAULT_WARMUP_MIN):
+        """Sets the opening hours. Invalid values disable the schedule (with a warning)."""
+        hours = None
+        if enabled:
+            try:
+                hours = OperatingHours(open_time, close_time, days, warmup_min)
+            except ValueError as e:
+                print(f"[WARN] Invalid [schedule]: {e}. Operating hours disabled.")
+        with self._lock:
+            self.hours = hours
+            self.phase = None
+            self.phase_since = None
+
+    @property
+    def enabled(self):
+        return self.hours is not None
+
+    def update(self, now=None):
+        """Returns the new phase if it changed since the last call, otherwise None."""
+        now = datetime.now() if now is None else now
+        if self.hours is None:
+            return None
+        phase, _ = self.hours.phase(now)
+        with self._lock:
+            if phase == self.phase:
+                return None
+            self.phase = phase
+            self.phase_since = now
+            if phase == PHASE_CLOSED:
+                self.closings += 1
+        metrics.SCHEDULE_OPEN.set(0 if phase == PHASE_CLOSED else 1)
+        return phase
+
+    def warm_start_begun(self, now=None):
+        with self._lock:
+            self.warm_starts += 1
+            self._warm_start_at = datetime.now() if now is None else now
+
+    def warm_start_done(self, now=None):
+        """Records that all views finished loading after a warm start."""
+        now = datetime.now() if now is None else now
+        with self._lock:
+            if self._warm_start_at is None:
+                return
+            self.last_warm_start_s = round((now - self._warm_start_at).total_seconds(), 1)
+            self._warm_start_at = None
+        metrics.SCHEDULE_WARM_START_SECONDS.observe(self.last_warm_start_s)
+
+    def snapshot(self, now=None):
+        """Returns configuration and state (for the diagnostics page)."""
+        now = datetime.now() if now is None else now
+        with self._lock:
+            if self.hours is None:
+                return {'enabled': False}
+            _, next_change = self.hours.phase(now)
+            return {
+                'enabled': True,
+                'hours': self.hours.describe(),
+                'warmup_min': int(self.hours.warmup.total_seconds() // 60),
+                'phase': self.phase,
+                'phase_since': self.phase_since.strftime("%d.%m. %H:%M") if self.phase_since else None,
+                'next_change': f"{DAY_LABELS[next_change.weekday()]} {next_change:%d.%m. %H:%M}" if next_change else None,
+                'closings': self.closings,
+                'warm_starts': self.warm_starts,
+                'last_warm_start_s': self.last_warm_start_s,
+            }
+
+
+operating_schedule = OperatingSchedule()
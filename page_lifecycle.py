@@ -0,0 +1,201 @@
+"""
+Freezing of idle board views ([main] freeze_idle_min / discard_idle_min).
+
+A view whose page reported no activity (DOM mutations or network traffic, see
+scripts/activity_probe.js) for freeze_idle_min is frozen: darts-browser.py
+covers it with a screenshot, hides the page and sets Chromium's lifecycle
+state to Frozen, so no JS timers, animations or polling run. After
+discard_idle_min the page is discarded as well and its renderer memory is
+released; thawing a discarded page reloads it.
+
+A frozen page cannot report anything itself, so it is thawed briefly every
+PEEK_INTERVAL_S while still hidden ("peek"). The board's websocket then
+catches up; if the page is still changing after the catch-up (PEEK_SETTLE_S),
+the board is active again and the view is shown. A touch on the screenshot and
+a connectivity change reported by the page thaw the view immediately.
+Discarded views don't peek (every peek would be a full reload), they are only
+thawed by a touch or a reload.
+
+This module only holds the decisions and the statistics; the Qt side lives in
+darts-browser.py.
+"""
+
+import threading
+import time
+
+import metrics
+
+STATE_ACTIVE = "active"
+STATE_FROZEN = "frozen"
+STATE_DISCARDED = "discarded"
+
+# How often the activity of the visible views is checked
+TICK_S = 30
+# Frozen views are woken this often to look for board activity
+PEEK_INTERVAL_S = 120
+# Duration of a peek; the probe is queried at its end
+PEEK_WINDOW_S = 20
+# Mutations right after a peek are the page catching up, not activity
+PEEK_SETTLE_S = 8
+
+
+class ViewLifecycle:
+    def __init__(self, now):
+        self.state = STATE_ACTIVE
+        self.state_since = now
+        self.last_activity = now
+        self.next_peek = None
+        self.peeking_since = None
+        self.freezes = 0
+        self.discards = 0
+        self.thaws = 0
+        self.peeks = 0
+        self.last_thaw_reason = None
+        self.inactive_s = 0.0  # Total time frozen or discarded
+
+
+class PageLifecycle:
+    """Decides when which view is frozen, discarded or thawed. Thread safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.freeze_after_s = 0
+        self.discard_after_s = 0
+        self._views = {}
+
+    def configure(self, freeze_after_s, discard_after_s, browser_ids, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self.freeze_after_s = freeze_after_s
+            self.discard_after_s = discard_after_s
+            self._views = {browser_id: ViewLifecycle(now) for browser_id in browser_ids}
+
+    @property
+    def enabled(self):
+        return self.freeze_after_s > 0 or self.discard_after_s > 0
+
+    def state(self, browser_id):
+        with self._lock:
+            view = self._views.get(browser_id)
+            return view.state if view else STATE_ACTIVE
+
+    def activity(self, browser_id, now=None):
+        """Records activity seen outside of the probe (touch, connectivity change)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            view = self._views.get(browser_id)
+            if view is not None:
+                view.last_activity = now
+
+    def _idle_target(self, view, now):
+        idle_s = now - view.last_activity
+        if self.discard_after_s and idle_s >= self.discard_after_s:
+            return STATE_DISCARDED
+        if self.freeze_after_s and idle_s >= self.freeze_after_s:
+            return STATE_FROZEN
+        return None
+
+    def report(self, browser_id, probe, now=None):
+        """
+        Takes the activity probe's report of an active view. Returns the state the
+        view should move to (STATE_FROZEN, STATE_DISCARDED) or None to keep it.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            view = self._views.get(browser_id)
+            if view is None or view.state != STATE_ACTIVE or not probe or probe.get('idle_ms') is None:
+                return None
+            view.last_activity = max(view.last_activity, now - probe['idle_ms'] / 1000)
+            return self._idle_target(view, now)
+
+    def due_peeks(self, now=None):
+        """Returns the ids of frozen views that should peek now."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return [browser_id for browser_id, view in self._views.items()
+                    if view.state == STATE_FROZEN and view.peeking_since is None
+                    and view.next_peek is not None and view.next_peek <= now]
+
+    def peek_started(self, browser_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            view = self._views[browser_id]
+            view.peeking_since = now
+            view.peeks += 1
+
+    def peek_finished(self, browser_id, probe, now=None):
+        """
+        Evaluates the probe report at the end of a peek. Returns STATE_ACTIVE if the
+        board is active again, otherwise the state to go back to.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            view = self._views[browser_id]
+            started, view.peeking_since = view.peeking_since, None
+            idle_ms = probe.get('idle_ms') if probe else None
+            if idle_ms is not None and started is not None and now - idle_ms / 1000 >= started + PEEK_SETTLE_S:
+                return STATE_ACTIVE
+            view.next_peek = now + PEEK_INTERVAL_S
+            return self._idle_target(view, now) or STATE_FROZEN
+
+    def transition(self, browser_id, state, reason="", now=None):
+        """Records that a view moved to state."""
+        now = time.time() if now is None else now
+        with self._lock:
+            view = self._views.get(browser_id)
+            if view is None or view.state == state:
+                return
+            if state == STATE_ACTIVE:
+                view.inactive_s += now - view.state_since
+            if state == STATE_FROZEN:
+                view.freezes += 1
+                view.next_peek = now + PEEK_INTERVAL_S
+            elif state == STATE_DISCARDED:
+                view.discards += 1
+                view.next_peek = None
+            else:
+                view.thaws += 1
+                view.last_thaw_reason = reason
+                view.last_activity = now
+                view.next_peek = None
+                view.peeking_since = None
+            # Frozen -> discarded keeps counting as one inactive period
+            if state == STATE_ACTIVE or view.state == STATE_ACTIVE:
+                view.state_since = now
+            view.state = state
+        metrics.LIFECYCLE_TRANSITIONS.inc(browser=browser_id, state=state)
+        metrics.LIFECYCLE_STATE.set(0 if state == STATE_ACTIVE else 1 if state == STATE_FROZEN else 2,
+                                    browser=browser_id)
+
+    def snapshot(self, now=None):
+        """Returns configuration and per-view states (for the diagnostics page)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            views = []
+            for browser_id, view in sorted(self._views.items()):
+                inactive_s = view.inactive_s
+                if view.state != STATE_ACTIVE:
+                    inactive_s += now - view.state_since
+                views.append({
+                    'browser_id': browser_id,
+                    'state': view.state,
+                    'state_for_s': round(now - view.state_since),
+                    'idle_s': round(now - view.last_activity),
+                    'peeking': view.peeking_since is not None,
+                    'next_peek_in_s': max(0, round(view.next_peek - now)) if view.next_peek else None,
+                    'freezes': view.freezes,
+                    'discards': view.discards,
+                    'thaws': view.thaws,
+                    'peeks': view.peeks,
+                    'last_thaw_reason': view.last_thaw_reason,
+                    'inactive_min': round(inactive_s / 60),
+                })
+            return {
+                'enabled': self.enabled,
+                'freeze_after_min': round(self.freeze_after_s / 60),
+                'discard_after_min': round(self.discard_after_s / 60),
+                'views': views,
+            }
+
+
+page_lifecycle = PageLifecycle()
@@ -0,0 +1,135 @@
+"""
+Page load timing.
+
+scripts/page_timing.js collects Navigation Timing, Paint Timing (FCP/LCP) and
+long task entries after each page load and sends them through a QWebChannel
+bridge (see darts-browser.py). The records are kept in a bounded store, fed
+into the metrics registry and summarised as percentiles on the diagnostics
+page. The phases are grouped so that it is visible whether a slow board is
+caused by the network, by the Autodarts page itself or by our injected scripts.
+"""
+
+import threading
+import time
+from collections import deque
+
+import metrics
+
+STORE_SIZE = 500
+
+# (key, label, group) in the order shown on the diagnostics page
+PHASES = (
+    ('dns_ms', "DNS", "Netzwerk"),
+    ('connect_ms', "Verbindung (inkl. TLS)", "Netzwerk"),
+    ('ttfb_ms', "Time to First Byte", "Netzwerk"),
+    ('download_ms', "Download", "Netzwerk"),
+    ('dom_processing_ms', "DOM-Verarbeitung", "Autodarts"),
+    ('dom_content_loaded_ms', "DOMContentLoaded", "Autodarts"),
+    ('load_ms', "Load-Event", "Autodarts"),
+    ('fcp_ms', "First Contentful Paint", "Autodarts"),
+    ('lcp_ms', "Largest Contentful Paint", "Autodarts"),
+    ('long_tasks_ms', "Long Tasks (Summe)", "Autodarts"),
+    ('injected_ms', "Eingefügte Skripte", "Kiosk"),
+)
+
+PERCENTILES = (50, 90, 99)
+
+
+def _number(value):
+    return round(float(value), 1) if isinstance(value, (int, float)) and value >= 0 else None
+
+
+def _derive(nav):
+    """Derives the phase durations (ms) from a PerformanceNavigationTiming entry."""
+    def span(start, end):
+        if nav.get(start) is None or nav.get(end) is None or nav[end] < nav[start]:
+            return None
+        return nav[end] - nav[start]
+
+    return {
+        'dns_ms': span('domainLookupStart', 'domainLookupEnd'),
+        'connect_ms': span('connectStart', 'connectEnd'),
+        'ttfb_ms': span('requestStart', 'responseStart'),
+        'download_ms': span('responseStart', 'responseEnd'),
+        'dom_processing_ms': span('responseEnd', 'domInteractive'),
+        'dom_content_loaded_ms': nav.get('domContentLoadedEventEnd'),
+        'load_ms': nav.get('loadEventEnd'),
+    }
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers (None if empty)."""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+class PageTimingStore:
+    """Bounded store of page timing records."""
+
+    def __init__(self, size=STORE_SIZE):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=size)
+
+    def add(self, browser_id, board_id, report, injected_ms=None, now=None):
+        """
+        Stores the report sent by page_timing.js. Returns the stored record.
+        """
+        nav = report.get('navigation') or {}
+        long_tasks = report.get('long_tasks') or {}
+        record = {
+            't': time.time() if now is None else now,
+            'browser_id': browser_id,
+            'board_id': board_id,
+            'url': report.get('url', ""),
+            'transfer_kb': _number((nav.get('transferSize') or 0) / 1024),
+            'long_tasks': long_tasks.get('count', 0),
+            'long_task_max_ms': _number(long_tasks.get('max_ms')),
+            'fcp_ms': _number(report.get('fcp_ms')),
+            'lcp_ms': _number(report.get('lcp_ms')),
+            'long_tasks_ms': _number(long_tasks.get('total_ms')),
+            'injected_ms': _number(injected_ms),
+        }
+        record.update({k: _number(v) for k, v in _derive(nav).items()})
+
+        with self._lock:
+            self._records.append(record)
+        for key, _, _ in PHASES:
+            if record.get(key) is not None:
+                metrics.PAGE_TIMING_SECONDS.observe(record[key] / 1000, browser=browser_id, phase=key[:-3])
+        return record
+
+    def records(self, browser_id=None):
+        with self._lock:
+            return [r for r in self._records if browser_id is None or r['browser_id'] == browser_id]
+
+    def summary(self):
+        """Returns per view: number of loads, board and percentiles per phase."""
+        with self._lock:
+            records = list(self._records)
+        views = []
+        for browser_id in sorted({r['browser_id'] for r in records}):
+            own = [r for r in records if r['browser_id'] == browser_id]
+            phases = []
+            for key, label, group in PHASES:
+                values = [r[key] for r in own if r.get(key) is not None]
+                phases.append({
+                    'key': key,
+                    'label': label,
+                    'group': group,
+                    'count': len(values),
+                    'percentiles': {p: percentile(values, p) for p in PERCENTILES},
+                })
+            views.append({
+                'browser_id': browser_id,
+                'board_id': own[-1]['board_id'],
+                'loads': len(own),
+                'last': own[-1],
+                'phases': phases,
+            })
+        return {'percentiles': PERCENTILES, 'views': views}
+
+
+page_timing = PageTimingStore()
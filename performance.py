@@ -0,0 +1,173 @@
+"""
+Performance profile of the embedded Chromium ([performance] section).
+
+A preset defines the Chromium command line flags, QWebEngineSettings attributes
+and profile settings; single values can be overridden in config.ini. The flags
+have to be in QTWEBENGINE_CHROMIUM_FLAGS before QApplication is created, so
+darts-browser.py calls apply_chromium_flags() at the start of main().
+
+This module has no Qt imports; settings are returned as plain values and
+applied by darts-browser.py.
+"""
+
+import os
+
+PRESET_NONE = "none"
+DEFAULT_PRESET = PRESET_NONE
+
+PROCESS_MODELS = ("default", "process-per-site")
+
+# Values of a preset; None means "keep the Qt/Chromium default"
+OPTIONS = {
+    'process_model': "default",        # Chromium renderer process model
+    'renderer_process_limit': None,    # Max. number of renderer processes
+    'js_heap_mb': None,                # V8 old space limit per renderer
+    'background_throttling': None,     # False disables timer throttling of background/occluded views
+    'smooth_scrolling': None,          # QWebEngineSettings.ScrollAnimatorEnabled
+    'dns_prefetch': None,              # QWebEngineSettings.DnsPrefetchEnabled
+    'http_cache_mb': None,             # Disk cache size (a [main] cache_max_mb > 0 takes precedence)
+}
+
+# (key, label, values)
+PRESETS = (
+    (PRESET_NONE, "Keine Anpassung (Qt-Standard)", {}),
+    ("low_memory", "Wenig Speicher (Raspberry Pi)", {
+        'process_model': "process-per-site",
+        'renderer_process_limit': 2,
+        'js_heap_mb': 256,
+        'smooth_scrolling': False,
+        'dns_prefetch': False,
+        'http_cache_mb': 64,
+    }),
+    ("balanced", "Ausgewogen", {
+        'smooth_scrolling': False,
+        'dns_prefetch': True,
+        'http_cache_mb': 128,
+    }),
+    ("desktop", "Desktop (viel Speicher)", {
+        'background_throttling': False,
+        'smooth_scrolling': True,
+        'dns_prefetch': True,
+        'http_cache_mb': 512,
+    }),
+)
+
+PRESET_CHOICES = [(key, label) for key, label, _ in PRESETS]
+
+FLAGS_ENV = "QTWEBENGINE_CHROMIUM_FLAGS"
+BASE_FLAGS_ENV = "ADARTS_BASE_CHROMIUM_FLAGS"
+
+BACKGROUND_FLAGS = (
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+)
+
+
+def validate_flags(text):
+    """
+    Splits additional Chromium flags. Raises ValueError if one is not a --switch.
+    Qt splits QTWEBENGINE_CHROMIUM_FLAGS at spaces, so values cannot contain spaces or quotes.
+    """
+    flags = (text or "").split()
+    invalid = [flag for flag in flags if not flag.startswith("--") or len(flag) < 3 or '"' in flag or "'" in flag]
+    if invalid:
+        raise ValueError(f"Ungültige Chromium-Flags (müssen mit -- beginnen): {' '.join(invalid)}")
+    return flags
+
+
+def _parse_value(key, raw):
+    """Converts a config.ini value for key. Raises ValueError if invalid."""
+    default = OPTIONS[key]
+    if key == 'process_model':
+        if raw not in PROCESS_MODELS:
+            raise ValueError(f"expected one of {', '.join(PROCESS_MODELS)}")
+        return raw
+    if key in ('renderer_process_limit', 'js_heap_mb', 'http_cache_mb'):
+        value = int(raw)
+        if value < 0:
+            raise ValueError("must not be negative")
+        return value or None
+    if raw.lower() in ("true", "yes", "on", "1"):
+        return True
+    if raw.lower() in ("false", "no", "off", "0"):
+        return False
+    raise ValueError(f"expected true or false (default: {default})")
+
+
+class PerformanceProfile:
+    """Resolved [performance] section: preset values plus validated overrides."""
+
+    def __init__(self, preset=DEFAULT_PRESET, overrides=None, extra_flags=""):
+        presets = {key: values for key, _, values in PRESETS}
+        if preset not in presets:
+            print(f"[WARN] Unknown performance preset '{preset}'. Using '{DEFAULT_PRESET}'.")
+            preset = DEFAULT_PRESET
+        self.preset = preset
+        self.values = dict(OPTIONS, **presets[preset])
+
+        for key, raw in (overrides or {}).items():
+            if key not in OPTIONS:
+                print(f"[WARN] Unknown option '{key}' in [performance]. Ignored.")
+                continue
+            try:
+                self.values[key] = _parse_value(key, raw.strip())
+            except ValueError as e:
+                print(f"[WARN] Invalid value '{raw}' for [performance] {key}: {e}. Ignored.")
+
+        try:
+            self.extra_flags = validate_flags(extra_flags)
+        except ValueError as e:
+            print(f"[WARN] {e}. Ignored.")
+            self.extra_flags = []
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds the profile from the [performance] section of an AppConfig."""
+        preset = config.get("performance", "preset", fallback="").strip() or DEFAULT_PRESET
+        overrides = {}
+        for key in OPTIONS:
+            raw = config.get("performance", key, fallback=None)
+            if raw is not None and raw.strip():
+                overrides[key] = raw
+        return cls(preset, overrides, config.get("performance", "chromium_flags", fallback=""))
+
+    def chromium_flags(self):
+        """Returns the Chromium command line flags of this profile."""
+        v = self.values
+        flags = []
+        if v['process_model'] == "process-per-site":
+            flags.append("--process-per-site")
+        if v['renderer_process_limit']:
+            flags.append(f"--renderer-process-limit={v['renderer_process_limit']}")
+        if v['js_heap_mb']:
+            flags.append(f"--js-flags=--max-old-space-size={v['js_heap_mb']}")
+        if v['background_throttling'] is False:
+            flags.extend(BACKGROUND_FLAGS)
+        return flags + self.extra_flags
+
+    def web_attributes(self):
+        """Returns {QWebEngineSettings.WebAttribute name: bool} for the set values."""
+        names = {'smooth_scrolling': "ScrollAnimatorEnabled", 'dns_prefetch': "DnsPrefetchEnabled"}
+        return {attribute: self.values[key] for key, attribute in names.items() if self.values[key] is not None}
+
+    def http_cache_bytes(self, cache_max_mb=0):
+        """Maximum HTTP cache size in bytes (0 = Qt default). The [main] cache budget takes precedence."""
+        if cache_max_mb > 0:
+            return cache_max_mb * 1024 * 1024
+        return (self.values['http_cache_mb'] or 0) * 1024 * 1024
+
+
+def apply_chromium_flags(profile, environ=os.environ):
+    """
+    Adds the profile's flags to QTWEBENGINE_CHROMIUM_FLAGS. Flags already set in the
+    environment (e.g. by start.sh) come last, so they win over the preset.
+    Returns the resulting value.
+    """
+    # A restart inherits the environment; start from the flags set outside of the app
+    existing = environ.setdefault(BASE_FLAGS_ENV, environ.get(FLAGS_ENV, "")).strip()
+    flags = " ".join(profile.chromium_flags())
+    combined = " ".join(part for part in (flags, existing) if part)
+    if combined:
+        environ[FLAGS_ENV] = combined
+    return combined
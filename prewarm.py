@@ -0,0 +1,95 @@
+"""
+Connection pre-warming before the first board load.
+
+Right after the main window is created, every view loads a tiny local page
+with <link rel="preconnect"> hints for the board origin and the login
+(Keycloak) origin. Chromium then resolves and connects both origins in the
+view's own network context while the network probe is still running, so the
+login redirect chain does not pay for DNS, TCP and TLS one origin after the
+other. At the same time the view's cookie store is checked for a stored login
+session. The real loads start when the network is ready and all views are
+pre-warmed (at most PREWARM_MAX_WAIT_MS after the start).
+
+scripts/preconnect.js adds the same hints to every page, so reloads of the
+board page warm the login origin early as well.
+
+This module has no Qt imports; darts-browser.py does the Qt side.
+"""
+
+import json
+import time
+from urllib.parse import quote, unquote, urlparse
+
+PREWARM_MAX_WAIT_MS = 1500
+SESSION_PROBE_MS = 300
+
+# Marker of the pre-warm page, so its load is not mistaken for a board load
+PREWARM_TITLE = "adarts-prewarm"
+
+# Cookies of a Keycloak login session (SSO); the stand-in server uses the same names
+SESSION_COOKIE_NAMES = ("KEYCLOAK_IDENTITY", "KEYCLOAK_IDENTITY_LEGACY", "KEYCLOAK_SESSION", "KEYCLOAK_SESSION_LEGACY")
+
+
+def origin(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def prewarm_origins(*urls):
+    """Returns the distinct origins of the given URLs in order."""
+    origins = []
+    for url in urls:
+        if url and origin(url) not in origins:
+            origins.append(origin(url))
+    return origins
+
+
+def _hints(origins):
+    # Without crossorigin: navigations and the login adapter's credentialed requests use this pool
+    return "".join(f'<link rel="dns-prefetch" href="{o}"><link rel="preconnect" href="{o}">' for o in origins)
+
+
+def prewarm_page_url(origins):
+    """data: URL of a black page that only carries the preconnect hints."""
+    html = (f"<!doctype html><html><head><title>{PREWARM_TITLE}</title>{_hints(origins)}</head>"
+            "<body style='background:#000'></body></html>")
+    return f"data:text/html;charset=utf-8,{quote(html)}"
+
+
+def is_prewarm_url(url):
+    return url.startswith("data:") and f"<title>{PREWARM_TITLE}</title>" in unquote(url)
+
+
+def preconnect_script(template, origins):
+    """Fills scripts/preconnect.js with the origins."""
+    return template.replace("{origins_json}", json.dumps(origins))
+
+
+class SessionProbe:
+    """Collects the cookies of a profile and tells whether a login session is stored."""
+
+    def __init__(self, auth_host):
+        self.auth_host = (auth_host or "").lower()
+        self.cookies = []
+
+    def add(self, name, domain, expires=None):
+        """expires: Unix time or None for a session cookie."""
+        self.cookies.append((name, domain.lstrip(".").lower(), expires))
+
+    def _matches(self, domain):
+        return self.auth_host == domain or self.auth_host.endswith("." + domain)
+
+    def session(self, now=None):
+        """Returns (valid, detail) for the stored session cookies of the login host."""
+        now = time.time() if now is None else now
+        found = [(name, expires) for name, domain, expires in self.cookies
+                 if name in SESSION_COOKIE_NAMES and self._matches(domain)]
+        if not found:
+            return False, "no session cookie"
+        valid = [(name, expires) for name, expires in found if expires is None or expires > now]
+        if not valid:
+            return False, "session cookie expired"
+        name, expires = max(valid, key=lambda c: c[1] or float("inf"))
+        if expires is None:
+            return True, name
+        return True, f"{name}, expires {time.strftime('%Y-%m-%d %H:%M', time.localtime(expires))}"
@@ -0,0 +1,193 @@
+"""
+On-device profiling of the running application.
+
+- Sampling profiler: reads the stacks of the Qt main thread and/or the Flask
+  request threads via sys._current_frames() at a fixed rate and returns them
+  in the collapsed stack format ("frame;frame;frame count") understood by
+  flamegraph.pl, speedscope and similar tools. Low overhead, no restart.
+- cProfile: deterministic profile of the Qt main thread. Enabling cProfile has
+  to happen on the profiled thread itself, so darts-browser.py registers a
+  dispatcher that runs a callable on the GUI thread.
+- tracemalloc: snapshot diff of the allocations made during a time window.
+
+Only one session runs at a time.
+"""
+
+import cProfile
+import functools
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+MAX_SECONDS = 120
+DEFAULT_INTERVAL_S = 0.005
+
+THREADS_MAIN = "main"
+THREADS_FLASK = "flask"
+THREADS_ALL = "all"
+
+# Werkzeug names its request threads after the handler function
+FLASK_THREAD_MARKER = "process_request_thread"
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+_session_lock = threading.Lock()
+_main_thread_dispatcher = None
+
+
+def set_main_thread_dispatcher(dispatch):
+    """Registers dispatch(callable), which runs callable on the Qt main thread."""
+    global _main_thread_dispatcher
+    _main_thread_dispatcher = dispatch
+
+
+def _session(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _session_lock.acquire(blocking=False):
+            raise ProfilerBusy("Es läuft bereits eine Profiling-Sitzung.")
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _session_lock.release()
+    return wrapper
+
+
+def _clamp_seconds(seconds):
+    return max(1, min(int(seconds), MAX_SECONDS))
+
+
+# --- Sampling Profiler ---
+def _selected_threads(threads):
+    """Returns {ident: name} of the threads to sample."""
+    main_ident = threading.main_thread().ident
+    selected = {}
+    for thread in threading.enumerate():
+        if thread.ident == threading.get_ident():
+            continue
+        is_main = thread.ident == main_ident
+        is_flask = FLASK_THREAD_MARKER in thread.name
+        if threads == THREADS_ALL or (threads == THREADS_MAIN and is_main) or (threads == THREADS_FLASK and is_flask):
+            selected[thread.ident] = "MainThread (Qt)" if is_main else thread.name
+    return selected
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+@_session
+def sample_stacks(seconds, threads=THREADS_ALL, interval=DEFAULT_INTERVAL_S):
+    """
+    Samples the stacks of the selected threads for seconds.
+    Returns (collapsed_text, sample_count).
+    """
+    seconds = _clamp_seconds(seconds)
+    counts = {}
+    samples = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        # Request threads come and go, so the selection is refreshed every round
+        names = _selected_threads(threads)
+        frames = sys._current_frames()
+        for ident, name in names.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            # Thread name as root frame; spaces are not allowed in the stack part
+            key = name.replace(" ", "_") + ";" + _collapse(frame)
+            counts[key] = counts.get(key, 0) + 1
+        samples += 1
+        del frames
+        time.sleep(interval)
+
+    lines = [f"{stack} {count}" for stack, count in sorted(counts.items())]
+    return "\n".join(lines) + "\n", samples
+
+
+# --- cProfile ---
+@_session
+def profile_main_thread(seconds, sort="cumulative", limit=60):
+    """
+    Runs cProfile on the Qt main thread for seconds.
+    Returns (text_report, binary_stats) where binary_stats can be loaded with pstats/snakeviz.
+    """
+    if _main_thread_dispatcher is None:
+        raise RuntimeError("Kein Qt-Hauptthread verfügbar.")
+    seconds = _clamp_seconds(seconds)
+    profiler = cProfile.Profile()
+    enabled = threading.Event()
+    disabled = threading.Event()
+
+    def _enable():
+        profiler.enable()
+        enabled.set()
+
+    def _disable():
+        profiler.disable()
+        disabled.set()
+
+    _main_thread_dispatcher(_enable)
+    if not enabled.wait(10):
+        raise RuntimeError("Der Qt-Hauptthread reagiert nicht.")
+    time.sleep(seconds)
+    _main_thread_dispatcher(_disable)
+    if not disabled.wait(30):
+        raise RuntimeError("Der Qt-Hauptthread reagiert nicht.")
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+
+    # Same format as pstats.Stats.dump_stats()
+    return out.getvalue(), marshal.dumps(stats.stats)
+
+
+# --- tracemalloc ---
+@_session
+def tracemalloc_diff(seconds, limit=40, frames=10):
+    """
+    Records all allocations for seconds and returns the top differences
+    (grouped by source line) as text.
+    """
+    seconds = _clamp_seconds(seconds)
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start(frames)
+    try:
+        before = tracemalloc.take_snapshot()
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    # Allocations of tracemalloc itself are noise
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    diff = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+
+    lines = [
+        f"tracemalloc diff over {seconds}s (traced now: {current / 1024:.0f} KiB, peak: {peak / 1024:.0f} KiB)",
+        "",
+    ]
+    for stat in diff[:limit]:
+        lines.append(str(stat))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,230 @@
+"""
+Staggered, idle-aware auto-refresh.
+
+Periodic reloads protect against memory leaks of the long running Autodarts
+pages, but reloading all views at the same moment blanks every board at once
+and may interrupt a running leg. The scheduler therefore:
+
+- staggers the reloads of the views evenly across the interval,
+- never reloads two views at the same time,
+- defers a reload while the page is active (recent DOM mutations or network
+  traffic reported by scripts/activity_probe.js),
+- skips a reload while the page is healthy (content shown, online, JS heap
+  below the limit), but not more than MAX_SKIPS times in a row,
+- records how long every reload takes (shown on the diagnostics page).
+
+Other components (e.g. the memory watchdog) can request the reload of a single
+view; such a reload is never skipped, but still waits for the page to go idle.
+
+This module only holds the decisions and the statistics; the Qt side (timer,
+probe query, reload) lives in darts-browser.py.
+"""
+
+import threading
+import time
+
+# How often due views are checked
+TICK_S = 15
+# Page counts as idle when nothing happened for this long
+IDLE_S = 60
+# Re-check interval while a reload is deferred because the page is active
+DEFER_RECHECK_S = 30
+# JS heap size above which a page counts as unhealthy
+HEAP_LIMIT_MB = 300
+# Reload anyway after this many consecutive healthy skips
+MAX_SKIPS = 3
+# A reload that did not finish after this long no longer blocks other views
+RELOAD_TIMEOUT_S = 120
+# Maximum deferral of a requested reload (e.g. waiting for the end of a game)
+REQUESTED_MAX_DEFER_S = 20 * 60
+
+ACTION_RELOAD = "reload"
+ACTION_DEFER = "defer"
+ACTION_SKIP = "skip"
+
+
+class ViewRefreshState:
+    """Schedule and timing statistics of one view."""
+
+    def __init__(self, browser_id, next_due):
+        self.browser_id = browser_id
+        self.next_due = next_due
+        self.deferred_since = None
+        self.reloading_since = None
+        self.requested_reason = None
+        self.skips_in_row = 0
+        self.reloads = 0
+        self.skips = 0
+        self.defers = 0
+        self.failures = 0
+        self.last_reason = None
+        self.last_reload_at = None
+        self.last_duration_s = None
+        self.max_duration_s = None
+        self.total_duration_s = 0.0
+
+    def to_dict(self, now):
+        return {
+            'browser_id': self.browser_id,
+            'next_due_in_s': max(0, round(self.next_due - now)) if self.next_due else None,
+            'reloading': self.reloading_since is not None,
+            'deferred_for_s': round(now - self.deferred_since) if self.deferred_since else None,
+            'requested_reason': self.requested_reason,
+            'reloads': self.reloads,
+            'skips': self.skips,
+            'defers': self.defers,
+            'failures': self.failures,
+            'last_reason': self.last_reason,
+            'last_reload_at': self.last_reload_at,
+            'last_duration_s': self.last_duration_s,
+            'avg_duration_s': round(self.total_duration_s / self.reloads, 2) if self.reloads else None,
+            'max_duration_s': self.max_duration_s,
+        }
+
+
+class RefreshScheduler:
+    """Decides when which view is reloaded."""
+
+    def __init__(self, idle_s=IDLE_S, heap_limit_mb=HEAP_LIMIT_MB, max_skips=MAX_SKIPS):
+        self.idle_s = idle_s
+        self.heap_limit_mb = heap_limit_mb
+        self.max_skips = max_skips
+        self.interval_s = 0
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def configure(self, interval_s, browser_ids, now=None):
+        """Sets the interval and spreads the first reload of each view evenly across it."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self.interval_s = interval_s
+            self._views = {}
+            count = len(browser_ids)
+            for index, browser_id in enumerate(browser_ids):
+                offset = interval_s * index / count if count else 0
+                next_due = now + interval_s + offset if interval_s > 0 else None
+                self._views[browser_id] = ViewRefreshState(browser_id, next_due)
+
+    @property
+    def enabled(self):
+        return self.interval_s > 0
+
+    # --- Scheduling ---
+    def request_reload(self, browser_id, reason, now=None):
+        """Requests a reload of one view as soon as it is idle. Returns False if already pending."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._views.get(browser_id)
+            if state is None or state.requested_reason or state.reloading_since:
+                return False
+            state.requested_reason = reason
+            state.next_due = now
+            return True
+
+    def postpone(self, browser_id, now=None):
+        """Moves the next check of a view back (e.g. while its page is frozen)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._views.get(browser_id)
+            if state is not None:
+                state.next_due = now + max(self.interval_s, DEFER_RECHECK_S)
+
+    def due_views(self, now=None):
+        """Returns the ids of views that should be checked now (at most one at a time)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            busy = any(s.reloading_since and now - s.reloading_since < RELOAD_TIMEOUT_S
+                       for s in self._views.values())
+            if busy:
+                return []
+            due = sorted((s for s in self._views.values() if s.next_due and s.next_due <= now),
+                         key=lambda s: s.next_due)
+            return [due[0].browser_id] if due else []
+
+    def decide(self, browser_id, probe, now=None):
+        """
+        Decides what to do with a due view. probe is the dict reported by the
+        activity probe or None if the page could not be queried.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._views[browser_id]
+            action, reason = self._decide(state, probe, now)
+            state.last_reason = reason
+            if action == ACTION_DEFER:
+                state.defers += 1
+                state.deferred_since = state.deferred_since or now
+                state.next_due = now + DEFER_RECHECK_S
+            elif action == ACTION_SKIP:
+                state.skips += 1
+                state.skips_in_row += 1
+                state.deferred_since = None
+                state.next_due = now + self.interval_s
+            return action, reason
+
+    def _decide(self, state, probe, now):
+        if not probe:
+            return ACTION_RELOAD, state.requested_reason or "Seite nicht abfragbar"
+
+        heap_mb = probe.get('heap_mb')
+        if heap_mb is not None and heap_mb > self.heap_limit_mb:
+            # A leaking page is reloaded even during a game; that's what the refresh is for
+            return ACTION_RELOAD, f"JS-Heap {heap_mb:.0f} MB"
+
+        idle_ms = probe.get('idle_ms')
+        active = idle_ms is not None and idle_ms < self.idle_s * 1000
+        # Never defer longer than one interval (requested reloads: REQUESTED_MAX_DEFER_S)
+        max_defer_s = REQUESTED_MAX_DEFER_S if state.requested_reason else self.interval_s
+        deferred_too_long = state.deferred_since is not None and now - state.deferred_since >= max_defer_s
+        if active and not deferred_too_long:
+            return ACTION_DEFER, "Seite aktiv"
+
+        if state.requested_reason:
+            return ACTION_RELOAD, state.requested_reason
+
+        healthy = probe.get('has_content') and not probe.get('offline')
+        if healthy and state.skips_in_row < self.max_skips:
+            return ACTION_SKIP, "Seite in Ordnung"
+
+        return ACTION_RELOAD, "Intervall abgelaufen"
+
+    # --- Timing ---
+    def reload_started(self, browser_id, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._views.get(browser_id)
+            if state is None:
+                return
+            state.reloading_since = now
+            state.deferred_since = None
+            state.requested_reason = None
+            state.skips_in_row = 0
+            state.next_due = now + self.interval_s if self.enabled else None
+
+    def reload_finished(self, browser_id, ok, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            state = self._views.get(browser_id)
+            if state is None or state.reloading_since is None:
+                return
+            duration = round(now - state.reloading_since, 2)
+            state.reloading_since = None
+            state.last_reload_at = now
+            state.reloads += 1
+            if not ok:
+                state.failures += 1
+            state.last_duration_s = duration
+            state.max_duration_s = max(state.max_duration_s or 0, duration)
+            state.total_duration_s += duration
+
+    def snapshot(self, now=None):
+        """Returns the state of all views (for the diagnostics page)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return {
+                'interval_s': self.interval_s,
+                'views': [s.to_dict(now) for s in self._views.values()],
+            }
+
+
+refresh_scheduler = RefreshScheduler()
@@ -0,0 +1,226 @@
+"""
+Request filter for the browser views ([request_filter] section).
+
+The Qt interceptor in darts-browser.py asks request_filter.check() for every
+request of a view. The rules are compiled once per configuration:
+
+- a domain trie (labels in reverse order) with allow and block entries; the
+  most specific entry for a host wins, so "allow cdn.example.com" overrides
+  "block example.com",
+- resource type rules (e.g. 'ping' for analytics beacons) for requests whose
+  host is not matched by any domain entry.
+
+Main frame navigations are never blocked. Counts are kept per view; the bytes
+saved are an estimate per resource type, because a blocked request has no
+response. In dry-run mode nothing is blocked and each host that would be
+blocked is logged once per view.
+"""
+
+import threading
+from collections import Counter
+
+import metrics
+
+ACTION_ALLOW = "allow"
+ACTION_BLOCK = "block"
+
+# Analytics, tag managers, error/session trackers and font CDNs
+DEFAULT_BLOCK_DOMAINS = (
+    "google-analytics.com",
+    "analytics.google.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "segment.io",
+    "mixpanel.com",
+    "sentry.io",
+    "fonts.googleapis.com",
+    "fonts.gstatic.com",
+)
+DEFAULT_BLOCK_TYPES = ("ping", "csp_report")
+
+# Qt's QWebEngineUrlRequestInfo.ResourceType names -> rule names
+RESOURCE_TYPES = {
+    'ResourceTypeMainFrame': "main_frame",
+    'ResourceTypeSubFrame': "sub_frame",
+    'ResourceTypeStylesheet': "stylesheet",
+    'ResourceTypeScript': "script",
+    'ResourceTypeImage': "image",
+    'ResourceTypeFontResource': "font",
+    'ResourceTypeSubResource': "sub_resource",
+    'ResourceTypeObject': "object",
+    'ResourceTypeMedia': "media",
+    'ResourceTypeWorker': "worker",
+    'ResourceTypeSharedWorker': "shared_worker",
+    'ResourceTypePrefetch': "prefetch",
+    'ResourceTypeFavicon': "favicon",
+    'ResourceTypeXhr': "xhr",
+    'ResourceTypePing': "ping",
+    'ResourceTypeServiceWorker': "service_worker",
+    'ResourceTypeCspReport': "csp_report",
+    'ResourceTypePluginResource': "plugin",
+    'ResourceTypeNavigationPreloadMainFrame': "main_frame",
+    'ResourceTypeNavigationPreloadSubFrame': "sub_frame",
+    'ResourceTypeWebSocket': "websocket",
+}
+
+# Rough transfer sizes of a blocked request (bytes) for the "saved" estimate
+ESTIMATED_BYTES = {
+    'script': 60_000,
+    'font': 40_000,
+    'stylesheet': 15_000,
+    'image': 20_000,
+    'media': 200_000,
+    'sub_frame': 30_000,
+    'xhr': 2_000,
+    'ping': 500,
+    'csp_report': 500,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+TOP_HOSTS = 10
+
+
+def resource_type_name(qt_name):
+    """Maps the name of a Qt ResourceType enum value to the rule name (unknown -> 'other')."""
+    return RESOURCE_TYPES.get(qt_name, "other")
+
+
+class DomainTrie:
+    """Maps domains to a value; lookups match the host and all its parent domains."""
+
+    def __init__(self):
+        self._root = {}
+
+    def add(self, domain, value):
+        node = self._root
+        for label in reversed(domain.strip(".").lower().split(".")):
+            node = node.setdefault(label, {})
+        node[None] = value
+
+    def match(self, host):
+        """Returns (domain, value) of the most specific entry for host, or (None, None)."""
+        node = self._root
+        labels = host.strip(".").lower().split(".")
+        found = (None, None)
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                break
+            if None in node:
+                found = (".".join(labels[-depth:]), node[None])
+        return found
+
+
+class RuleSet:
+    """Compiled allow/block rules."""
+
+    def __init__(self, block_domains=DEFAULT_BLOCK_DOMAINS, allow_domains=(), block_types=DEFAULT_BLOCK_TYPES):
+        self.block_domains = tuple(block_domains)
+        self.allow_domains = tuple(allow_domains)
+        self.block_types = frozenset(block_types)
+        self._trie = DomainTrie()
+        for domain in self.block_domains:
+            self._trie.add(domain, ACTION_BLOCK)
+        # Added last: an allow entry for the same domain wins
+        for domain in self.allow_domains:
+            self._trie.add(domain, ACTION_ALLOW)
+
+    def decide(self, host, resource_type):
+        """Returns (action, reason)."""
+        if resource_type == "main_frame":
+            return ACTION_ALLOW, "main_frame"
+        domain, action = self._trie.match(host) if host else (None, None)
+        if action is not None:
+            return action, domain
+        if resource_type in self.block_types:
+            return ACTION_BLOCK, f"type:{resource_type}"
+        return ACTION_ALLOW, None
+
+
+class ViewStats:
+    def __init__(self):
+        self.allowed = 0
+        self.blocked = 0
+        self.would_block = 0
+        self.bytes_saved = 0
+        self.hosts = Counter()
+        self.logged = set()
+
+
+class RequestFilter:
+    """Decides about the requests of all views and keeps per-view counts. Thread safe."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.enabled = False
+        self.dry_run = False
+        self.rules = RuleSet()
+        self._views = {}
+
+    def configure(self, enabled, dry_run=False, block_domains=DEFAULT_BLOCK_DOMAINS, allow_domains=(),
+                  block_types=DEFAULT_BLOCK_TYPES):
+        rules = RuleSet(block_domains, allow_domains, block_types)
+        with self._lock:
+            self.enabled = enabled
+            self.dry_run = dry_run
+            self.rules = rules
+
+    def check(self, browser_id, host, resource_type):
+        """Returns True if the request has to be blocked."""
+        if not self.enabled:
+            return False
+        action, reason = self.rules.decide(host, resource_type)
+        with self._lock:
+            stats = self._views.setdefault(browser_id, ViewStats())
+            if action == ACTION_ALLOW:
+                stats.allowed += 1
+                log = False
+            elif self.dry_run:
+                stats.would_block += 1
+                stats.hosts[host] += 1
+                log = (host, resource_type) not in stats.logged
+                stats.logged.add((host, resource_type))
+            else:
+                stats.blocked += 1
+                stats.hosts[host] += 1
+                stats.bytes_saved += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+                log = False
+            dry_run = self.dry_run
+
+        if action == ACTION_ALLOW:
+            metrics.FILTERED_REQUESTS.inc(browser=browser_id, action="allowed")
+            return False
+        if dry_run:
+            metrics.FILTERED_REQUESTS.inc(browser=browser_id, action="would_block")
+            if log:
+                print(f"[Browser {browser_id}] Request filter (dry run) would block {resource_type} from {host} ({reason})")
+            return False
+        metrics.FILTERED_REQUESTS.inc(browser=browser_id, action="blocked")
+        metrics.FILTERED_BYTES_SAVED.inc(ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES), browser=browser_id)
+        return True
+
+    def snapshot(self):
+        """Returns configuration and per-view counts (for the diagnostics page)."""
+        with self._lock:
+            views = [{
+                'browser_id': browser_id,
+                'allowed': stats.allowed,
+                'blocked': stats.blocked,
+                'would_block': stats.would_block,
+                'saved_kb': round(stats.bytes_saved / 1024),
+                'top_hosts': stats.hosts.most_common(TOP_HOSTS),
+            } for browser_id, stats in sorted(self._views.items())]
+            return {
+                'enabled': self.enabled,
+                'dry_run': self.dry_run,
+                'block_domains': self.rules.block_domains,
+                'allow_domains': self.rules.allow_domains,
+                'block_types': sorted(self.rules.block_types),
+                'views': views,
+            }
+
+
+request_filter = RequestFilter()
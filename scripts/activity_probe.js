@@ -0,0 +1,41 @@
+// Reports page activity and health to the refresh scheduler (see refresh_scheduler.py).
+// Queried from Python via window.__adartsProbe.report().
+
+(function() {
+    if (window.__adartsProbe) {
+        return;
+    }
+
+    var lastMutation = Date.now();
+    var lastNetwork = Date.now();
+
+    // Score updates, throws and player changes all mutate the DOM
+    try {
+        new MutationObserver(function() {
+            lastMutation = Date.now();
+        }).observe(document.documentElement, { childList: true, subtree: true, characterData: true });
+    } catch (e) {
+        console.error("[Autodarts Browser] Activity probe (DOM) failed: " + e);
+    }
+
+    try {
+        new PerformanceObserver(function() {
+            lastNetwork = Date.now();
+        }).observe({ type: 'resource', buffered: false });
+    } catch (e) {
+        console.error("[Autodarts Browser] Activity probe (network) failed: " + e);
+    }
+
+    window.__adartsProbe = {
+        report: function() {
+            var overlay = document.getElementById('autodarts-offline-overlay');
+            var root = document.getElementById('root') || document.body;
+            return JSON.stringify({
+                idle_ms: Date.now() - Math.max(lastMutation, lastNetwork),
+                offline: !!(overlay && overlay.style.display !== 'none'),
+                has_content: !!(root && root.children.length > 0),
+                heap_mb: performance.memory ? performance.memory.usedJSHeapSize / (1024 * 1024) : null
+            });
+        }
+    };
+})();
@@ -62,7 +62,7 @@
 
     function checkConnectivity() {
         try {
-            fetch('https://play.autodarts.io/version', { mode: 'no-cors', cache: 'no-store' })
+            fetch('{version_url}', { mode: 'no-cors', cache: 'no-store' })
                 .then(function() {
                     if (isOffline) {
                         console.log('[Autodarts Browser] Re-connected to Autodarts.io.');
@@ -0,0 +1,71 @@
+// Collects Navigation Timing, Paint Timing (FCP/LCP) and long tasks after the page
+// has loaded and sends them to Python through the QWebChannel bridge (timingBridge).
+// qwebchannel.js is prepended to this script by darts-browser.py.
+
+(function() {
+    // Only the top level document, not the iframes
+    if (window.top !== window || window.__adartsTiming) {
+        return;
+    }
+    window.__adartsTiming = true;
+
+    // Largest Contentful Paint may change until the page settles
+    var REPORT_DELAY_MS = 5000;
+
+    var lcp = null;
+    var longTasks = { count: 0, total_ms: 0, max_ms: 0 };
+
+    try {
+        new PerformanceObserver(function(list) {
+            list.getEntries().forEach(function(entry) {
+                lcp = entry.startTime;
+            });
+        }).observe({ type: 'largest-contentful-paint', buffered: true });
+    } catch (e) {
+        console.error("[Autodarts Browser] LCP observer failed: " + e);
+    }
+
+    try {
+        new PerformanceObserver(function(list) {
+            list.getEntries().forEach(function(entry) {
+                longTasks.count += 1;
+                longTasks.total_ms += entry.duration;
+                longTasks.max_ms = Math.max(longTasks.max_ms, entry.duration);
+            });
+        }).observe({ type: 'longtask', buffered: true });
+    } catch (e) {
+        console.error("[Autodarts Browser] Long task observer failed: " + e);
+    }
+
+    function collect() {
+        var nav = performance.getEntriesByType('navigation')[0];
+        var fcp = performance.getEntriesByName('first-contentful-paint')[0];
+        return {
+            url: location.href.split('#')[0],
+            navigation: nav ? nav.toJSON() : null,
+            fcp_ms: fcp ? fcp.startTime : null,
+            lcp_ms: lcp,
+            long_tasks: longTasks
+        };
+    }
+
+    function report() {
+        try {
+            new QWebChannel(qt.webChannelTransport, function(channel) {
+                channel.objects.timingBridge.report(JSON.stringify(collect()));
+            });
+        } catch (e) {
+            console.error("[Autodarts Browser] Page timing report failed: " + e);
+        }
+    }
+
+    function scheduleReport() {
+        setTimeout(report, REPORT_DELAY_MS);
+    }
+
+    if (document.readyState === 'complete') {
+        scheduleReport();
+    } else {
+        window.addEventListener('load', scheduleReport);
+    }
+})();
@@ -0,0 +1,31 @@
+// Adds preconnect hints for the board and login origins as early as possible.
+// Runs at document creation, before the page starts its own requests.
+
+(function() {
+    var origins = {origins_json};
+
+    function addHints() {
+        var parent = document.head || document.documentElement;
+        if (!parent) {
+            return false;
+        }
+        origins.forEach(function(origin) {
+            if (origin === window.location.origin) {
+                return;
+            }
+            var link = document.createElement('link');
+            link.rel = 'preconnect';
+            link.href = origin;
+            parent.appendChild(link);
+        });
+        return true;
+    }
+
+    if (!addHints()) {
+        document.addEventListener('readystatechange', function onReady() {
+            if (addHints()) {
+                document.removeEventListener('readystatechange', onReady);
+            }
+        });
+    }
+})();
@@ -0,0 +1,107 @@
+"""
+Event-loop stall detector for the Qt GUI thread.
+
+A QTimer on the GUI thread calls beat() every HEARTBEAT_MS. A watchdog thread
+checks the age of the last heartbeat; when the event loop has not run for
+longer than STALL_THRESHOLD_MS, the current Python stack of the main thread is
+captured. When the heartbeat resumes, the stall is recorded with its duration
+(shown on the diagnostics page and counted in the metrics).
+"""
+
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+import metrics
+
+HEARTBEAT_MS = 100
+STALL_THRESHOLD_MS = 300
+CHECK_INTERVAL_S = 0.05
+MAX_EVENTS = 50
+
+
+class StallDetector:
+    """Records stalls of the thread that calls beat()."""
+
+    def __init__(self, threshold_ms=STALL_THRESHOLD_MS, heartbeat_ms=HEARTBEAT_MS, max_events=MAX_EVENTS):
+        self.threshold_ms = threshold_ms
+        self.heartbeat_ms = heartbeat_ms
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=max_events)
+        self._last_beat = None
+        self._pending = None  # Stall in progress: {'t', 'stack'}
+        self._thread_ident = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.total_stalls = 0
+
+    def start(self, thread_ident=None):
+        """Starts the watchdog. thread_ident: the monitored thread (default: main thread)."""
+        if self._thread:
+            return
+        self._thread_ident = thread_ident or threading.main_thread().ident
+        self._last_beat = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="stall-detector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def beat(self):
+        """Heartbeat, called from the monitored event loop."""
+        now = time.monotonic()
+        with self._lock:
+            previous, self._last_beat = self._last_beat, now
+            pending, self._pending = self._pending, None
+        if pending is None or previous is None:
+            return
+        # The timer should have fired heartbeat_ms after the previous beat
+        duration_ms = max(0.0, (now - previous) * 1000 - self.heartbeat_ms)
+        self._record(pending, duration_ms)
+
+    def _run(self):
+        while not self._stop.wait(CHECK_INTERVAL_S):
+            with self._lock:
+                if self._pending is not None or self._last_beat is None:
+                    continue
+                age_ms = (time.monotonic() - self._last_beat) * 1000
+                if age_ms - self.heartbeat_ms < self.threshold_ms:
+                    continue
+                frame = sys._current_frames().get(self._thread_ident)
+                self._pending = {
+                    't': time.time() - age_ms / 1000,
+                    'stack': traceback.format_stack(frame) if frame is not None else [],
+                }
+                del frame
+
+    def _record(self, pending, duration_ms):
+        stack = [line.rstrip() for line in pending['stack']]
+        event = {
+            't': pending['t'],
+            'time': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(pending['t'])),
+            'duration_ms': round(duration_ms),
+            # Innermost frame first line, e.g. 'File "darts-browser.py", line 230, in _inject_css'
+            'location': stack[-1].splitlines()[0].strip() if stack else "",
+            'stack': stack,
+        }
+        with self._lock:
+            self._events.append(event)
+            self.total_stalls += 1
+        metrics.GUI_STALLS.inc()
+        metrics.GUI_STALL_SECONDS.observe(duration_ms / 1000)
+        print(f"[WARN] GUI thread stalled for {event['duration_ms']} ms at {event['location']}")
+
+    def snapshot(self):
+        """Returns threshold, number of stalls and the recent events (newest first)."""
+        with self._lock:
+            return {
+                'running': self._thread is not None,
+                'threshold_ms': self.threshold_ms,
+                'total': self.total_stalls,
+                'events': list(reversed(self._events)),
+            }
+
+
+stall_detector = StallDetector()
@@ -4,9 +4,9 @@
 # Autodarts-Browser Start Script
 # =============================================================================
 
-# 1. Wartezeit beim Systemstart
-# Verhindert Fehler, wenn Netzwerk oder Grafik noch nicht bereit sind.
-sleep 10
+# 1. Keine feste Wartezeit mehr beim Systemstart
+# Die Anwendung wartet selbst, bis Display und Netzwerk bereit sind
+# (siehe startup.py), und startet dadurch so früh wie möglich.
 
 # 2. Display-Variable setzen
 # Notwendig für GUI-Anwendungen, die aus dem Hintergrund gestartet werden.
@@ -0,0 +1,272 @@
+"""
+Startup orchestration and tracing.
+
+Independent startup steps (template loading, cache maintenance, network probe,
+...) run concurrently in worker threads while the GUI thread creates the
+window. Every step is recorded in a startup trace which is written to
+logs/startup_trace.json and shown on the diagnostics page.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import metrics
+from utils import APP_DIR, LOG_DIR
+
+STARTUP_TRACE_PATH = LOG_DIR / "startup_trace.json"
+
+DISPLAY_TIMEOUT_S = 60
+NETWORK_TIMEOUT_S = 30
+NETWORK_PROBE_HOST = "play.autodarts.io"
+
+# Modules measured by the import time report: (module, description)
+IMPORT_REPORT_TARGETS = (
+    ("darts-browser", "Einstiegspunkt (darts-browser.py)"),
+    ("config_server", "Konfigurationsserver (wird verzögert geladen)"),
+)
+
+
+def _process_start_time():
+    """Wall clock time at which this process was started (falls back to now)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) in clock ticks since boot; the comm field may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except Exception:
+        return time.time()
+
+
+def _system_uptime():
+    try:
+        with open("/proc/uptime") as f:
+            return float(f.read().split()[0])
+    except Exception:
+        return None
+
+
+class StartupTrace:
+    """Records the timing of startup phases relative to process start."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.process_start = _process_start_time()
+        uptime = _system_uptime()
+        # Uptime at process start: how long after boot we got going
+        self.boot_offset_s = uptime - (time.time() - self.process_start) if uptime is not None else None
+        self.phases = []
+        self.marks = {}
+
+    def _now_ms(self):
+        return round((time.time() - self.process_start) * 1000, 1)
+
+    @contextmanager
+    def phase(self, name):
+        start = self._now_ms()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            duration_ms = round(self._now_ms() - start, 1)
+            with self._lock:
+                self.phases.append({
+                    'name': name,
+                    'start_ms': start,
+                    'duration_ms': duration_ms,
+                    'thread': threading.current_thread().name,
+                    'error': error,
+                })
+            metrics.STARTUP_PHASE_SECONDS.set(duration_ms / 1000, phase=name)
+
+    def mark(self, name):
+        """Records a point in time (e.g. first page loaded). Only the first mark per name counts."""
+        with self._lock:
+            if name in self.marks:
+                return
+            self.marks[name] = self._now_ms()
+        metrics.STARTUP_MARK_SECONDS.set(self.marks[name] / 1000, mark=name)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'started_at': self.process_start,
+                'boot_offset_s': self.boot_offset_s,
+                'phases': sorted(self.phases, key=lambda p: p['start_ms']),
+                'marks': dict(self.marks),
+            }
+
+    def save(self, path=STARTUP_TRACE_PATH):
+        try:
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.to_dict(), indent=2))
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[WARN] Failed to write startup trace: {e}")
+
+
+def load_startup_trace(path=STARTUP_TRACE_PATH):
+    """Returns the last saved startup trace or None."""
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+trace = StartupTrace()
+
+
+class StartupOrchestrator:
+    """Runs named startup steps concurrently and records them in the trace."""
+
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="startup")
+        self._futures = {}
+
+    def submit(self, name, func, *args, **kwargs):
+        def _run():
+            try:
+                with trace.phase(name):
+                    return func(*args, **kwargs)
+            except Exception as e:
+                print(f"[ERROR] Startup step '{name}' failed: {e}")
+                raise
+        self._futures[name] = self._executor.submit(_run)
+        return self._futures[name]
+
+    def future(self, name):
+        return self._futures[name]
+
+    def result(self, name, timeout=None):
+        """Waits for a step and returns its result (re-raises its exception)."""
+        return self._futures[name].result(timeout)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# --- Readiness Probes ---
+def wait_for_display(timeout=DISPLAY_TIMEOUT_S):
+    """
+    Waits until the X11 or Wayland display accepts connections.
+    Replaces the fixed 'sleep' in start.sh. Returns True if the display is ready.
+    """
+    platform = os.environ.get("QT_QPA_PLATFORM", "")
+    if platform.startswith(("offscreen", "minimal", "eglfs", "linuxfb", "vnc")):
+        return True
+
+    candidates = []
+    wayland = os.environ.get("WAYLAND_DISPLAY")
+    if wayland:
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR", "")
+        candidates.append(wayland if wayland.startswith("/") else os.path.join(runtime_dir, wayland))
+    display = os.environ.get("DISPLAY", "")
+    if display.startswith(":"):
+        candidates.append(f"/tmp/.X11-unix/X{display[1:].split('.')[0]}")
+    if not candidates:
+        # Remote display or unknown setup: nothing we can probe
+        return True
+
+    deadline = time.monotonic() + timeout
+    while True:
+        for path in candidates:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                    s.settimeout(1)
+                    s.connect(path)
+                return True
+            except OSError:
+                pass
+        if time.monotonic() > deadline:
+            print(f"[WARN] Display not ready after {timeout}s. Starting anyway.")
+            return False
+        time.sleep(0.2)
+
+
+def wait_for_network(host=NETWORK_PROBE_HOST, timeout=NETWORK_TIMEOUT_S):
+    """Waits until host can be resolved (network and DNS are up). Returns True if ready."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.getaddrinfo(host, 443, type=socket.SOCK_STREAM)
+            return True
+        except OSError:
+            pass
+        if time.monotonic() > deadline:
+            print(f"[WARN] Network not ready after {timeout}s. Loading pages anyway.")
+            return False
+        time.sleep(0.5)
+
+
+# --- Import Time Report ---
+def _parse_importtime(output):
+    """Parses the stderr of 'python -X importtime'. Returns a list of entries in import order."""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            head, cumulative, raw_name = line.split("|", 2)
+            raw_name = raw_name[1:]
+            entries.append({
+                'name': raw_name.strip(),
+                'depth': (len(raw_name) - len(raw_name.lstrip())) // 2,
+                'self_ms': int(head.split(":", 1)[1]) / 1000,
+                'cumulative_ms': int(cumulative) / 1000,
+            })
+        except ValueError:
+            continue
+    return entries
+
+
+def import_time_report(module, top=15, timeout=120):
+    """
+    Imports module in a fresh interpreter with '-X importtime' and returns
+    the total import time and the slowest imports (by cumulative time).
+    """
+    code = f"__import__({module!r})"
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    try:
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=str(APP_DIR), env=env, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'module': module, 'ok': False, 'error': f"Timeout nach {timeout}s", 'total_ms': None, 'top': []}
+
+    entries = _parse_importtime(proc.stderr)
+    target = next((e for e in reversed(entries) if e['depth'] == 0 and e['name'] == module), None)
+    error = None
+    if proc.returncode != 0:
+        error = "\n".join(l for l in proc.stderr.splitlines() if not l.startswith("import time:"))[-2000:]
+
+    slowest = sorted((e for e in entries if e is not target), key=lambda e: e['cumulative_ms'], reverse=True)
+    return {
+        'module': module,
+        'ok': proc.returncode == 0,
+        'error': error,
+        'total_ms': target['cumulative_ms'] if target else None,
+        'top': slowest[:top],
+    }
+
+
+if __name__ == "__main__":
+    # python startup.py  -> prints the import time report for the entry point
+    for module, description in IMPORT_REPORT_TARGETS:
+        report = import_time_report(module)
+        total = f"{report['total_ms']:.0f} ms" if report['total_ms'] is not None else "n/a"
+        print(f"{description}: {total}")
+        if report['error']:
+            print(report['error'])
+        for entry in report['top']:
+            print(f"  {entry['cumulative_ms']:8.1f} ms  {'  ' * entry['depth']}{entry['name']}")
@@ -3,20 +3,21 @@ import os
 import time
 import threading
 import socket
-import netifaces
-import qrcode
 import subprocess
 import json
-import urllib.request
-from urllib.parse import quote
-from io import BytesIO
 from pathlib import Path
-from cryptography.fernet import Fernet, InvalidToken
+
+# Heavy dependencies (netifaces, qrcode/PIL, urllib) are imported
+# inside the functions that need them to keep the cold start of the kiosk fast.
 
 # --- Constants & Paths ---
 APP_DIR = Path(__file__).parent
 CONFIG_PATH = APP_DIR / "config.ini"
+CONFIG_JOURNAL_PATH = APP_DIR / "config.journal"
 KEY_PATH = APP_DIR / ".secret.key"
+FLEET_PATH = APP_DIR / "fleet.json"
+SYNC_CACHE_PATH = APP_DIR / "sync_cache.json"
+SYNC_PUBKEY_PATH = APP_DIR / "sync_signing.pub"
 CSS_PATH = APP_DIR / "style.css"
 THEMES_DIR = APP_DIR / "themes"
 SCRIPTS_DIR = APP_DIR / "scripts"
@@ -29,6 +30,10 @@ RESTART_TRIGGER_PATH = APP_DIR / ".restart_trigger"
 RELOAD_TRIGGER_PATH = APP_DIR / ".reload_trigger"
 CLEAR_CACHE_MARKER_PATH = APP_DIR / ".clear_cache"
 
+# Offline Updates
+UPDATE_PUBKEY_PATH = APP_DIR / "update_signing.pub"
+UPDATE_PENDING_PATH = APP_DIR / ".update_pending"
+
 # Logging
 LOG_DIR = APP_DIR / "logs"
 LOG_PATH = LOG_DIR / "adarts-browser.log"
@@ -43,6 +48,8 @@ def get_local_ip_address():
     Prioritizes non-localhost, non-loopback IPv4 addresses.
     """
     try:
+        import netifaces
+
         # Strategy 1: Connect to an external server (Google DNS) - most reliable
         # We don't actually send data, just checking what IP would be used
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -75,6 +82,9 @@ def generate_qr_code_image(data):
     """
     Generates a QR code for the given data and returns it as a bytes object (PNG).
     """
+    import qrcode
+    from io import BytesIO
+
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -93,6 +103,8 @@ def generate_qr_code_image(data):
 # --- Theme Repository Helpers ---
 def fetch_available_themes():
     """Fetches the list of themes from the online repository (themes.json)."""
+    import urllib.request
+
     # Add timestamp to bypass caching
     url = THEME_REPO_BASE_URL + f"themes.json?v={int(time.time())}"
     try:
@@ -106,6 +118,9 @@ def fetch_available_themes():
 
 def fetch_theme_content(filename):
     """Fetches the content of a specific css file from the online repository."""
+    import urllib.request
+    from urllib.parse import quote
+
     # Ensure filename is URL encoded (handles spaces etc.)
     encoded_filename = quote(filename)
     url = THEME_REPO_BASE_URL + encoded_filename
@@ -262,32 +277,6 @@ def git_perform_update():
     except Exception as e:
         return False, f"Unerwarteter Fehler: {e}"
 
-# --- Encryption Helpers ---
-def load_key():
-    """Loads the encryption key from file, or generates it if missing."""
-    if not KEY_PATH.exists():
-        key = Fernet.generate_key()
-        with open(KEY_PATH, "wb") as key_file:
-            key_file.write(key)
-        return key
-    return open(KEY_PATH, "rb").read()
-
-def encrypt_value(value):
-    """Encrypts a string value."""
-    if not value: return ""
-    f = Fernet(load_key())
-    return f.encrypt(value.encode()).decode()
-
-def decrypt_value(value):
-    """Decrypts a string value. Returns original value if decryption fails (e.g. was plaintext)."""
-    if not value: return ""
-    try:
-        f = Fernet(load_key())
-        return f.decrypt(value.encode()).decode()
-    except (InvalidToken, Exception):
-        # If decryption fails, assume it's plaintext (migration scenario)
-        return value
-
 def touch_trigger_file(path, delay=0.0):
     """Touches a trigger file, optionally after a delay (in a separate thread)."""
     def _touch():
@@ -313,10 +302,13 @@ def trigger_reload(delay=0.5):
     """Triggers a page reload."""
     touch_trigger_file(RELOAD_TRIGGER_PATH, delay)
 
-def request_clear_cache():
-    """Creates the marker file to request cache clearing on restart."""
+def request_clear_cache(scope="all"):
+    """
+    Creates the marker file to request cache clearing on restart.
+    scope: "all" deletes the complete cache (incl. logins), "http" only the HTTP cache.
+    """
     try:
-        CLEAR_CACHE_MARKER_PATH.touch()
+        CLEAR_CACHE_MARKER_PATH.write_text(scope)
         trigger_restart()
         return True
     except Exception: